@@ -1,7 +1,6 @@
 """Main module for the Magpie application"""
 import os
 import sys
-import threading
 
 from functools import wraps
 from pathlib import Path
@@ -9,8 +8,10 @@ from typing import Callable
 from playwright.sync_api import Response as HttpResponse
 
 from app.expect_mod import expect as expect_mod
+from app.datastore import TSKeyValueStore
 from app.eventstore import TSEventStore
 from app.fsm.execution_options import Strategy
+from app.lock_profiler import THREAD_LOCK
 from app.page import Page
 from app import custom_errors
 from app.logger import LOGGER  # Expose global logger
@@ -30,6 +31,9 @@ sys.path.append(PROJECT_ROOT)
 # Create global thread-safe event store:
 EVENT_STORE = TSEventStore()
 
+# Create global thread-safe key-value store, for coordination between actors:
+STATE_STORE = TSKeyValueStore()
+
 # Set output directory:
 default_output_path = Path(".") / "output"
 OUTPUTDIR_PATH = Path(os.environ.get("OUTPUTDIR", default_output_path))
@@ -47,8 +51,8 @@ expect = expect_mod
 ########################
 # PARALLELLISM CONTROL
 #
-# Create a global lock object, for thread synchronization:
-THREAD_LOCK: threading.Lock = threading.Lock()
+# THREAD_LOCK (imported above) is the global lock object, for thread synchronization.
+# It records who holds it and for how long, see the lock_profiler module.
 
 
 ##############
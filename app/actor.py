@@ -1,6 +1,8 @@
 """Implement actor logic"""
 from types import ModuleType
 
+from app.sync import SYNC, Barrier, Latch, Semaphore
+
 
 class Actor:
     """Actor base class"""
@@ -9,3 +11,18 @@ class Actor:
         self.actor_module: ModuleType = actor_module
         self.name: str = name
         self.config = config
+
+    @staticmethod
+    def barrier(name: str, parties: int) -> Barrier:
+        """Return the barrier with this name, shared by all sessions"""
+        return SYNC.barrier(name, parties)
+
+    @staticmethod
+    def semaphore(name: str, value: int = 1) -> Semaphore:
+        """Return the counting semaphore with this name, shared by all sessions"""
+        return SYNC.semaphore(name, value)
+
+    @staticmethod
+    def latch(name: str, count: int) -> Latch:
+        """Return the countdown latch with this name, shared by all sessions"""
+        return SYNC.latch(name, count)
@@ -14,7 +14,8 @@ from types import ModuleType
 from typing import Any
 
 from app.fsm.model import Model
-from app.parser import FileParser
+from app.fsm.model_based_actor import MODEL_REGISTRY
+from app.model_cache import MODEL_CACHE
 from app.actor import Actor
 
 
@@ -38,10 +39,8 @@ class ModelBasedActor(Actor):  # pylint: disable=too-many-instance-attributes
         self._build()
 
     def _build(self) -> None:
-        """Construct the model from supplied modules"""
+        """Get the compiled model for the supplied modules from the model registry"""
         # Get model, action functions and state functions from the actor module:
-        file_parser = FileParser()
-
         actor_module_dir = os.path.dirname(os.path.relpath(self.actor_module.__file__, os.getcwd()))
         model_file_path = f"{actor_module_dir}/model"
         if not os.path.exists(model_file_path):
@@ -53,34 +52,49 @@ class ModelBasedActor(Actor):  # pylint: disable=too-many-instance-attributes
             self._actions_module = getattr(self.actor_module, "actions")
         if hasattr(self.actor_module, "states"):
             self._states_module = getattr(self.actor_module, "states")
+        self._model_file_path = (
+            f"{os.path.dirname(os.path.abspath(self.actor_module.__file__))}/model"
+        )
 
-        # Parse the model file, will raise a ParseError
-        # if there are syntax errors:
-        model_path = f"{os.path.dirname(os.path.abspath(self.actor_module.__file__))}/model"
-        self.model = file_parser.parse(model_path)
-        self.model.name = self.actor_module.__name__.replace("tests.actors.", "")
+        # Sessions using the same modules share the same model:
+        modules = (
+            self.actor_module,
+            self._conditions_module,
+            self._actions_module,
+            self._states_module,
+        )
+        self.model = MODEL_REGISTRY.get(self._model_file_path, modules, self._compile)
+
+    def _compile(self) -> Model:
+        """Construct the model from supplied modules"""
+        # Parse the model file (or get it from the model cache),
+        # will raise a ParseError if there are syntax errors:
+        model = MODEL_CACHE.parse(self._model_file_path)
+        model.name = self.actor_module.__name__.replace("tests.actors.", "")
 
         # Add condition hooks:
-        for name, condition in self.model.conditions.items():
+        for name, condition in model.conditions.items():
             condition_fn_name = self._fn_name_from_name(name)
             if hasattr(self._conditions_module, condition_fn_name):
                 condition.fn = getattr(self._conditions_module, condition_fn_name)
             # TODO: Error / warning if fn is missing?
 
         # Add action hooks:
-        for name, action in self.model.actions.items():
+        for name, action in model.actions.items():
             action_fn_name = self._fn_name_from_name(name)
             if hasattr(self._actions_module, action_fn_name):
                 action.fn = getattr(self._actions_module, action_fn_name)
             # TODO: Error / warning if fn is missing?
 
         # Add state hooks:
-        for name, state in self.model.states.items():
+        for name, state in model.states.items():
             state_fn_name = self._fn_name_from_name(name)
             if hasattr(self._states_module, state_fn_name):
                 state.fn = getattr(self._states_module, state_fn_name)
             # TODO: Error / warning if fn is missing?
 
+        return model
+
     @staticmethod
     def _fn_name_from_name(name: str) -> str:
         """Convert a name with mixed case and spaces into a snake case name"""
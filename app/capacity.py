@@ -0,0 +1,221 @@
+"""Find the maximum sustainable number of concurrent sessions
+
+A capacity search keeps adding session replicas, step by step, while it
+watches the latency percentiles and the failure rate of the actions. It
+stops adding replicas when the p95 latency of any action exceeds a threshold
+or too many actions fail:
+
+    CapacitySearch(
+        name="Consumer",
+        actor_module=actors.todo.todo_consumer,
+        browser="chromium",
+        step=2,
+        step_duration_s=60,
+        max_replicas=50,
+        p95_threshold_s=2.0,
+        max_failure_rate=0.05,
+    )
+
+The result is the highest number of concurrent sessions where both limits
+were respected, plus the latency curve of each action for all steps.
+"""
+from __future__ import annotations
+
+from threading import Thread
+from time import sleep
+from typing import Any, Callable, Dict, List, Tuple
+
+from app import LOGGER
+from app.fsm.histogram import LatencyHistogram
+from app.sessions import Session, SessionConfigurationError, start_session
+from app.sync import shutdown as sync_shutdown
+
+
+# (session name, action name) -> (durations, number of failures):
+SnapshotType = Dict[Tuple[str, str], Tuple[LatencyHistogram, int]]
+
+
+class CapacityStep:  # pylint: disable=too-few-public-methods, too-many-instance-attributes
+    """Keep the measurements of one step of the capacity search"""
+
+    def __init__(
+        self, concurrency: int, durations: Dict[str, LatencyHistogram], failures: int
+    ) -> None:
+        all_durations = LatencyHistogram()
+        for histogram in durations.values():
+            all_durations.merge(histogram)
+        self.concurrency: int = concurrency
+        self.actions_count: int = all_durations.count
+        self.p50_s: float | None = all_durations.percentile(50)
+        self.p95_s: float | None = all_durations.percentile(95)
+        self.p99_s: float | None = all_durations.percentile(99)
+        # action name -> p95 of that action, so a slow but rare action isn't hidden by the others:
+        self.action_p95_s: Dict[str, float] = {
+            name: histogram.percentile(95)
+            for name, histogram in sorted(durations.items())
+            if histogram.count
+        }
+        self.failure_rate: float = failures / all_durations.count if all_durations.count else 0.0
+        self.verdict: str = ""
+
+    def slowest_action(self) -> Tuple[str, float] | None:
+        """Return the name and p95 of the action with the highest p95, if any"""
+        if not self.action_p95_s:
+            return None
+        return max(self.action_p95_s.items(), key=lambda item: item[1])
+
+
+class CapacitySearch:  # pylint: disable=too-many-instance-attributes
+    """Add session replicas step by step until latency or failures exceed their limits"""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        name: str,
+        initial_replicas: int = 1,
+        step: int = 1,
+        max_replicas: int = 100,
+        step_duration_s: float = 60,
+        p95_threshold_s: float = 2.0,
+        max_failure_rate: float = 0.05,
+        seed: int | None = None,
+        data_factory: Callable[[int], Dict[str, Any]] | None = None,
+        **session_kwargs,
+    ) -> None:
+        # pragma pylint: disable=line-too-long
+        """Define a capacity search
+
+        Args:
+            name (str): The name of the search. Replicas are named "<name> #1", "<name> #2" etc.
+            initial_replicas (int): [optional] the number of sessions to start with
+            step (int): [optional] the number of sessions to add in each step
+            max_replicas (int): [optional] never run more sessions than this
+            step_duration_s (float): [optional] how long to measure each step
+            p95_threshold_s (float): [optional] the highest acceptable 95th percentile of the durations of each action, in seconds
+            max_failure_rate (float): [optional] the highest acceptable share of failed actions, 0.0 - 1.0
+            seed (int): [optional] if specified, replica number n gets the seed `seed + n`
+            data_factory (Callable[[int], Dict[str, Any]]): [optional] called with the replica number, returns the initial `page.data` of the replica
+            session_kwargs: Any other arguments accepted by Session, e.g. `actor_module` and `browser`
+        """
+        # pragma pylint: enable=line-too-long
+        if initial_replicas < 1 or step < 1 or max_replicas < initial_replicas:
+            raise SessionConfigurationError(
+                f"Capacity search {name}: need 1 <= initial_replicas <= max_replicas and step >= 1"
+            )
+        if "actor" in session_kwargs:
+            raise SessionConfigurationError(
+                f"Capacity search {name}: Use `actor_module`, "
+                "replicas can't share an actor instance"
+            )
+        self.name: str = name
+        self.initial_replicas: int = initial_replicas
+        self.step: int = step
+        self.max_replicas: int = max_replicas
+        self.step_duration_s: float = step_duration_s
+        self.p95_threshold_s: float = p95_threshold_s
+        self.max_failure_rate: float = max_failure_rate
+        self.seed: int | None = seed
+        self.data_factory = data_factory
+        self.session_kwargs: Dict[str, Any] = session_kwargs
+        self.sessions: List[Session] = []
+        self.steps: List[CapacityStep] = []
+        self.max_sustainable_concurrency: int = 0
+        self._threads: List[Thread] = []
+
+    def _add_replicas(
+        self,
+        count: int,
+        headless: bool,
+        profile: str | None,
+        configure_session: Callable[[Session], None] | None,
+    ) -> None:
+        for _ in range(count):
+            number = len(self.sessions) + 1
+            session = Session(
+                name=f"{self.name} #{number}",
+                seed=None if self.seed is None else self.seed + number,
+                data=self.data_factory(number) if self.data_factory else None,
+                **self.session_kwargs,
+            )
+            if configure_session:
+                configure_session(session)
+            thread = Thread(
+                target=start_session,
+                args=(session, headless, profile),
+                daemon=True,
+                name=session.name,
+            )
+            self.sessions.append(session)
+            self._threads.append(thread)
+            thread.start()
+
+    def _snapshot(self) -> SnapshotType:
+        snapshot = {}
+        for session in self.sessions:
+            for name, action in list(session.machine.summary.results.actions.items()):
+                snapshot[(session.name, name)] = (action.durations.copy(), action.fail_count)
+        return snapshot
+
+    def _measure(self, window_start: SnapshotType) -> CapacityStep:
+        """Measure the action durations and failures since the window_start snapshot"""
+        durations: Dict[str, LatencyHistogram] = {}
+        failures = 0
+        for (session_name, name), (histogram, fail_count) in self._snapshot().items():
+            earlier_histogram, earlier_fail_count = window_start.get(
+                (session_name, name), (LatencyHistogram(), 0)
+            )
+            durations.setdefault(name, LatencyHistogram()).merge(histogram.since(earlier_histogram))
+            failures += fail_count - earlier_fail_count
+        concurrency = len([thread for thread in self._threads if thread.is_alive()])
+        return CapacityStep(concurrency, durations, failures)
+
+    def _is_sustainable(self, step: CapacityStep) -> bool:
+        if step.concurrency == 0:
+            step.verdict = "all sessions have ended"
+            return False
+        if step.failure_rate > self.max_failure_rate:
+            step.verdict = f"failure rate above {self.max_failure_rate:.0%}"
+            return False
+        slowest = step.slowest_action()
+        if slowest is not None and slowest[1] > self.p95_threshold_s:
+            step.verdict = f"p95 of '{slowest[0]}' above {self.p95_threshold_s}s"
+            return False
+        step.verdict = "OK"
+        return True
+
+    def run(
+        self,
+        headless: bool = False,
+        profile: str | None = None,
+        configure_session: Callable[[Session], None] | None = None,
+    ) -> int:
+        """Run the search. Return the maximum sustainable concurrency.
+
+        configure_session() is called with each replica before it starts, to
+        apply the settings of the run.
+        """
+        try:
+            replicas_to_add = self.initial_replicas
+            while replicas_to_add > 0:
+                self._add_replicas(replicas_to_add, headless, profile, configure_session)
+                LOGGER.info("Capacity search: measuring %s sessions", len(self.sessions))
+                window_start = self._snapshot()
+                sleep(self.step_duration_s)
+                step = self._measure(window_start)
+                self.steps.append(step)
+                if not self._is_sustainable(step):
+                    LOGGER.info("Capacity search: stopping, %s", step.verdict)
+                    break
+                self.max_sustainable_concurrency = max(
+                    self.max_sustainable_concurrency, step.concurrency
+                )
+                replicas_to_add = min(self.step, self.max_replicas - len(self.sessions))
+        except KeyboardInterrupt:
+            LOGGER.info("User pressed CTRL+C. Stopping the capacity search...")
+            sync_shutdown()
+        finally:
+            for session in self.sessions:
+                session.stop()
+            for thread in self._threads:
+                thread.join()
+        return self.max_sustainable_concurrency
@@ -0,0 +1,44 @@
+"""Share coverage between the sessions of one actor
+
+Without a board, each replica of an actor tracks its own coverage, so all
+replicas chase the same unvisited transitions. With a shared board, a
+transition taken by any replica counts as covered for all of them, and
+SmartRandom replicas spread out over the rest of the model.
+
+Share a board between the replicas of a session group:
+
+    SessionGroup(name="Consumer", replicas=5, shared_coverage=True, ...)
+
+or between all sessions of the same actor with `main.py run --shared-coverage`.
+
+A transition is marked as covered when a session picks it, so two sessions
+don't pick the same unvisited transition one after the other. The board
+takes no lock of its own: it is only updated with atomic dict operations.
+"""
+from __future__ import annotations
+
+from typing import Dict
+
+from app.fsm.model import Model
+
+
+class CoverageBoard:
+    """The transitions of a model covered by any of the sessions sharing the board"""
+
+    def __init__(self, model: Model) -> None:
+        self.model: Model = model
+        # Transition name -> name of the session that covered it first:
+        self.covered: Dict[str, str] = {}
+
+    def cover(self, transition_name: str, session_name: str) -> None:
+        self.covered.setdefault(transition_name, session_name)
+
+    def is_covered(self, transition_name: str) -> bool:
+        return transition_name in self.covered
+
+    @property
+    def coverage(self) -> float:
+        """Return the share of the model's transitions that have been covered, 0.0 - 1.0"""
+        if not self.model.transitions:
+            return 1.0
+        return len(self.covered) / len(self.model.transitions)
@@ -0,0 +1,175 @@
+"""Carry coverage over between runs
+
+A coverage store is a JSON file that remembers, per actor, in which run
+each transition of its model was last covered:
+
+    python main.py run tests/my_test.py --coverage-store coverage.json
+
+At startup, the store tells the SmartRandom strategy which transitions have
+not been covered for the longest time, so that those are picked first.
+After the run, the coverage of all sessions is added to the store.
+
+Each transition is stored with a fingerprint of its definition and of the
+source code of its action, condition and end state functions. When the
+model or the code changes, only the transitions whose fingerprint changed
+are forgotten.
+
+A crashed run can be resumed with `--resume output/run.journal`: the visits
+in the journal are counted as if they happened in the new run.
+"""
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import os
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+
+from app import LOGGER
+from app.fsm.model import Model
+from app.fsm.results import Result
+from app.fsm.transition import Transition
+from app.journal import JOURNAL, JournalRecord
+
+if TYPE_CHECKING:
+    from app.sessions import Session
+
+
+STORE_FORMAT_VERSION = 1
+NEVER = -1  # The "last run" of transitions that have never been covered
+
+
+def _source(fn: Any) -> str:
+    try:
+        return inspect.getsource(fn)
+    except (OSError, TypeError):
+        return ""
+
+
+def transition_fingerprint(transition: Transition) -> str:
+    """Return a hash of the transition and the code it runs"""
+    parts = [transition.name]
+    if transition.action:
+        parts.append(_source(transition.action.fn))
+    if transition.condition:
+        parts.append(_source(transition.condition.fn))
+    parts.append(_source(transition.end_state.fn))
+    return hashlib.sha1("\0".join(parts).encode()).hexdigest()
+
+
+def model_hash(model: Model) -> str:
+    fingerprints = sorted(transition_fingerprint(trns) for trns in model.transitions.values())
+    return hashlib.sha1("".join(fingerprints).encode()).hexdigest()
+
+
+def actor_key(session: Session) -> str:
+    """Identify the actor of a session, replicas of a session share the key"""
+    actor_module = getattr(session.actor, "actor_module", None)
+    return actor_module.__name__ if actor_module else session.actor.name
+
+
+class CoverageStore:
+    """Remember in which run each transition was last covered"""
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path: str = file_path
+        self.data: Dict[str, Any] = {"version": STORE_FORMAT_VERSION, "runs": 0, "actors": {}}
+        if os.path.exists(file_path):
+            try:
+                with open(file_path) as store_file:
+                    data = json.load(store_file)
+                if data.get("version") != STORE_FORMAT_VERSION:
+                    raise ValueError(f"unsupported version {data.get('version')}")
+                self.data = data
+            except (OSError, ValueError) as exc:
+                LOGGER.warning("Ignoring coverage store %s: %s", file_path, exc)
+        # This run:
+        self.run: int = self.data["runs"] + 1
+
+    def history(self, key: str, model: Model) -> Dict[str, int]:
+        """Return the last run in which each transition of the model was covered
+
+        Transitions that changed since then are forgotten.
+        """
+        stored = self.data["actors"].get(key)
+        if not stored:
+            return {}
+        if stored["model_hash"] != model_hash(model):
+            LOGGER.info("The model of %s has changed since the last run", key)
+        history = {}
+        for name, transition in model.transitions.items():
+            entry = stored["transitions"].get(name)
+            if entry and entry["fingerprint"] == transition_fingerprint(transition):
+                history[name] = entry["last_run"]
+        return history
+
+    def update(self, key: str, sessions: List[Session]) -> None:
+        """Add the coverage of sessions of one actor to the store"""
+        model = sessions[0].machine.model
+        stored = self.data["actors"].setdefault(key, {"model_hash": "", "transitions": {}})
+        stored["model_hash"] = model_hash(model)
+        transitions = stored["transitions"]
+        for name, transition in model.transitions.items():
+            fingerprint = transition_fingerprint(transition)
+            entry = transitions.get(name)
+            if not entry or entry["fingerprint"] != fingerprint:
+                entry = {"fingerprint": fingerprint, "last_run": NEVER, "visits": 0, "failures": 0}
+                transitions[name] = entry
+            for session in sessions:
+                results = session.machine.summary.results.transitions.get(name)
+                if results and results.visits_count:
+                    entry["last_run"] = self.run
+                    entry["visits"] += results.visits_count
+                    entry["failures"] += results.fail_count
+        # Forget transitions that are no longer in the model:
+        for name in set(transitions) - set(model.transitions):
+            del transitions[name]
+
+    def save(self) -> None:
+        self.data["runs"] = self.run
+        temporary_path = f"{self.file_path}.tmp"
+        with open(temporary_path, "w") as store_file:
+            json.dump(self.data, store_file, indent=1)
+        os.replace(temporary_path, self.file_path)
+
+
+def resume_from_journal(sessions: List[Session], records: Iterable[JournalRecord]) -> int:
+    """Add the visits in journal records to the summaries of the sessions with the same names
+
+    The visits are also written to the journal of this run, if it is open,
+    so that it can be resumed in turn. Return the number of visits added.
+
+    Failed visits are resumed too: the failures of the crashed run count as
+    failures of this run, and make it exit with a non-zero exit code.
+    """
+    sessions_by_name = {session.name: session for session in sessions}
+    count = failed_count = 0
+    for record in records:
+        session = sessions_by_name.get(record.session)
+        if session is None:
+            continue
+        model = session.machine.model
+        collection = {
+            "state": model.states,
+            "action": model.actions,
+            "transition": model.transitions,
+        }.get(record.kind, {})
+        if record.name in collection:
+            session.machine.summary.record_visit(
+                collection[record.name], record.result, record.duration_s
+            )
+            JOURNAL.record(
+                record.session,
+                record.kind,
+                record.name,
+                result=record.result,
+                duration_s=record.duration_s,
+            )
+            count += 1
+            failed_count += record.result == Result.FAILED
+    if failed_count:
+        LOGGER.warning(
+            "⚠️  Resumed %s failed visits, they count as failures of this run", failed_count
+        )
+    return count
@@ -0,0 +1,113 @@
+"""Stop sessions when they have covered enough, or stopped covering anything new
+
+A session stops when its coverage reaches a target:
+
+    Session(..., coverage_target=CoverageTarget(transitions=90))
+
+If several percentages are given, all of them must be reached. A session
+can also stop when it is saturated, i.e. when it has not visited a new
+state, action or transition for a number of transitions or seconds:
+
+    Session(..., saturation_transitions=200, saturation_s=120)
+
+A `COVERAGE_TARGET` in the test file is a target for all sessions
+together. Coverage is counted per actor, so replicas of an actor share
+their coverage, and all sessions stop when the target is reached:
+
+    COVERAGE_TARGET = CoverageTarget(transitions=100)
+"""
+from __future__ import annotations
+
+import threading
+
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Set, Tuple
+
+from app.coverage_store import actor_key
+from app.fsm.results import SessionSummary
+
+if TYPE_CHECKING:
+    from app.sessions import Session
+
+
+KINDS = ("states", "actions", "transitions")
+
+
+def _percentage(visited: int, total: int) -> float:
+    return 100.0 if not total else min(100.0, 100 * visited / total)
+
+
+def coverage_percentages(summary: SessionSummary) -> Dict[str, float]:
+    """Return the exact state, action and transition coverage of a session, 0 - 100"""
+    return {
+        kind: _percentage(len(getattr(summary.results, kind)), len(getattr(summary.model, kind)))
+        for kind in KINDS
+    }
+
+
+class CoverageTarget(NamedTuple):
+    """Coverage percentages to reach, None means no target"""
+
+    states: float | None = None
+    actions: float | None = None
+    transitions: float | None = None
+
+    def reached(self, percentages: Dict[str, float]) -> str:
+        """Return a description of the target if it has been reached, otherwise an empty string"""
+        goals = {kind: getattr(self, kind) for kind in KINDS if getattr(self, kind) is not None}
+        if not goals or any(percentages[kind] < goal for kind, goal in goals.items()):
+            return ""
+        return ", ".join(f"{goal:g}% {kind}" for kind, goal in goals.items())
+
+
+class GlobalCoverage:
+    """The coverage of all sessions of a run together"""
+
+    def __init__(self, target: CoverageTarget, sessions: List[Session]) -> None:
+        self.target: CoverageTarget = target
+        self.sessions: List[Session] = sessions
+        # Once reached, the target stays reached:
+        self.reached: str = ""
+        self._covered_count: int = -1
+        self._lock = threading.Lock()
+
+    def percentages(self) -> Dict[str, float]:
+        models = {}
+        visited: Dict[str, Set[Tuple[str, str]]] = {kind: set() for kind in KINDS}
+        for session in self.sessions:
+            key = actor_key(session)
+            models[key] = session.machine.model
+            for kind in KINDS:
+                # Copy the names first, the session may be adding to them:
+                names = list(getattr(session.machine.summary.results, kind))
+                visited[kind].update((key, name) for name in names)
+        return {
+            kind: _percentage(
+                len(visited[kind]), sum(len(getattr(model, kind)) for model in models.values())
+            )
+            for kind in KINDS
+        }
+
+    def _covered(self) -> int:
+        return sum(
+            len(getattr(session.machine.summary.results, kind))
+            for session in self.sessions
+            for kind in KINDS
+        )
+
+    def update(self) -> str:
+        """Check the target, called by every session on every step
+
+        The percentages are only computed again when a session has covered
+        something new since the last check.
+        """
+        with self._lock:
+            if not self.reached:
+                covered = self._covered()
+                if covered != self._covered_count:
+                    self._covered_count = covered
+                    self.reached = self.target.reached(self.percentages())
+                    if self.reached:
+                        # Also stop the sessions that are waiting in an action:
+                        for session in self.sessions:
+                            session.machine.stop()
+            return self.reached
@@ -2,9 +2,19 @@
 from __future__ import annotations
 
 import copy
+import time
 
-from threading import Lock
-from typing import Callable, List, Any, SupportsIndex, Generator
+from collections import Counter, deque
+from threading import Condition, Lock
+from typing import Callable, Deque, Dict, Hashable, List, Any, SupportsIndex, Generator, Tuple
+
+from app.lock_profiler import THREAD_LOCK
+
+
+# Marks a missing key, for use with TSKeyValueStore.compare_and_swap():
+MISSING = object()
+# Returned by TSKeyValueStore.take_work() when there was nothing to take:
+NO_WORK = object()
 
 
 class DataList(list):
@@ -67,3 +77,178 @@ class TSDataStore:
         with self.lock:
             length = len(self._data)
         return length
+
+
+class TSKeyValueStore:
+    """Implement a thread-safe key-value store for coordination between actors
+
+    All operations are atomic and, apart from taking work past claimed items,
+    run in constant time. Besides plain get/set, the store offers
+    compare-and-swap, counters, claims on keys and work queues that let one
+    actor hand off work items to others without polling.
+    """
+
+    def __init__(self) -> None:
+        self._values: Dict[Hashable, Any] = {}
+        self._owners: Dict[Hashable, str] = {}
+        self._work: Dict[Hashable, Deque[Hashable]] = {}
+        # (queue name, item) -> owner, kept apart from the claims on keys:
+        self._work_owners: Dict[Tuple[Hashable, Hashable], str] = {}
+        # Items equal to a claimed item wait here, per queue, until the claim is released:
+        self._parked_work: Dict[Hashable, Counter] = {}
+        self.lock = Lock()
+        self._work_available = Condition(self.lock)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value for key, or default if the key is missing"""
+        with self.lock:
+            return self._values.get(key, default)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Set the value for key"""
+        with self.lock:
+            self._values[key] = value
+
+    def delete(self, key: Hashable) -> None:
+        """Remove key and its value, if it exists"""
+        with self.lock:
+            self._values.pop(key, None)
+
+    def compare_and_swap(self, key: Hashable, expected: Any, new_value: Any) -> bool:
+        """Set key to new_value only if its current value equals expected
+
+        Use `MISSING` as expected value to require that the key does not exist.
+        Return True if the value was swapped, False otherwise.
+        """
+        with self.lock:
+            if self._values.get(key, MISSING) != expected:
+                return False
+            self._values[key] = new_value
+            return True
+
+    def increment(self, key: Hashable, amount: int = 1) -> int:
+        """Add amount to the counter stored at key and return the new value
+
+        Missing counters start at zero.
+        """
+        with self.lock:
+            value = self._values.get(key, 0) + amount
+            self._values[key] = value
+            return value
+
+    def decrement(self, key: Hashable, amount: int = 1) -> int:
+        """Subtract amount from the counter stored at key and return the new value"""
+        return self.increment(key, -amount)
+
+    def claim(self, key: Hashable, owner: str) -> bool:
+        """Claim key for owner
+
+        Return True if the key was unclaimed or already claimed by owner,
+        False if someone else holds the claim.
+        """
+        with self.lock:
+            if self._owners.setdefault(key, owner) != owner:
+                return False
+            return True
+
+    def release(self, key: Hashable, owner: str) -> bool:
+        """Release owner's claim on key. Return False if owner didn't hold the claim."""
+        with self.lock:
+            if self._owners.get(key) != owner:
+                return False
+            del self._owners[key]
+            return True
+
+    def owner_of(self, key: Hashable) -> str | None:
+        """Return the owner of the claim on key, if any"""
+        with self.lock:
+            return self._owners.get(key)
+
+    def put_work(self, queue_name: Hashable, item: Hashable) -> None:
+        """Make a work item available in the named work queue"""
+        with self.lock:
+            self._work.setdefault(queue_name, deque()).append(item)
+            self._work_available.notify_all()
+
+    def take_work(self, queue_name: Hashable, owner: str, timeout_s: float = 0) -> Any:
+        """Take the oldest unclaimed item from the named work queue and claim it for owner
+
+        Wait up to timeout_s seconds for an item to become available. Return the
+        item, or `NO_WORK` if there was nothing to take. Release the item with
+        release_work() when done, or hand it back with return_work(). Items equal
+        to an item that is claimed are set aside until the claim is released, and
+        then go to the back of the queue.
+
+        While waiting, the session lets the other sessions run, so producers can
+        add work even when this is called from an action function.
+        """
+        with self.lock:
+            item = self._take_work(queue_name, owner)
+        if item is not NO_WORK or timeout_s <= 0:
+            return item
+        deadline = time.monotonic() + timeout_s
+        with THREAD_LOCK.released(), self.lock:
+            while True:
+                item = self._take_work(queue_name, owner)
+                remaining = deadline - time.monotonic()
+                if item is not NO_WORK or remaining <= 0:
+                    return item
+                self._work_available.wait(remaining)
+
+    def _take_work(self, queue_name: Hashable, owner: str) -> Any:
+        """Take and claim the oldest unclaimed item, must be called with the lock held"""
+        items = self._work.get(queue_name)
+        while items:
+            item = items.popleft()
+            if (queue_name, item) in self._work_owners:
+                self._parked_work.setdefault(queue_name, Counter())[item] += 1
+                continue
+            self._work_owners[(queue_name, item)] = owner
+            return item
+        return NO_WORK
+
+    def _unpark_work(self, queue_name: Hashable, item: Hashable) -> None:
+        """Put items set aside for a released claim back in the queue"""
+        parked = self._parked_work.get(queue_name)
+        if parked and item in parked:
+            self._work.setdefault(queue_name, deque()).extend([item] * parked.pop(item))
+
+    def release_work(self, queue_name: Hashable, item: Hashable, owner: str) -> bool:
+        """Release owner's claim on a finished work item. Return False if owner didn't hold it."""
+        with self.lock:
+            if self._work_owners.get((queue_name, item)) != owner:
+                return False
+            del self._work_owners[(queue_name, item)]
+            self._unpark_work(queue_name, item)
+            self._work_available.notify_all()
+            return True
+
+    def return_work(self, queue_name: Hashable, item: Hashable, owner: str) -> bool:
+        """Release owner's claim on item and put it back first in the named work queue"""
+        with self.lock:
+            if self._work_owners.get((queue_name, item)) != owner:
+                return False
+            del self._work_owners[(queue_name, item)]
+            self._work.setdefault(queue_name, deque()).appendleft(item)
+            self._unpark_work(queue_name, item)
+            self._work_available.notify_all()
+            return True
+
+    def work_owner_of(self, queue_name: Hashable, item: Hashable) -> str | None:
+        """Return the owner of the claim on a work item, if any"""
+        with self.lock:
+            return self._work_owners.get((queue_name, item))
+
+    def work_count(self, queue_name: Hashable) -> int:
+        """Return the number of items waiting in the named work queue"""
+        with self.lock:
+            parked = self._parked_work.get(queue_name, Counter())
+            return len(self._work.get(queue_name, ())) + sum(parked.values())
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self._values
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._values)
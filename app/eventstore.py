@@ -2,11 +2,18 @@
 from __future__ import annotations
 
 import datetime
+import queue
 import re
 import time
 
-from typing import List, Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum, auto
+from threading import Lock
+from typing import List, Any, Callable, Union
+
 from app.datastore import TSDataStore
+from app.lock_profiler import THREAD_LOCK
+from app.logger import LOGGER
 
 
 #######################
@@ -37,6 +44,159 @@ class Event:
             return f"{self}: {err}"
 
 
+SubscriberType = Union[Callable[[Event], None], queue.Queue, None]
+
+
+class Overflow(Enum):
+    """Define what to do when a subscriber's queue is full"""
+
+    # Let the publisher wait for free space (see `block_timeout_s`). A publishing
+    # session releases THREAD_LOCK while waiting, so other sessions can run:
+    BLOCK = auto()
+    DROP_OLDEST = auto()  # Discard the oldest queued event to make room
+    DROP_NEWEST = auto()  # Discard the event being published
+
+
+class Subscription:  # pylint: disable=too-many-instance-attributes
+    """A subscriber's local, already-filtered view of the event store
+
+    Matching events are pushed to a bounded queue when they are appended to
+    the event store. If a callback was supplied, the queue is drained by a
+    worker pool and the callback is called once per event, in order.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        store: TSEventStore,
+        event_name: str,
+        callback_or_queue: SubscriberType = None,
+        *,
+        data_filter_fn: Callable[[Any], bool] | None = None,
+        maxsize: int = 1000,
+        overflow: Overflow = Overflow.DROP_OLDEST,
+        block_timeout_s: float = 5.0,
+    ) -> None:
+        self.event_name: str = event_name
+        self.overflow: Overflow = overflow
+        self.block_timeout_s: float = block_timeout_s
+        self.dropped_count: int = 0
+        self._store: TSEventStore = store
+        self._pattern = re.compile(event_name, re.IGNORECASE)
+        self._data_filter_fn = data_filter_fn
+        self._callback: Callable[[Event], None] | None = None
+        self._seen: List[Event] = []
+        self._lock = Lock()
+        self._drain_scheduled: bool = False
+        self.active: bool = True
+        if isinstance(callback_or_queue, queue.Queue):
+            self.queue: queue.Queue = callback_or_queue
+        else:
+            self.queue = queue.Queue(maxsize=maxsize)
+            if callable(callback_or_queue):
+                self._callback = callback_or_queue
+
+    def matches(self, event: Event) -> bool:
+        """Return True if the event should be delivered to this subscriber"""
+        if not self._pattern.match(event.name):
+            return False
+        return self._data_filter_fn is None or bool(self._data_filter_fn(event))
+
+    def get(self, timeout_s: float | None = None) -> Event | None:
+        """Return the next delivered event, or None if none arrived within timeout_s"""
+        try:
+            return self.queue.get(timeout=timeout_s) if timeout_s else self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def drain(self) -> List[Event]:
+        """Return all events delivered since the last call, oldest first"""
+        out = []
+        while True:
+            try:
+                out.append(self.queue.get_nowait())
+            except queue.Empty:
+                return out
+
+    @property
+    def events(self) -> List[Event]:
+        """Return every event delivered to this subscriber so far
+
+        Reading this property consumes pending events from the queue, so don't
+        combine it with get() or drain() on the same subscription.
+        """
+        self._seen.extend(self.drain())
+        return list(self._seen)
+
+    def unsubscribe(self) -> None:
+        """Stop receiving events"""
+        self.active = False
+        self._store.unsubscribe(self)
+
+    def _deliver(self, event: Event) -> None:
+        """Put the event in the queue, applying the overflow policy if it is full"""
+        try:
+            if self.overflow == Overflow.BLOCK:
+                try:
+                    self.queue.put_nowait(event)
+                except queue.Full:
+                    with THREAD_LOCK.released():
+                        self.queue.put(event, timeout=self.block_timeout_s)
+            else:
+                self.queue.put_nowait(event)
+        except queue.Full:
+            if self.overflow == Overflow.DROP_OLDEST:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+            with self._lock:
+                self.dropped_count += 1
+
+        if self._callback is not None:
+            with self._lock:
+                if self._drain_scheduled:
+                    return
+                self._drain_scheduled = True
+            self._store.worker_pool.submit(self._run_callbacks)
+
+    def _run_callbacks(self) -> None:
+        """Call the callback for each queued event (runs on the worker pool)
+
+        A failing callback is logged, and the next event is delivered as usual.
+        """
+        drained = False
+        try:
+            while True:
+                with self._lock:
+                    try:
+                        event = self.queue.get_nowait()
+                    except queue.Empty:
+                        self._drain_scheduled = False
+                        drained = True
+                        return
+                if self.active:
+                    try:
+                        self._callback(event)
+                    except Exception:  # pylint: disable=broad-except
+                        LOGGER.exception(
+                            "Subscriber callback for `%s` failed on event `%s`",
+                            self.event_name,
+                            event.name,
+                        )
+        finally:
+            if not drained:
+                # Let the next published event schedule a new drain:
+                with self._lock:
+                    self._drain_scheduled = False
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.unsubscribe()
+
+
 class TSEventStore(TSDataStore):
     """Thread-safe event store
 
@@ -45,14 +205,94 @@ class TSEventStore(TSDataStore):
     be of importance to others.
     """
 
+    def __init__(self, max_workers: int = 4) -> None:
+        super().__init__()
+        self._subscriptions: List[Subscription] = []
+        self._subscriptions_lock = Lock()
+        self._max_workers: int = max_workers
+        self._worker_pool: ThreadPoolExecutor | None = None
+
+    @property
+    def worker_pool(self) -> ThreadPoolExecutor:
+        """Return the pool running subscriber callbacks, create it on first use"""
+        with self._subscriptions_lock:
+            if self._worker_pool is None:
+                self._worker_pool = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="EventStore"
+                )
+        return self._worker_pool
+
     def append(self, event_name: str, data: Any) -> None:  # pylint: disable=arguments-differ
         """Add data to the event store.
 
         `event_type` should be a string uniquely defining the type of event you add.
         `data` should be a Python object contaning the data you want to share.
+
+        The event is pushed to all matching subscribers after it has been stored.
         """
         event = Event(event_name, data)
-        return super().append(event)
+        super().append(event)
+        with self._subscriptions_lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription._deliver(event)  # pylint: disable=protected-access
+
+    def subscribe(  # pylint: disable=too-many-arguments
+        self,
+        event_name: str,
+        callback_or_queue: SubscriberType = None,
+        *,
+        data_filter_fn: Callable[[Any], bool] | None = None,
+        maxsize: int = 1000,
+        overflow: Overflow = Overflow.DROP_OLDEST,
+        block_timeout_s: float = 5.0,
+    ) -> Subscription:
+        """Push future events matching the specified name to a subscriber
+
+        `event_name` is a regular expression pattern, see match().
+
+        `callback_or_queue` [optional] if a callable, it is called with each
+        matching event on a worker thread. If a queue.Queue, matching events are
+        put in it. If left out, read the events from the returned subscription
+        with get(), drain() or the `events` property.
+
+        `maxsize` is the size of the subscriber's queue (ignored for user supplied
+        queues) and `overflow` decides what happens when it is full.
+        """
+        subscription = Subscription(
+            self,
+            event_name,
+            callback_or_queue,
+            data_filter_fn=data_filter_fn,
+            maxsize=maxsize,
+            overflow=overflow,
+            block_timeout_s=block_timeout_s,
+        )
+        with self._subscriptions_lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription, if it exists"""
+        with self._subscriptions_lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def close(self) -> None:
+        """Remove all subscriptions and shut down the pool running subscriber callbacks
+
+        Waits for the callbacks of events already published. A later subscription
+        with a callback starts a new pool.
+        """
+        with self._subscriptions_lock:
+            subscriptions = list(self._subscriptions)
+            self._subscriptions.clear()
+            worker_pool, self._worker_pool = self._worker_pool, None
+        if worker_pool is not None:
+            worker_pool.shutdown(wait=True)
+        for subscription in subscriptions:
+            subscription.active = False
 
     def match(
         self, event_name: str, data_filter_fn: Callable[[Any], bool] | None = None
@@ -0,0 +1,104 @@
+"""Keep the last steps of a session in memory, save them only on failure
+
+Every session records its states, actions, condition evaluations and
+browser console errors in a bounded ring. Nothing is written while things
+go well. When a state or action fails, or the session is aborted, the
+steps leading up to it are appended to
+OUTPUTDIR/flight_recorder/<session>.jsonl, one JSON object per line:
+first the reason, then the steps, oldest first.
+
+This makes it possible to run with `main.py run --quiet`, which only logs
+warnings and errors, and still see what happened before a failure.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple
+
+from app import LOGGER
+
+
+DEFAULT_STEPS = 200
+
+
+class FlightRecord(NamedTuple):
+    timestamp: float
+    kind: str  # state, action, condition, transition, error or console
+    name: str
+    result: str | None
+    duration_s: float | None
+    details: Dict[str, Any]
+
+
+class FlightRecorder:
+    """A bounded ring of records, flushed to a file on failure"""
+
+    def __init__(self, file_path: str, steps: int = DEFAULT_STEPS) -> None:
+        self.file_path: str = file_path
+        self.records: Deque[FlightRecord] = deque(maxlen=steps)
+        self.flush_count: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def steps(self) -> int:
+        return self.records.maxlen
+
+    @steps.setter
+    def steps(self, steps: int) -> None:
+        with self._lock:
+            self.records = deque(self.records, maxlen=steps)
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        result: Any = None,
+        duration_s: float | None = None,
+        **details: Any,
+    ) -> None:
+        if not self.records.maxlen:
+            return
+        self.records.append(
+            FlightRecord(
+                time.time(),
+                kind,
+                name,
+                None if result is None else str(result),
+                duration_s,
+                details,
+            )
+        )
+
+    def watch_page(self, page: Any) -> None:
+        """Record errors logged to the browser console and uncaught page errors"""
+
+        def on_console(message: Any) -> None:
+            if message.type == "error":
+                self.record("console", "console.error", text=message.text, url=page.url)
+
+        page.on("console", on_console)
+        page.on("pageerror", lambda error: self.record("console", "pageerror", text=str(error)))
+
+    def flush(self, reason: str) -> str | None:
+        """Append the recorded steps to the file and empty the ring. Return the file path."""
+        with self._lock:
+            records: List[FlightRecord] = list(self.records)
+            self.records.clear()
+        if not records:
+            return None
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        with open(self.file_path, "a") as recorder_file:
+            recorder_file.write(
+                json.dumps({"timestamp": time.time(), "reason": reason, "steps": len(records)})
+                + "\n"
+            )
+            for flight_record in records:
+                recorder_file.write(json.dumps(flight_record._asdict(), default=str) + "\n")
+        self.flush_count += 1
+        LOGGER.info("Saved the last %s steps to %s", len(records), self.file_path)
+        return self.file_path
@@ -0,0 +1,139 @@
+"""Implement compact latency histograms
+
+Durations are counted in fixed, logarithmically sized buckets, in the style
+of HDR histograms. Values are stored in microseconds. Values below 128 µs
+get a bucket each, above that every power of two is split into 64 buckets,
+so a reported percentile is never more than 1/64 (1.6%) off.
+
+Only the buckets that have been used are stored, which keeps a histogram
+small no matter how many values have been recorded.
+"""
+from __future__ import annotations
+
+import math
+
+from typing import Dict
+
+
+_SUB_BUCKET_BITS = 7
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS  # 128
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1  # 64
+
+
+def _bucket_index(value_us: int) -> int:
+    """Return the index of the bucket that counts value_us"""
+    if value_us < _SUB_BUCKET_COUNT:
+        return value_us
+    shift = value_us.bit_length() - _SUB_BUCKET_BITS
+    return (
+        _SUB_BUCKET_COUNT + (shift - 1) * _SUB_BUCKET_HALF + (value_us >> shift) - _SUB_BUCKET_HALF
+    )
+
+
+def _bucket_upper_bound(index: int) -> int:
+    """Return the highest value (in µs) counted by the bucket with this index"""
+    if index < _SUB_BUCKET_COUNT:
+        return index
+    shift = (index - _SUB_BUCKET_COUNT) // _SUB_BUCKET_HALF + 1
+    sub_bucket = (index - _SUB_BUCKET_COUNT) % _SUB_BUCKET_HALF + _SUB_BUCKET_HALF
+    return ((sub_bucket + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Count durations in fixed buckets, report percentiles"""
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.count: int = 0
+        self.total_us: int = 0
+        self.max_us: int = 0
+
+    def record(self, duration_s: float) -> None:
+        """Count a duration, in seconds"""
+        value_us = max(int(duration_s * 1_000_000), 0)
+        index = _bucket_index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.max_us = max(self.max_us, value_us)
+
+    @property
+    def max_s(self) -> float | None:
+        return self.max_us / 1_000_000 if self.count else None
+
+    @property
+    def mean_s(self) -> float | None:
+        return self.total_us / self.count / 1_000_000 if self.count else None
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the pct:th percentile in seconds, None if nothing has been recorded"""
+        if not self.count:
+            return None
+        rank = max(math.ceil(pct / 100 * self.count), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_upper_bound(index), self.max_us) / 1_000_000
+        return self.max_s
+
+    def count_at_or_below(self, value_s: float) -> int:
+        """Return the number of recorded values less than or equal to value_s
+
+        Values in the bucket that contains value_s are all counted.
+        """
+        last_index = _bucket_index(max(int(value_s * 1_000_000), 0))
+        return sum(count for index, count in list(self.counts.items()) if index <= last_index)
+
+    def merge(self, other: LatencyHistogram) -> None:
+        """Add the counts of another histogram to this one"""
+        for index, count in list(other.counts.items()):
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def copy(self) -> LatencyHistogram:
+        histogram = LatencyHistogram()
+        histogram.merge(self)
+        return histogram
+
+    def since(self, earlier: LatencyHistogram) -> LatencyHistogram:
+        """Return a histogram of the values recorded after `earlier` was copied from this one
+
+        The max value can't be subtracted, so it is an upper bound for the interval.
+        """
+        histogram = LatencyHistogram()
+        for index, count in list(self.counts.items()):
+            difference = count - earlier.counts.get(index, 0)
+            if difference > 0:
+                histogram.counts[index] = difference
+        histogram.count = self.count - earlier.count
+        histogram.total_us = self.total_us - earlier.total_us
+        if histogram.counts:
+            histogram.max_us = min(self.max_us, _bucket_upper_bound(max(histogram.counts)))
+        return histogram
+
+    def as_dict(self) -> Dict:
+        """Return a JSON serializable representation of the histogram"""
+        return {
+            "unit": "us",
+            "count": self.count,
+            "total": self.total_us,
+            "max": self.max_us,
+            "buckets": {
+                str(_bucket_upper_bound(index)): count
+                for index, count in sorted(list(self.counts.items()))
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> LatencyHistogram:
+        """Create a histogram from the output of as_dict()"""
+        histogram = cls()
+        for upper_bound, count in data["buckets"].items():
+            histogram.counts[_bucket_index(int(upper_bound))] = count
+        histogram.count = data["count"]
+        histogram.total_us = data["total"]
+        histogram.max_us = data["max"]
+        return histogram
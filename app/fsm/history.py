@@ -11,10 +11,16 @@ from app.fsm.transition import Transition
 # HELPER CLASSES
 #
 class AuditTrail:
-    """Save transitions in execution order"""
+    """Save transitions in execution order
+
+    `transitions` only holds the transitions that changed the state, while
+    `attempts` also holds the ones whose action failed. Replaying the
+    attempts repeats the session.
+    """
 
     def __init__(self) -> None:
         self.transitions = []
+        self.attempts = []
 
     @property
     def action_history(self) -> List[str]:
@@ -48,3 +54,11 @@ class AuditTrail:
                 f"You can only append Transition objects. You passed a {type(transition)}."
             )
         self.transitions.append(transition)
+
+    def attempt(self, transition: Transition) -> None:
+        """Save a transition that is about to be taken, whether its action passes or not"""
+        if not isinstance(transition, Transition):
+            raise ValueError(
+                f"You can only append Transition objects. You passed a {type(transition)}."
+            )
+        self.attempts.append(transition)
@@ -18,29 +18,39 @@ import random
 import time
 import traceback
 
+from collections import deque
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, Deque, List, Dict
 from pathlib import Path
 
 import app.pause_manager
+import app.sync
 
 from app import LOGGER, OUTPUTDIR, THREAD_LOCK, Page, Strategy
 from app.fsm.model_based_actor import ModelBasedActor
 from app.fsm.action import Action
+from app.fsm.condition import Condition
 from app.fsm.model import Model, NavigationStrategy, PathGenerator
 from app.fsm.history import AuditTrail
 from app.fsm.results import Result, SessionSummary
 from app.fsm.state import State
 from app.fsm.transition import Transition
+from app.coverage_board import CoverageBoard
+from app.coverage_target import CoverageTarget, GlobalCoverage, coverage_percentages
+from app.flight_recorder import FlightRecorder
+from app.journal import JOURNAL
 from app.logger import CsvFileLogger
+from app.memory_tracker import MemoryTracker
 from app.properties import running_in_docker
+from app.rate_limiter import RATE_LIMITER
+from app.tracer import TRACER
 from app.util import safe_file_name
 
 
 ##################
 # HELPER CLASSES
 #
-class RunOptions:  # pylint: disable=too-few-public-methods
+class RunOptions:  # pylint: disable=too-few-public-methods, too-many-instance-attributes
     """Keep settings for run configuration"""
 
     def __init__(
@@ -50,12 +60,19 @@ class RunOptions:  # pylint: disable=too-few-public-methods
         stop_on_fail: bool = False,
         stop_at_state: str | None = None,
         strategy: Strategy = Strategy.SmartRandom,
+        *,
+        coverage_target: CoverageTarget | None = None,
+        saturation_transitions: int = -1,
+        saturation_s: float = -1,
     ) -> None:
         self.max_run_time_s = max_run_time_s
         self.max_transitions = max_transitions
         self.stop_on_fail = stop_on_fail
         self.stop_at_state = stop_at_state
         self.strategy = strategy
+        self.coverage_target = coverage_target
+        self.saturation_transitions = saturation_transitions
+        self.saturation_s = saturation_s
 
     def as_dict(self) -> Dict:
         return self.__dict__
@@ -67,7 +84,7 @@ class RunOptions:  # pylint: disable=too-few-public-methods
 class Machine:  # pylint: disable=too-many-instance-attributes
     """Implement a Finite State Machine"""
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-statements
         self,
         actor: ModelBasedActor,
         max_run_time_s: int = -1,
@@ -75,25 +92,64 @@ class Machine:  # pylint: disable=too-many-instance-attributes
         stop_on_fail: bool = False,
         stop_at_state: str | None = None,
         strategy: Strategy = Strategy.FullCoverage,
+        *,
+        seed: int | None = None,
+        coverage_target: CoverageTarget | None = None,
+        saturation_transitions: int = -1,
+        saturation_s: float = -1,
     ) -> None:
         # Init - from args:
         self.run_options = RunOptions(
-            max_run_time_s, max_transitions, stop_on_fail, stop_at_state, strategy
+            max_run_time_s,
+            max_transitions,
+            stop_on_fail,
+            stop_at_state,
+            strategy,
+            coverage_target=coverage_target,
+            saturation_transitions=saturation_transitions,
+            saturation_s=saturation_s,
         )
+        # Use a random generator of our own, so that runs can be reproduced from the seed:
+        self.seed: int = seed if seed is not None else random.SystemRandom().randrange(2**32)
+        self.random = random.Random(self.seed)
         self.audit_trail = AuditTrail()
         self.browser_page: Page | None = None
         self.error_msg: str = ""
+        self.first_failure: str = ""
         self.actor: ModelBasedActor = actor
         self.model: Model = actor.model
         self.start_time: int | None = None
+        # True from start until the session has finished, stopped or aborted:
+        self.running: bool = False
         self.summary: SessionSummary = SessionSummary(self.model)
         filename = safe_file_name(str(Path(OUTPUTDIR) / f"{self.actor.name}.log.csv"))
         field_names = ("Timestamp", "Type", "Name", "Result")
         self.log_file = CsvFileLogger(filename, field_names)
+        self.flight_recorder = FlightRecorder(
+            safe_file_name(str(Path(OUTPUTDIR) / "flight_recorder" / f"{self.actor.name}.jsonl"))
+        )
 
         # Init other variables:
         self._current_state: State | None = None
+        self.current_action: Action | None = None
+        self.memory_tracker: MemoryTracker | None = None
+        # Transition name -> the last earlier run it was covered in (see the coverage store):
+        self.coverage_history: Dict[str, int] | None = None
+        self.coverage_board: CoverageBoard | None = None
+        # A coverage target for all sessions of the run (see COVERAGE_TARGET):
+        self.global_coverage: GlobalCoverage | None = None
+        # Saturation - the coverage count, and when it last grew:
+        self._covered_count: int = 0
+        self._last_gain_attempts: int = 0
+        self._last_gain_time: float = 0
+        self._stop_requested: bool = False
         self._predetermined_path: PathGenerator | None = None
+        # Replay (see follow()):
+        self.pacing: bool = True
+        self.step_callback: Callable[[int, Transition], None] | None = None
+        self.replay_diverged: bool = False
+        self._replay_path: List[str] | None = None
+        self._replay_position: int = 0
         if strategy == Strategy.ShortestPath:
             self._predetermined_path = self.model.shortest_path(
                 self.model.initial_state.name, stop_at_state
@@ -114,7 +170,78 @@ class Machine:  # pylint: disable=too-many-instance-attributes
         # TODO: Validate state
         self._current_state = new_state
 
+    @property
+    def throttled_s(self) -> float:
+        """Return the time spent waiting for the rate limiter"""
+        return self.summary.time_breakdown.seconds["throttled"]
+
+    def _wait_while_paused(self) -> None:
+        pause_start = time.monotonic()
+        while app.pause_manager.is_paused():
+            time.sleep(0.5)
+        self.summary.time_breakdown.add("pause", time.monotonic() - pause_start)
+
+    def _pacing_wait(self) -> None:
+        """Let other threads run, if needed"""
+        if self.has_browser and self.pacing:
+            pacing_start = time.monotonic()
+            self.browser_page.wait_for_timeout(100)
+            self.summary.time_breakdown.add("pacing", time.monotonic() - pacing_start)
+
+    def follow(self, transition_names: List[str], seed: int | None = None) -> None:
+        """Replay: take exactly these transitions, by name, then stop
+
+        Time and transition limits are switched off. If a transition is not
+        allowed when its turn comes, the replay stops and `replay_diverged`
+        is set.
+        """
+        self._replay_path = list(transition_names)
+        self._replay_position = 0
+        self.replay_diverged = False
+        self.run_options.max_run_time_s = -1
+        self.run_options.max_transitions = -1
+        self.run_options.coverage_target = None
+        self.run_options.saturation_transitions = -1
+        self.run_options.saturation_s = -1
+        self.global_coverage = None
+        if seed is not None:
+            self.seed = seed
+            self.random = random.Random(seed)
+
+    def _next_replay_outbound(self, outbounds: List[Transition]) -> Transition | None:
+        if self._replay_position >= len(self._replay_path):
+            LOGGER.info("ℹ️  Replay finished after %s transitions", self._replay_position)
+            self.stop()
+            return None
+        name = self._replay_path[self._replay_position]
+        outbound = next((ob for ob in outbounds if ob.name == name), None)
+        if outbound is None:
+            self.replay_diverged = True
+            self.error_msg = (
+                f"Replay diverged at step {self._replay_position + 1}: "
+                f'{name} is not allowed in state "{self.current_state.name}"'
+            )
+            LOGGER.warning("⚠️  %s Stopping...", self.error_msg)
+            self.stop()
+            return None
+        self._replay_position += 1
+        if self.step_callback:
+            self.step_callback(self._replay_position, outbound)  # pylint: disable=not-callable
+        return outbound
+
+    def stop(self) -> None:
+        """Ask the machine to stop after the current step
+
+        If an action of the machine is waiting on a barrier, semaphore or
+        latch, the wait returns False right away.
+        """
+        self._stop_requested = True
+        app.sync.wake_all()
+
     def _should_continue(self) -> bool:
+        if self._stop_requested:
+            LOGGER.info("ℹ️  Stop requested! Stopping...")
+            return False
         if self.run_options.max_run_time_s > 0:
             duration = time.time() - self.start_time
             if duration > self.run_options.max_run_time_s:
@@ -127,11 +254,61 @@ class Machine:  # pylint: disable=too-many-instance-attributes
         if self.current_state.name == self.run_options.stop_at_state:
             LOGGER.info("ℹ️  End state reached! Stopping...")
             return False
-
-        # TODO: Check configured strategy, break when we
-        #       have reached 100% coverage, if FullCoverage
+        return self._check_coverage()
+
+    def _check_coverage(self) -> bool:
+        """Return False if a coverage target is reached, or if coverage has stopped growing"""
+        results = self.summary.results
+        covered = len(results.states) + len(results.actions) + len(results.transitions)
+        attempts = len(self.audit_trail.attempts)
+        now = time.monotonic()
+        if covered > self._covered_count or not self._last_gain_time:
+            self._covered_count = covered
+            self._last_gain_attempts = attempts
+            self._last_gain_time = now
+            target = self.run_options.coverage_target
+            reached = target.reached(coverage_percentages(self.summary)) if target else ""
+            if reached:
+                LOGGER.info("ℹ️  Coverage target reached (%s)! Stopping...", reached)
+                return False
+        # Other sessions may have reached the global target without us covering anything new:
+        if self.global_coverage and self.global_coverage.update():
+            LOGGER.info(
+                "ℹ️  Coverage target for all sessions reached (%s)! Stopping...",
+                self.global_coverage.reached,
+            )
+            return False
+        saturation_transitions = self.run_options.saturation_transitions
+        if 0 < saturation_transitions <= attempts - self._last_gain_attempts:
+            LOGGER.info(
+                "ℹ️  No new coverage in %s transitions! Stopping...", saturation_transitions
+            )
+            return False
+        if 0 < self.run_options.saturation_s <= now - self._last_gain_time:
+            LOGGER.info(
+                "ℹ️  No new coverage in %s seconds! Stopping...", self.run_options.saturation_s
+            )
+            return False
         return True
 
+    def _check_memory(self) -> bool:
+        """Return False if the session has exceeded its memory budget"""
+        transitions = self.summary.total_transitions_visits_count
+        if self.memory_tracker.check(transitions):
+            return True
+        self.error_msg = (
+            f"Memory budget exceeded after {transitions} transitions: "
+            f"{self.memory_tracker.traced_bytes // 2**20} MB traced"
+        )
+        LOGGER.warning("⚠️  %s Stopping...", self.error_msg)
+        self.flight_recorder.flush(self.error_msg)
+        return False
+
+    def _record_failure(self, description: str) -> None:
+        if not self.first_failure:
+            self.first_failure = description
+        self.flight_recorder.flush(description)
+
     def _handle_exception(self, exc: Exception, what_failed: State | Action):
         # Get traceback info:
         tb = exc.__traceback__.tb_next  # pylint: disable=invalid-name
@@ -144,6 +321,7 @@ class Machine:  # pylint: disable=too-many-instance-attributes
             file_name_prefix = what_failed.fn_name.replace(" ", "_")
             log_message_prefix = f"Action {file_name_prefix}()"
 
+        file_name = line_no = None
         if tb:
             line_no = tb.tb_lineno
             file_name = os.path.relpath(tb.tb_frame.f_code.co_filename)
@@ -157,6 +335,14 @@ class Machine:  # pylint: disable=too-many-instance-attributes
             )
         else:
             LOGGER.error('"%s": ❌ ERROR: %s failed', self.current_state.name, log_message_prefix)
+        self.flight_recorder.record(
+            "error",
+            what_failed.name,
+            exc.__class__.__name__,
+            message=str(exc),
+            file=file_name,
+            line=line_no,
+        )
         LOGGER.error(
             '"%s":    \'-- [%s] Message: %s\n%s',
             self.current_state.name,
@@ -183,14 +369,11 @@ class Machine:  # pylint: disable=too-many-instance-attributes
     def _get_allowed_outbounds(self, state: State) -> List[Transition]:
         # Get outbound transitions and filter them according to
         # each associated condition function (if any):
-        condition_args = [self.browser_page]
         outbounds = []
         for outbound in state.outbounds:
             if outbound.condition and callable(outbound.condition.fn):
-                # Run the condition function, allow the outbound if the
-                # condition function returns True:
-                condition_result = outbound.condition.fn(*condition_args)
-                if condition_result is True:
+                # Allow the outbound if the condition function returns True:
+                if self._check_condition(outbound.condition):
                     outbounds.append(outbound)
             else:
                 # If the outbound does not have a condition, it is
@@ -198,10 +381,36 @@ class Machine:  # pylint: disable=too-many-instance-attributes
                 outbounds.append(outbound)
         return outbounds
 
-    def _get_outbound(self, outbounds: List[Transition]) -> Transition | None:
+    def _check_condition(self, condition: Condition) -> bool:
+        """Run the condition function, return True if it allows its transition"""
+        span = TRACER.begin(condition.name, "condition")
+        condition_start = time.monotonic()
+        condition_result = condition.fn(self.browser_page)
+        condition_duration_s = time.monotonic() - condition_start
+        TRACER.end(span, result=condition_result)
+        self.summary.record_visit(condition, None, condition_duration_s)
+        self.flight_recorder.record(
+            "condition", condition.name, condition_result, condition_duration_s
+        )
+        JOURNAL.record(
+            self.actor.name,
+            "condition",
+            condition.name,
+            result=condition_result is True,
+            duration_s=condition_duration_s,
+        )
+        self.summary.time_breakdown.add("conditions", condition_duration_s)
+        return condition_result is True
+
+    def _get_outbound(  # pylint: disable=too-many-branches
+        self, outbounds: List[Transition]
+    ) -> Transition | None:
         # Apply selected strategy when selecting what to do next:
         outbound = None
 
+        if self._replay_path is not None:
+            return self._next_replay_outbound(outbounds)
+
         if self.run_options.strategy == Strategy.ShortestPath:
             try:
                 next_state_name = next(self._predetermined_path)
@@ -221,28 +430,41 @@ class Machine:  # pylint: disable=too-many-instance-attributes
             if not candidates:
                 transitions = self.summary.unvisited_transitions
                 candidates = [cand for cand in candidates if cand in transitions]
-            outbound = random.choice(candidates)
+            outbound = self.random.choice(candidates)
             # fmt: on
 
         if self.run_options.strategy == Strategy.PureRandom:
             # Pick any outbound transition:
-            outbound: Transition = random.choice(outbounds)
+            outbound: Transition = self.random.choice(outbounds)
 
         if self.run_options.strategy in (Strategy.SmartRandom, Strategy.Random):
             # Pick an unvisited transition, if any. If not,
             # pick randomly between all outbounds:
             candidates: List[Transition] = []
-            for transition in self.summary.unvisited_transitions:
-                if transition.start_state == self.current_state and transition in outbounds:
-                    candidates.append(transition)
+            if self.coverage_board:
+                # Pick a transition that no session sharing the board has taken, if any:
+                candidates = [ob for ob in outbounds if not self.coverage_board.is_covered(ob.name)]
+            if not candidates:
+                for transition in self.summary.unvisited_transitions:
+                    if transition.start_state == self.current_state and transition in outbounds:
+                        candidates.append(transition)
+            if not candidates:
+                # Nothing left to cover here, head for the nearest state that has:
+                candidates = self._frontier_outbounds(outbounds)
+            if candidates and self.coverage_history:
+                # Prefer the ones that have not been covered for the most runs:
+                last_runs = {cand: self.coverage_history.get(cand.name, -1) for cand in candidates}
+                oldest = min(last_runs.values())
+                candidates = [cand for cand in candidates if last_runs[cand] == oldest]
             if len(candidates) == 0:
                 candidates = outbounds
             if candidates:
-                outbound: Transition = random.choice(candidates)
+                outbound: Transition = self.random.choice(candidates)
 
         elif self.run_options.strategy == Strategy.FullCoverage:
             # Strive for full coverage, pick a transition that will
-            # yield the highest coverage at this point:
+            # yield the highest coverage at this point. When implemented,
+            # it should consult self.coverage_board like SmartRandom does:
             raise NotImplementedError(
                 "FullCoverage is not implemented yet, "
                 "please select PureRandom or SmartRandom "
@@ -251,9 +473,51 @@ class Machine:  # pylint: disable=too-many-instance-attributes
 
         return outbound
 
+    def _frontier_outbounds(self, outbounds: List[Transition]) -> List[Transition]:
+        """Return the first step towards the nearest state with transitions left to cover, if any"""
+        visited = self.summary.results.transitions
+        if self.coverage_board:
+            covered = self.coverage_board.covered
+            if len(covered) < len(self.model.transitions):
+                step = self._first_step_towards(outbounds, lambda trns: trns.name not in covered)
+                if step:
+                    return [step]
+        if len(visited) < len(self.model.transitions):
+            step = self._first_step_towards(outbounds, lambda trns: trns.name not in visited)
+            if step:
+                return [step]
+        return []
+
+    def _first_step_towards(
+        self, outbounds: List[Transition], is_open: Callable[[Transition], bool]
+    ) -> Transition | None:
+        """Find the nearest state with an open outbound transition (breadth-first)
+
+        Only the first step must be allowed now. Conditions further down the
+        path are unknown, so the path is planned again at every step.
+        """
+        # State name -> the outbound transition that the path to the state starts with:
+        first_steps: Dict[str, Transition] = {self.current_state.name: None}
+        queue: Deque[State] = deque()
+        # Shuffle, so that the seed decides between frontier states at the same distance:
+        for outbound in self.random.sample(outbounds, len(outbounds)):
+            if outbound.end_state.name not in first_steps:
+                first_steps[outbound.end_state.name] = outbound
+                queue.append(outbound.end_state)
+        while queue:
+            state = queue.popleft()
+            if any(is_open(transition) for transition in state.outbounds):
+                return first_steps[state.name]
+            for transition in state.outbounds:
+                if transition.end_state.name not in first_steps:
+                    first_steps[transition.end_state.name] = first_steps[state.name]
+                    queue.append(transition.end_state)
+        return None
+
     def _execute_state(self, state: State) -> Result:
         # Init:
         state_result: Result = Result.NOT_APPLICABLE
+        state_duration_s: float | None = None
 
         # Update state pointer:
         self.current_state = state
@@ -261,10 +525,11 @@ class Machine:  # pylint: disable=too-many-instance-attributes
         # Run the associated state function, if it exists:
         if self.current_state.fn:
             # Do not run the state fn while pause is requested:
-            while app.pause_manager.is_paused():
-                time.sleep(0.5)
+            self._wait_while_paused()
 
             # OK, continue:
+            span = TRACER.begin(state.name, "state")
+            state_start = time.monotonic()
             try:
                 state_args = []
                 for parameter in inspect.signature(state.fn).parameters.values():
@@ -289,12 +554,21 @@ class Machine:  # pylint: disable=too-many-instance-attributes
                 # Catch any error potentially thrown by the state function
                 self._handle_exception(exc, self.current_state)
                 state_result = Result.FAILED
+            state_duration_s = time.monotonic() - state_start
+            TRACER.end(span, result=state_result)
+            self.summary.time_breakdown.add("states", state_duration_s)
         else:
             LOGGER.info('"%s": No function to run', self.current_state.name)
 
         # Record result:
-        self.summary.record_visit(self.current_state, state_result)
+        self.summary.record_visit(self.current_state, state_result, state_duration_s)
         self.log_file.info('"state","%s","%s"', self.current_state.name, state_result)
+        self.flight_recorder.record("state", state.name, state_result, state_duration_s)
+        JOURNAL.record(
+            self.actor.name, "state", state.name, result=state_result, duration_s=state_duration_s
+        )
+        if state_result == Result.FAILED:
+            self._record_failure(f'State "{state.name}" failed')
 
         # Return:
         return state_result
@@ -332,10 +606,12 @@ class Machine:  # pylint: disable=too-many-instance-attributes
         action_result = Result.NOT_APPLICABLE
 
         # Do not run the action fn while pause is requested:
-        while app.pause_manager.is_paused():
-            time.sleep(0.5)
+        self._wait_while_paused()
 
         # OK, continue:
+        span = TRACER.begin(action.name, "action")
+        self.current_action = action
+        action_start = time.monotonic()
         try:
             action.fn(*action_args)
             action_result = Result.PASSED
@@ -348,11 +624,48 @@ class Machine:  # pylint: disable=too-many-instance-attributes
             self._handle_exception(exc, action)
             action_result = Result.FAILED
 
-        self.summary.record_visit(action, action_result)
+        action_duration_s = time.monotonic() - action_start
+        self.current_action = None
+        TRACER.end(span, result=action_result)
+        self.summary.record_visit(action, action_result, action_duration_s)
+        self.summary.time_breakdown.add("actions", action_duration_s)
         self.log_file.info('"action","%s","%s"', action.name, action_result)
+        self.flight_recorder.record(
+            "action", action.name, action_result, action_duration_s, state=self.current_state.name
+        )
+        JOURNAL.record(
+            self.actor.name,
+            "action",
+            action.name,
+            result=action_result,
+            duration_s=action_duration_s,
+        )
+        if action_result == Result.FAILED:
+            self._record_failure(f"Action {action.fn_name}() failed")
 
         return action_result
 
+    def _throttle_changed_condition(self, outbound: Transition) -> bool:
+        """Wait for the rate limiter, return True if the condition is no longer True
+
+        The lock is released while waiting, so other sessions may have
+        changed what the condition of the transition depends on.
+        """
+        throttled_s = RATE_LIMITER.acquire(outbound.action.name, while_waiting=THREAD_LOCK.released)
+        self.summary.time_breakdown.add("throttled", throttled_s)
+        if not throttled_s or not outbound.condition or not callable(outbound.condition.fn):
+            return False
+        if self._check_condition(outbound.condition):
+            return False
+        THREAD_LOCK.annotate("(condition changed while throttled)")
+        LOGGER.info(
+            '"%s": [%s] is no longer True after waiting for the rate limit, skipping %s()',
+            self.current_state.name,
+            outbound.condition.name,
+            outbound.action.fn_name,
+        )
+        return True
+
     def save_screenshot(self, file_name_prefix: str = "") -> str:
         """Saves a screenshot. Returns the file name of the image."""
         # Save a screenshot:
@@ -366,7 +679,35 @@ class Machine:  # pylint: disable=too-many-instance-attributes
         """Run the state machine"""
         # Init:
         self.start_time = time.time()
+        session_span = TRACER.begin(self.actor.name, "session", seed=self.seed)
+        if self.memory_tracker:
+            self.memory_tracker.start()
+        JOURNAL.record(self.actor.name, "session_start", str(self.seed))
+
+        self.running = True
+        try:
+            with app.sync.stop_waits_when(lambda: self._stop_requested):
+                self._main_loop()
+        except BaseException as exc:
+            # Save the steps leading up to the abort, then let the caller handle it:
+            self.flight_recorder.flush(f"Session aborted: [{exc.__class__.__name__}] {exc}")
+            TRACER.end(
+                session_span,
+                transitions=self.summary.total_transitions_visits_count,
+                aborted=exc.__class__.__name__,
+            )
+            raise
+        finally:
+            self.summary.duration = time.time() - self.start_time
+            self.running = False
+
+        # Wrap-up:
+        JOURNAL.record(
+            self.actor.name, "session_end", self.error_msg, duration_s=self.summary.duration
+        )
+        TRACER.end(session_span, transitions=self.summary.total_transitions_visits_count)
 
+    def _main_loop(self):
         # Set start state:
         self._execute_state(self.model.initial_state)
 
@@ -383,7 +724,9 @@ class Machine:  # pylint: disable=too-many-instance-attributes
                 break
 
             # Aquire lock:
-            THREAD_LOCK.acquire()  # pylint: disable=consider-using-with
+            lock_start = time.monotonic()
+            THREAD_LOCK.acquire(holder=self.actor.name)  # pylint: disable=consider-using-with
+            self.summary.time_breakdown.add("lock", time.monotonic() - lock_start)
             try:
                 # Get all outbounds that fulfil their conditions:
                 outbounds = self._get_allowed_outbounds(self.current_state)
@@ -393,11 +736,23 @@ class Machine:  # pylint: disable=too-many-instance-attributes
                 # If we didn't get any outbound transition,
                 # skip to next loop of the main loop:
                 if not outbound:
+                    THREAD_LOCK.annotate("(no allowed outbound)")
+                    pacing_start = time.monotonic()
                     time.sleep(0.10)  # 100 ms sleep
+                    self.summary.time_breakdown.add("pacing", time.monotonic() - pacing_start)
+                    continue
+
+                # Wait here if running the action now would exceed the rate limit,
+                # and let the other sessions run meanwhile:
+                if outbound.action and self._throttle_changed_condition(outbound):
                     continue
 
                 # Running the action function, if it exists:
+                self.audit_trail.attempt(outbound)
+                if self.coverage_board:
+                    self.coverage_board.cover(outbound.name, self.actor.name)
                 action_result = None
+                THREAD_LOCK.annotate(outbound.action.fn_name if outbound.action else "(no action)")
                 if outbound.action:
                     cond = outbound.condition
                     condition_info = f" - [{cond.name}] was True" if cond else ""
@@ -422,6 +777,8 @@ class Machine:  # pylint: disable=too-many-instance-attributes
             outbound_result = action_result if action_result else Result.NOT_APPLICABLE
             self.summary.record_visit(outbound, outbound_result)
             self.log_file.info('"outbound","%s","%s"', outbound.name, outbound_result)
+            self.flight_recorder.record("transition", outbound.name, outbound_result)
+            JOURNAL.record(self.actor.name, "transition", outbound.name, result=outbound_result)
 
             # Fail fast, if required by user:
             if self.run_options.stop_on_fail and action_result == Result.FAILED:
@@ -441,8 +798,7 @@ class Machine:  # pylint: disable=too-many-instance-attributes
                 self.audit_trail.append(outbound)
 
             # Let other threads run, if needed:
-            if self.has_browser:
-                self.browser_page.wait_for_timeout(100)
+            self._pacing_wait()
 
             # Run state function, if it exists:
             state_result = self._execute_state(self.current_state)
@@ -450,9 +806,9 @@ class Machine:  # pylint: disable=too-many-instance-attributes
             if self.run_options.stop_on_fail and state_result == Result.FAILED:
                 break
 
-            # Let other threads run, if needed:
-            if self.has_browser:
-                self.browser_page.wait_for_timeout(100)
+            # Keep track of memory, if required by user:
+            if self.memory_tracker and not self._check_memory():
+                break
 
-        # Wrap-up:
-        self.summary.duration = time.time() - self.start_time
+            # Let other threads run, if needed:
+            self._pacing_wait()
@@ -91,7 +91,11 @@ class ModelRowParts:
 
 
 class Model:
-    """Holds a potentially runnable model with states, actions and transitions"""
+    """Holds a potentially runnable model with states, actions and transitions
+
+    Once built, a model is static and may be shared by many sessions. Keep
+    runtime state in the Machine executing the model, not in the model.
+    """
 
     def __init__(self, name: str = "") -> None:
         self.name = name
@@ -142,10 +146,10 @@ class Model:
         return dijkstra.shortest_path(start_state_name, end_state_name)
 
     def to_digraph(  # pylint: disable=too-many-locals
-        self, result_summary: SessionSummary | None = None
+        self, result_summary: SessionSummary | None = None, label: str | None = None
     ) -> graphviz.Digraph:
         digraph: graphviz.Digraph = graphviz.Digraph()
-        digraph.attr(label=rf"&#10;&#10;{self.name}")
+        digraph.attr(label=rf"&#10;&#10;{self.name if label is None else label}")
         digraph.attr(bgcolor=Color.Light)
 
         # First node:
@@ -10,14 +10,74 @@ from __future__ import annotations
 
 import os
 
+from threading import Lock
 from types import ModuleType
-from typing import Any
+from typing import Any, Callable, Dict, Tuple
 
 from app.fsm.model import Model
-from app.parser import FileParser
+from app.model_cache import MODEL_CACHE
 from app.actor import Actor
 
 
+##################
+# MODEL REGISTRY
+#
+class ModelRegistry:
+    """Hand out one compiled model per actor, shared by all sessions in the process
+
+    A compiled model is the parsed model with its condition, action and state
+    functions bound. It is static: sessions keep all their runtime state
+    (current state, results, audit trail) in their own Machine object.
+    A model file that is edited during the run is compiled again.
+    """
+
+    def __init__(self) -> None:
+        # (model path, module ids) -> (modification time of the model file, modules, model):
+        self._models: Dict[Tuple[str, ...], Tuple[str, Tuple[Any, ...], Model]] = {}
+        self._lock = Lock()
+
+    def get(
+        self, model_path: str, modules: Tuple[Any, ...], compile_fn: Callable[[], Model]
+    ) -> Model:
+        """Return the model compiled from the model file and modules
+
+        Compile the model with compile_fn() on first request, and again when
+        the model file has been modified. The new model replaces the old one.
+        """
+        try:
+            modified = str(os.stat(model_path).st_mtime_ns)
+        except OSError:
+            modified = ""
+        key = (model_path, *(str(id(module)) for module in modules))
+        with self._lock:
+            entry = self._models.get(key)
+            # Keeping references to the modules guarantees that their ids are not reused:
+            if (
+                entry is None
+                or entry[0] != modified
+                or any(a is not b for a, b in zip(entry[1], modules))
+            ):
+                entry = (modified, modules, compile_fn())
+                self._models[key] = entry
+        return entry[2]
+
+    def clear(self) -> None:
+        """Forget all compiled models"""
+        with self._lock:
+            self._models.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._models)
+
+
+# Create global model registry:
+MODEL_REGISTRY = ModelRegistry()
+
+
+##########
+# ACTORS
+#
 class ModelBasedActor(Actor):  # pylint: disable=too-many-instance-attributes
     def __init__(self, *, actor_module: ModuleType, name: str = "", config: Any = None) -> None:
         super().__init__(actor_module=actor_module, config=config)
@@ -40,10 +100,8 @@ class ModelBasedActor(Actor):  # pylint: disable=too-many-instance-attributes
         self._build()
 
     def _build(self) -> None:
-        """Construct the model from supplied modules"""
+        """Get the compiled model for the supplied modules from the model registry"""
         # Get model, action functions and state functions from the actor module:
-        file_parser = FileParser()
-
         actor_module_dir = os.path.dirname(os.path.relpath(self.actor_module.__file__, os.getcwd()))
         model_file_path = f"{actor_module_dir}/model"
         if not os.path.exists(model_file_path):
@@ -55,34 +113,49 @@ class ModelBasedActor(Actor):  # pylint: disable=too-many-instance-attributes
             self._actions_module = getattr(self.actor_module, "actions")
         if hasattr(self.actor_module, "states"):
             self._states_module = getattr(self.actor_module, "states")
+        self._model_file_path = (
+            f"{os.path.dirname(os.path.abspath(self.actor_module.__file__))}/model"
+        )
 
-        # Parse the model file, will raise a ParseError
-        # if there are syntax errors:
-        model_path = f"{os.path.dirname(os.path.abspath(self.actor_module.__file__))}/model"
-        self.model = file_parser.parse(model_path)
-        self.model.name = self.actor_module.__name__.replace("tests.actors.", "")
+        # Sessions using the same modules share the same model:
+        modules = (
+            self.actor_module,
+            self._conditions_module,
+            self._actions_module,
+            self._states_module,
+        )
+        self.model = MODEL_REGISTRY.get(self._model_file_path, modules, self._compile)
+
+    def _compile(self) -> Model:
+        """Construct the model from supplied modules"""
+        # Parse the model file (or get it from the model cache),
+        # will raise a ParseError if there are syntax errors:
+        model = MODEL_CACHE.parse(self._model_file_path)
+        model.name = self.actor_module.__name__.replace("tests.actors.", "")
 
         # Add condition hooks:
-        for name, condition in self.model.conditions.items():
+        for name, condition in model.conditions.items():
             condition_fn_name = self._fn_name_from_name(name)
             if hasattr(self._conditions_module, condition_fn_name):
                 condition.fn = getattr(self._conditions_module, condition_fn_name)
             # TODO: Error / warning if fn is missing?
 
         # Add action hooks:
-        for name, action in self.model.actions.items():
+        for name, action in model.actions.items():
             action_fn_name = self._fn_name_from_name(name)
             if hasattr(self._actions_module, action_fn_name):
                 action.fn = getattr(self._actions_module, action_fn_name)
             # TODO: Error / warning if fn is missing?
 
         # Add state hooks:
-        for name, state in self.model.states.items():
+        for name, state in model.states.items():
             state_fn_name = self._fn_name_from_name(name)
             if hasattr(self._states_module, state_fn_name):
                 state.fn = getattr(self._states_module, state_fn_name)
             # TODO: Error / warning if fn is missing?
 
+        return model
+
     @staticmethod
     def _fn_name_from_name(name: str) -> str:
         """Convert a name with mixed case and spaces into a snake case name"""
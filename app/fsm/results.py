@@ -5,6 +5,8 @@ from enum import Enum, auto
 from typing import List, Dict, Tuple, TYPE_CHECKING
 
 from app.fsm.action import Action
+from app.fsm.condition import Condition
+from app.fsm.histogram import LatencyHistogram
 from app.fsm.state import State
 from app.fsm.transition import Transition
 
@@ -45,6 +47,7 @@ class VisitsAndResults:
     def __init__(self) -> None:
         self._visits_count: int = 0
         self._results: List[Result] = []
+        self.durations: LatencyHistogram = LatencyHistogram()
 
     @property
     def visits_count(self) -> int:
@@ -84,11 +87,13 @@ class VisitsAndResults:
     def pass_count(self) -> int:
         return self._result_count(Result.PASSED)
 
-    def record_visit(self, result: Result | None = None) -> None:
-        """Count the visit and record a result, if provided"""
+    def record_visit(self, result: Result | None = None, duration_s: float | None = None) -> None:
+        """Count the visit and record a result and duration, if provided"""
         self._visits_count += 1
         if result:
             self._results.append(result)
+        if duration_s is not None:
+            self.durations.record(duration_s)
 
     def has_result(self, result_type: Result) -> bool:
         """Return True if there is at least one result of the provided type, False otherwise"""
@@ -106,6 +111,43 @@ class Results:
         self.actions: Dict[str, VisitsAndResults] = dict()
         self.states: Dict[str, VisitsAndResults] = dict()
         self.transitions: Dict[str, VisitsAndResults] = dict()
+        self.conditions: Dict[str, VisitsAndResults] = dict()
+
+
+class TimeBreakdown:
+    """Account the wall time of a session per category
+
+    Time not accounted to any category is spent in the engine itself.
+    """
+
+    CATEGORIES = (
+        ("actions", "Action functions"),
+        ("states", "State functions"),
+        ("conditions", "Condition functions"),
+        ("pacing", "Pacing waits"),
+        ("lock", "Waiting for lock"),
+        ("pause", "Paused"),
+        ("throttled", "Throttled"),
+    )
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {category: 0.0 for category, _ in self.CATEGORIES}
+
+    def add(self, category: str, seconds: float) -> None:
+        self.seconds[category] += seconds
+
+    def engine_s(self, duration: float) -> float:
+        """Return the time spent in the engine, out of a total duration"""
+        return max(duration - sum(self.seconds.values()), 0.0)
+
+    def rows(self, duration: float) -> List[Tuple[str, float, int]]:
+        """Return (description, seconds, percentage of duration) for all categories"""
+        items = [(description, self.seconds[category]) for category, description in self.CATEGORIES]
+        items.append(("Engine", self.engine_s(duration)))
+        return [
+            (description, seconds, round(100 * seconds / duration) if duration > 0 else 0)
+            for description, seconds in items
+        ]
 
 
 class SessionSummary:
@@ -115,10 +157,11 @@ class SessionSummary:
         self.model = model
         self.results = Results()
         self.duration: float = 0
+        self.time_breakdown = TimeBreakdown()
 
     @property
     def total_transitions_visits_count(self) -> int:
-        return sum([trns.visits_count for trns in self.results.transitions.values()])
+        return sum(trns.visits_count for trns in list(self.results.transitions.values()))
 
     @property
     def actions_count(self) -> int:
@@ -213,8 +256,13 @@ class SessionSummary:
         visited_transitions = self.results.transitions.keys()
         return (trns for name, trns in items if name not in visited_transitions)
 
-    def record_visit(self, obj: Action | State | Transition, result: Result) -> None:
-        """Store visits and results for actions, states and transitions"""
+    def record_visit(
+        self,
+        obj: Action | State | Transition | Condition,
+        result: Result | None,
+        duration_s: float | None = None,
+    ) -> None:
+        """Store visits, results and durations for actions, states, transitions and conditions"""
         object_collection: Dict[str, VisitsAndResults] = None
         # Pick the right collection to work with:
         if isinstance(obj, Action):
@@ -223,6 +271,8 @@ class SessionSummary:
             object_collection = self.results.states
         elif isinstance(obj, Transition):
             object_collection = self.results.transitions
+        elif isinstance(obj, Condition):
+            object_collection = self.results.conditions
         else:
             return
 
@@ -231,4 +281,4 @@ class SessionSummary:
             object_collection[obj.name] = VisitsAndResults()
 
         # Record result:
-        object_collection[obj.name].record_visit(result)
+        object_collection[obj.name].record_visit(result, duration_s)
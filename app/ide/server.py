@@ -7,7 +7,8 @@ from typing import List
 import werkzeug
 from flask import Flask, jsonify, render_template, request, send_from_directory
 
-from app.parser import FileParser, ParsingError
+from app.parser import ParsingError
+from app.model_cache import MODEL_CACHE
 from app.fsm.model import ModelError
 
 
@@ -41,10 +42,9 @@ class Model:
         self.check_model()
 
     def check_model(self):
-        parser = FileParser()
         self.errors = []
         try:
-            self.model = parser.parse(self.model_path)
+            self.model = MODEL_CACHE.parse(self.model_path)
             self.model.name = self.actor_name
         except (ParsingError, ModelError) as err:
             self.errors = []
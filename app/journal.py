@@ -0,0 +1,212 @@
+"""A compact binary journal of every visit in a run
+
+All sessions write to one append-only journal file per run, by default
+OUTPUTDIR/run.journal. Each state, action, transition and condition visit is
+a fixed-size record: the session and the visited item are integer ids into a
+string table, which is stored in the same file the first time a string is
+used. Records are encoded by the session threads and written in batches by
+a background thread.
+
+File layout (little-endian):
+
+  header:  magic b"MAGJ", version (uint16), wall clock time of the start (double)
+  string:  type 0, id (uint32), length (uint16), UTF-8 bytes
+  visit:   type 1, session id (uint32), kind (uint8), name id (uint32),
+           nanoseconds since the start (uint64), duration in µs (uint32),
+           result (uint8)
+
+Read a journal with JournalReader. A journal that was cut off, e.g. by a
+crash, is read up to its last complete record.
+"""
+from __future__ import annotations
+
+import queue
+import struct
+import threading
+import time
+
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple
+
+from app.fsm.results import Result
+
+
+MAGIC = b"MAGJ"
+VERSION = 1
+
+KINDS = ("state", "action", "transition", "condition", "session_start", "session_end")
+RESULTS = (None, Result.PASSED, Result.FAILED, Result.NOT_APPLICABLE, True, False)
+NO_DURATION = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<4sHd")
+_RECORD_TYPE = struct.Struct("<B")
+_STRING = struct.Struct("<BIH")
+_VISIT = struct.Struct("<BIBIQIB")
+_STRING_RECORD, _VISIT_RECORD = 0, 1
+_BATCH_SIZE = 1000
+
+
+class JournalError(Exception):
+    pass
+
+
+class JournalRecord(NamedTuple):
+    session: str
+    kind: str
+    name: str
+    offset_s: float  # Seconds since the start of the journal
+    duration_s: float | None
+    result: Result | bool | None
+
+
+class Journal:
+    """Write visits of all sessions to a journal file"""
+
+    def __init__(self) -> None:
+        self.file_path: str | None = None
+        self._strings: Dict[str, int] = {}
+        self._strings_lock = threading.Lock()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._start_ns: int = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._thread is not None
+
+    def open(self, file_path: str) -> None:
+        """Create the journal file and start the writer thread"""
+        if self.is_open:
+            raise JournalError(f"The journal is already open: {self.file_path}")
+        journal_file = open(file_path, "wb")  # pylint: disable=consider-using-with
+        journal_file.write(_HEADER.pack(MAGIC, VERSION, time.time()))
+        self.file_path = file_path
+        self._strings = {}
+        # A record() that raced with the last close() may still put into the old queue:
+        self._queue = queue.SimpleQueue()
+        self._start_ns = time.monotonic_ns()
+        self._thread = threading.Thread(
+            target=self._write,
+            args=(journal_file, self._queue),
+            daemon=True,
+            name="Journal writer",
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Write all pending records and close the journal file"""
+        if not self.is_open:
+            return
+        # Mark the journal closed before the end marker, so record() stops putting records:
+        thread, self._thread = self._thread, None
+        self._queue.put(None)
+        thread.join()
+
+    def _string_id(self, string: str) -> int:
+        string_id = self._strings.get(string)
+        if string_id is None:
+            with self._strings_lock:
+                string_id = self._strings.get(string)
+                if string_id is None:
+                    string_id = len(self._strings)
+                    encoded = string.encode()[:0xFFFF]
+                    # Queue the string before any visit can refer to it:
+                    self._queue.put(_STRING.pack(_STRING_RECORD, string_id, len(encoded)) + encoded)
+                    self._strings[string] = string_id
+        return string_id
+
+    def record(
+        self,
+        session: str,
+        kind: str,
+        name: str,
+        *,
+        result: Any = None,
+        duration_s: float | None = None,
+    ) -> None:
+        """Record a visit. Does nothing if the journal is not open."""
+        if not self.is_open:
+            return
+        duration_us = (
+            NO_DURATION if duration_s is None else min(int(duration_s * 1e6), NO_DURATION - 1)
+        )
+        self._queue.put(
+            _VISIT.pack(
+                _VISIT_RECORD,
+                self._string_id(session),
+                KINDS.index(kind),
+                self._string_id(name),
+                time.monotonic_ns() - self._start_ns,
+                duration_us,
+                RESULTS.index(result),
+            )
+        )
+
+    def _write(self, journal_file: BinaryIO, records: queue.SimpleQueue) -> None:
+        with journal_file:
+            while True:
+                batch: List[bytes] = [records.get()]
+                while len(batch) < _BATCH_SIZE and batch[-1] is not None:
+                    try:
+                        batch.append(records.get_nowait())
+                    except queue.Empty:
+                        break
+                closing = batch[-1] is None
+                journal_file.write(b"".join(batch[:-1] if closing else batch))
+                if closing:
+                    return
+                if records.empty():
+                    journal_file.flush()
+
+
+class JournalReader:
+    """Read the records of a journal file"""
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path: str = file_path
+        with open(file_path, "rb") as journal_file:
+            header = journal_file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise JournalError(f"Not a journal file: {file_path}")
+        magic, version, self.start_time = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise JournalError(f"Not a journal file: {file_path}")
+        if version != VERSION:
+            raise JournalError(f"Unsupported journal version {version}: {file_path}")
+
+    def __iter__(self) -> Iterator[JournalRecord]:
+        strings: Dict[int, str] = {}
+        with open(self.file_path, "rb") as journal_file:
+            data = journal_file.read()
+        position = _HEADER.size
+        while position < len(data):
+            (record_type,) = _RECORD_TYPE.unpack_from(data, position)
+            if record_type == _STRING_RECORD:
+                if position + _STRING.size > len(data):
+                    return
+                _, string_id, length = _STRING.unpack_from(data, position)
+                position += _STRING.size
+                if position + length > len(data):
+                    return
+                strings[string_id] = data[position : position + length].decode(errors="replace")
+                position += length
+            elif record_type == _VISIT_RECORD:
+                if position + _VISIT.size > len(data):
+                    return
+                _, session_id, kind, name_id, offset_ns, duration_us, result = _VISIT.unpack_from(
+                    data, position
+                )
+                position += _VISIT.size
+                yield JournalRecord(
+                    strings[session_id],
+                    KINDS[kind],
+                    strings[name_id],
+                    offset_ns / 1e9,
+                    None if duration_us == NO_DURATION else duration_us / 1e6,
+                    RESULTS[result],
+                )
+            else:
+                raise JournalError(f"Corrupt journal, unknown record type at byte {position}")
+
+
+# Create the global journal:
+JOURNAL = Journal()
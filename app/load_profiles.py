@@ -0,0 +1,160 @@
+"""Load profiles for session groups
+
+A load profile decides when each session in a session group is started and,
+optionally, stopped. Instead of starting all sessions at once, the sessions
+are started (and stopped) on a schedule:
+
+    SessionGroup(
+        name="Consumer",
+        replicas=40,
+        load_profile=LinearRamp(ramp_up_s=120, hold_s=600, ramp_down_s=60),
+        ...
+    )
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+
+# (start offset, stop offset) in seconds from the start of the sessions.
+# A stop offset of None lets the session run until its own stop conditions are met.
+ScheduleType = List[Tuple[float, Optional[float]]]
+
+
+class LoadProfileError(Exception):
+    """Raise when a load profile is configured with invalid values"""
+
+
+def _check_not_negative(**values: float | None) -> None:
+    for name, value in values.items():
+        if value is not None and value < 0:
+            raise LoadProfileError(f"{name} can't be negative, got {value}")
+
+
+class LoadProfile:
+    """Start all sessions at once (the default)"""
+
+    def schedule(self, count: int) -> ScheduleType:
+        """Return start and stop offsets for `count` sessions"""
+        return [(0.0, None)] * count
+
+    def describe(self, count: int) -> str:
+        """Return a human-friendly description of the profile"""
+        return f"Constant: {count} sessions started at once"
+
+
+class LinearRamp(LoadProfile):
+    """Start sessions evenly spread over `ramp_up_s` seconds
+
+    If `hold_s` is specified, the sessions are stopped after the full load has
+    been held that long, evenly spread over `ramp_down_s` seconds.
+    """
+
+    def __init__(self, ramp_up_s: float, hold_s: float | None = None, ramp_down_s: float = 0):
+        _check_not_negative(ramp_up_s=ramp_up_s, hold_s=hold_s, ramp_down_s=ramp_down_s)
+        self.ramp_up_s = ramp_up_s
+        self.hold_s = hold_s
+        self.ramp_down_s = ramp_down_s
+
+    def schedule(self, count: int) -> ScheduleType:
+        fractions = [idx / (count - 1) if count > 1 else 0.0 for idx in range(count)]
+        starts = [self.ramp_up_s * fraction for fraction in fractions]
+        if self.hold_s is None:
+            return [(start, None) for start in starts]
+        ramp_down_start = self.ramp_up_s + self.hold_s
+        stops = [ramp_down_start + self.ramp_down_s * fraction for fraction in fractions]
+        return list(zip(starts, stops))
+
+    def describe(self, count: int) -> str:
+        out = f"Linear ramp: {count} sessions started over {self.ramp_up_s}s"
+        if self.hold_s is not None:
+            out += f", held for {self.hold_s}s, stopped over {self.ramp_down_s}s"
+        return out
+
+
+class Step(LoadProfile):
+    """Start `sessions_per_step` sessions every `step_interval_s` seconds
+
+    If `hold_s` is specified, all sessions are stopped `hold_s` seconds
+    after the last step.
+    """
+
+    def __init__(self, sessions_per_step: int, step_interval_s: float, hold_s: float | None = None):
+        _check_not_negative(step_interval_s=step_interval_s, hold_s=hold_s)
+        if sessions_per_step < 1:
+            raise LoadProfileError(f"sessions_per_step must be at least 1, got {sessions_per_step}")
+        self.sessions_per_step = sessions_per_step
+        self.step_interval_s = step_interval_s
+        self.hold_s = hold_s
+
+    def schedule(self, count: int) -> ScheduleType:
+        starts = [(idx // self.sessions_per_step) * self.step_interval_s for idx in range(count)]
+        if self.hold_s is None:
+            return [(start, None) for start in starts]
+        stop = (max(starts) if starts else 0.0) + self.hold_s
+        return [(start, stop) for start in starts]
+
+    def describe(self, count: int) -> str:
+        out = (
+            f"Step: {count} sessions started {self.sessions_per_step} "
+            f"at a time every {self.step_interval_s}s"
+        )
+        if self.hold_s is not None:
+            out += f", held for {self.hold_s}s after the last step"
+        return out
+
+
+class Spike(LoadProfile):
+    """Run `baseline` sessions from the start, start the rest at once at `spike_at_s`
+
+    The spike sessions are stopped after `spike_duration_s` seconds.
+    """
+
+    def __init__(self, baseline: int, spike_at_s: float, spike_duration_s: float):
+        _check_not_negative(
+            baseline=baseline, spike_at_s=spike_at_s, spike_duration_s=spike_duration_s
+        )
+        self.baseline = baseline
+        self.spike_at_s = spike_at_s
+        self.spike_duration_s = spike_duration_s
+
+    def schedule(self, count: int) -> ScheduleType:
+        spike_stop = self.spike_at_s + self.spike_duration_s
+        return [
+            (0.0, None) if idx < self.baseline else (self.spike_at_s, spike_stop)
+            for idx in range(count)
+        ]
+
+    def describe(self, count: int) -> str:
+        spike_count = max(count - self.baseline, 0)
+        return (
+            f"Spike: {min(self.baseline, count)} baseline sessions, {spike_count} more "
+            f"started at {self.spike_at_s}s and stopped after {self.spike_duration_s}s"
+        )
+
+
+class ConstantArrival(LoadProfile):
+    """Start new sessions at a constant rate of `arrivals_per_s` sessions per second
+
+    If `session_duration_s` is specified, each session is stopped that long
+    after it was started.
+    """
+
+    def __init__(self, arrivals_per_s: float, session_duration_s: float | None = None):
+        _check_not_negative(session_duration_s=session_duration_s)
+        if arrivals_per_s <= 0:
+            raise LoadProfileError(f"arrivals_per_s must be positive, got {arrivals_per_s}")
+        self.arrivals_per_s = arrivals_per_s
+        self.session_duration_s = session_duration_s
+
+    def schedule(self, count: int) -> ScheduleType:
+        starts = [idx / self.arrivals_per_s for idx in range(count)]
+        if self.session_duration_s is None:
+            return [(start, None) for start in starts]
+        return [(start, start + self.session_duration_s) for start in starts]
+
+    def describe(self, count: int) -> str:
+        out = f"Constant arrival: {count} sessions started at {self.arrivals_per_s} per second"
+        if self.session_duration_s is not None:
+            out += f", each running for {self.session_duration_s}s"
+        return out
@@ -0,0 +1,214 @@
+"""Measure contention on the lock that serializes the sessions
+
+ProfiledLock works like threading.Lock, but it also records how long each
+thread waited for the lock, how long it was held, by which session, and
+what the session did while holding it. Waiting time is blamed on the
+holders that caused it, which points out the actions that are worth moving
+out of the critical section.
+
+Recording is off by default, then the lock only keeps track of the thread
+that holds it. Call enable() to start recording.
+"""
+from __future__ import annotations
+
+import csv
+import threading
+import time
+
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterator, List, NamedTuple, Tuple
+
+
+class LockHold(NamedTuple):
+    """Record one use of the lock, times are monotonic"""
+
+    holder: str
+    label: str
+    requested: float
+    acquired: float
+    released: float
+    waiters: int  # Number of threads waiting when the lock was released
+
+
+@dataclass
+class LockStats:
+    """Keep aggregated numbers for one holder, or one holder and label"""
+
+    count: int = 0
+    wait_s: float = 0.0
+    max_wait_s: float = 0.0
+    hold_s: float = 0.0
+    max_hold_s: float = 0.0
+    caused_wait_s: float = 0.0
+
+
+@dataclass
+class _CurrentHold:
+    """Describe the ongoing use of the lock, times are monotonic"""
+
+    holder: str = ""
+    label: str = ""
+    requested: float = 0.0
+    acquired: float = 0.0
+
+
+class ProfiledLock:  # pylint: disable=too-many-instance-attributes
+    """A lock that records wait and hold times"""
+
+    def __init__(self, timeline_size: int = 100_000) -> None:
+        self._lock = threading.Lock()
+        self._meta_lock = threading.Lock()
+        self._owner: int = 0  # Thread id of the holder, zero when the lock is free
+        self._waiting: Dict[int, float] = {}
+        self._current = _CurrentHold()
+        self.enabled: bool = False
+        self.timeline: Deque[LockHold] = deque(maxlen=timeline_size)
+        self.by_holder: Dict[str, LockStats] = {}
+        self.by_label: Dict[Tuple[str, str], LockStats] = {}
+
+    def acquire(self, blocking: bool = True, timeout: float = -1, *, holder: str = "") -> bool:
+        """Acquire the lock, like threading.Lock.acquire()
+
+        `holder` names the one holding the lock, default is the thread name.
+        """
+        thread_id = threading.get_ident()
+        if not self.enabled:
+            # Released in release(), so a with statement can't be used here:
+            acquired = self._lock.acquire(blocking, timeout)  # pylint: disable=consider-using-with
+            if acquired:
+                self._owner = thread_id
+            return acquired
+        requested = time.monotonic()
+        with self._meta_lock:
+            self._waiting[thread_id] = requested
+        # Released in release(), so a with statement can't be used here:
+        acquired = self._lock.acquire(blocking, timeout)  # pylint: disable=consider-using-with
+        now = time.monotonic()
+        with self._meta_lock:
+            del self._waiting[thread_id]
+            if acquired:
+                self._owner = thread_id
+                self._current = _CurrentHold(
+                    holder or threading.current_thread().name, "", requested, now
+                )
+        return acquired
+
+    def annotate(self, label: str) -> None:
+        """Describe what the current holder is doing, e.g. the name of the action"""
+        self._current.label = label
+
+    def enable(self) -> None:
+        """Start recording wait and hold times"""
+        self.enabled = True
+
+    def release(self) -> None:
+        # Only the holder may release, so no hold is recorded for a failing release:
+        if self._owner != threading.get_ident():
+            raise RuntimeError("cannot release a lock held by another thread, or not held")
+        self._owner = 0
+        if not self.enabled:
+            self._lock.release()
+            return
+        released = time.monotonic()
+        with self._meta_lock:
+            # Blame the time other threads have waited during this hold on the holder:
+            current = self._current
+            caused_wait_s = sum(
+                released - max(wait_start, current.acquired)
+                for wait_start in self._waiting.values()
+            )
+            hold = LockHold(
+                current.holder,
+                current.label,
+                current.requested,
+                current.acquired,
+                released,
+                len(self._waiting),
+            )
+            self.timeline.append(hold)
+            for stats in (
+                self.by_holder.setdefault(hold.holder, LockStats()),
+                self.by_label.setdefault((hold.holder, hold.label), LockStats()),
+            ):
+                stats.count += 1
+                stats.wait_s += hold.acquired - hold.requested
+                stats.max_wait_s = max(stats.max_wait_s, hold.acquired - hold.requested)
+                stats.hold_s += hold.released - hold.acquired
+                stats.max_hold_s = max(stats.max_hold_s, hold.released - hold.acquired)
+                stats.caused_wait_s += caused_wait_s
+        self._lock.release()
+
+    @contextmanager
+    def released(self) -> Iterator[None]:
+        """Let other threads have the lock while the current thread waits for something
+
+        Does nothing if the current thread doesn't hold the lock. Otherwise the
+        lock is released, and taken back by the same holder on exit.
+        """
+        if self._owner != threading.get_ident():
+            yield
+            return
+        current = self._current
+        label = current.label
+        self.release()
+        try:
+            yield
+        finally:
+            self.acquire(holder=current.holder)
+            self.annotate(label)
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *_) -> None:
+        self.release()
+
+    def top_blockers(self, count: int = 5) -> List[Tuple[str, str, LockStats]]:
+        """Return (holder, label, stats) for the holds that caused the most waiting"""
+        with self._meta_lock:
+            items = [(holder, label, stats) for (holder, label), stats in self.by_label.items()]
+        items.sort(key=lambda item: item[2].caused_wait_s, reverse=True)
+        return [item for item in items[:count] if item[2].caused_wait_s > 0]
+
+    def most_blocked(self, count: int = 5) -> List[Tuple[str, LockStats]]:
+        """Return (holder, stats) for the ones that waited the longest for the lock"""
+        with self._meta_lock:
+            items = list(self.by_holder.items())
+        items.sort(key=lambda item: item[1].wait_s, reverse=True)
+        return [item for item in items[:count] if item[1].wait_s > 0]
+
+    def save_timeline(self, file_path: str) -> None:
+        """Save all recorded holds to a CSV file, times in seconds from the first request"""
+        with self._meta_lock:
+            holds = list(self.timeline)
+        origin = min((hold.requested for hold in holds), default=0.0)
+        with open(file_path, "w", newline="") as timeline_file:
+            writer = csv.writer(timeline_file)
+            writer.writerow(("Holder", "Label", "Requested", "Acquired", "Released", "Waiters"))
+            for hold in holds:
+                writer.writerow(
+                    (
+                        hold.holder,
+                        hold.label,
+                        f"{hold.requested - origin:.6f}",
+                        f"{hold.acquired - origin:.6f}",
+                        f"{hold.released - origin:.6f}",
+                        hold.waiters,
+                    )
+                )
+
+    def reset(self) -> None:
+        """Forget all recorded data"""
+        with self._meta_lock:
+            self.timeline.clear()
+            self.by_holder.clear()
+            self.by_label.clear()
+
+
+# Create the global lock object, for thread synchronization (re-exported as app.THREAD_LOCK):
+THREAD_LOCK = ProfiledLock()
@@ -0,0 +1,112 @@
+"""Track memory growth of sessions with tracemalloc
+
+Opt in with `main.py run --track-memory N`, which takes a tracemalloc
+snapshot every N transitions of each session and compares it to the
+previous one. The allocation sites that grew the most are reported for each
+interval, and for the whole run.
+
+With `--memory-budget-mb`, a session is stopped cleanly when the memory
+traced by Python exceeds the budget, before the container runs out of
+memory.
+
+Note that tracemalloc traces the whole Python process: the growth reported
+for a session includes what other sessions allocated in the same interval.
+Memory allocated by the browsers is not traced.
+"""
+from __future__ import annotations
+
+import tracemalloc
+
+from typing import List, NamedTuple, Tuple
+
+
+# (allocation site, growth in bytes, growth in number of blocks):
+GrowthType = Tuple[str, int, int]
+
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<unknown>")
+
+
+class MemoryInterval(NamedTuple):
+    """Memory growth between two snapshots"""
+
+    transitions: int
+    traced_bytes: int
+    growth_bytes: int
+    top_growth: List[GrowthType]
+
+
+class _Snapshot(NamedTuple):
+    snapshot: tracemalloc.Snapshot
+    traced_bytes: int
+
+
+def _take_snapshot() -> _Snapshot:
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, file_name) for file_name in _IGNORED_FILES]
+    )
+    return _Snapshot(snapshot, tracemalloc.get_traced_memory()[0])
+
+
+def _growth(new: tracemalloc.Snapshot, old: tracemalloc.Snapshot, top: int) -> List[GrowthType]:
+    """Return the allocation sites that grew the most from old to new"""
+    differences = new.compare_to(old, "lineno")
+    return [
+        (str(diff.traceback[0]), diff.size_diff, diff.count_diff)
+        for diff in differences[:top]
+        if diff.size_diff > 0
+    ]
+
+
+class MemoryTracker:
+    """Take tracemalloc snapshots every N transitions and enforce a memory budget"""
+
+    def __init__(
+        self, every_n_transitions: int = 1000, budget_mb: float | None = None, top: int = 10
+    ) -> None:
+        if every_n_transitions < 1:
+            raise ValueError(f"every_n_transitions must be at least 1, got {every_n_transitions}")
+        self.every_n_transitions: int = every_n_transitions
+        self.budget_bytes: int | None = int(budget_mb * 2**20) if budget_mb else None
+        self.top: int = top
+        self.intervals: List[MemoryInterval] = []
+        self.budget_exceeded: bool = False
+        self._first: _Snapshot | None = None
+        self._previous: _Snapshot | None = None
+
+    @property
+    def traced_bytes(self) -> int:
+        """Return the memory currently traced by tracemalloc, for the whole process"""
+        return tracemalloc.get_traced_memory()[0]
+
+    def start(self) -> None:
+        """Start tracing, if not already started, and take the first snapshot"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._first = self._previous = _take_snapshot()
+
+    def check(self, transitions: int) -> bool:
+        """Take a snapshot if it is time to. Return False if the memory budget is exceeded."""
+        if self._previous is None:
+            return True
+        last_snapshot_at = self.intervals[-1].transitions if self.intervals else 0
+        if transitions - last_snapshot_at >= self.every_n_transitions:
+            snapshot = _take_snapshot()
+            self.intervals.append(
+                MemoryInterval(
+                    transitions,
+                    snapshot.traced_bytes,
+                    snapshot.traced_bytes - self._previous.traced_bytes,
+                    _growth(snapshot.snapshot, self._previous.snapshot, self.top),
+                )
+            )
+            self._previous = snapshot
+        if self.budget_bytes and self.traced_bytes > self.budget_bytes:
+            self.budget_exceeded = True
+            return False
+        return True
+
+    def top_growth(self) -> List[GrowthType]:
+        """Return the allocation sites that grew the most since start(), up to the last snapshot"""
+        if self._first is None or self._previous is self._first:
+            return []
+        return _growth(self._previous.snapshot, self._first.snapshot, self.top)
@@ -0,0 +1,156 @@
+"""Expose live metrics of running sessions to Prometheus
+
+Start the endpoint with `main.py run --metrics-port 9100` and point
+Prometheus (or a browser) at http://localhost:9100/metrics.
+
+The metrics are read from the session summaries while the sessions are
+running. To never slow the sessions down, the sessions lock is not taken:
+collections are copied before they are read, and a scrape may see a
+session in the middle of a step.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+from app import LOGGER
+
+if TYPE_CHECKING:
+    from app.sessions import Session
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_HELP = (
+    ("magpie_session_running", "gauge", "1 if the session is running"),
+    ("magpie_session_current_state", "gauge", "1 for the current state of the session"),
+    ("magpie_session_transitions_total", "counter", "Number of transitions visited"),
+    ("magpie_session_transitions_per_second", "gauge", "Transitions per second since start"),
+    ("magpie_session_coverage_ratio", "gauge", "Share of the model that has been visited"),
+    ("magpie_session_failures_total", "counter", "Number of failed state and action visits"),
+    ("magpie_action_duration_seconds", "histogram", "Duration of action functions"),
+)
+
+
+def _label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{name}="{_label_value(value)}"' for name, value in labels.items())
+
+
+def _session_lines(lines: Dict[str, List[str]], session: Session) -> None:
+    machine = session.machine
+    name = session.name
+    lines["magpie_session_running"].append(f"{{{_labels(session=name)}}} {int(machine.running)}")
+    if machine.current_state is not None:
+        labels = _labels(session=name, state=machine.current_state.name)
+        lines["magpie_session_current_state"].append(f"{{{labels}}} 1")
+
+    transitions = sum(
+        item.visits_count for item in list(machine.summary.results.transitions.values())
+    )
+    elapsed = machine.summary.duration
+    if machine.running:
+        elapsed = time.time() - machine.start_time
+    rate = transitions / elapsed if elapsed > 0 else 0.0
+    lines["magpie_session_transitions_total"].append(f"{{{_labels(session=name)}}} {transitions}")
+    lines["magpie_session_transitions_per_second"].append(
+        f"{{{_labels(session=name)}}} {rate:.4f}"
+    )
+
+
+def _coverage_lines(lines: Dict[str, List[str]], session: Session) -> None:
+    summary = session.machine.summary
+    results = summary.results
+    for kind, visited, total in (
+        ("states", results.states, summary.model.states),
+        ("actions", results.actions, summary.model.actions),
+        ("transitions", results.transitions, summary.model.transitions),
+    ):
+        ratio = len(list(visited)) / len(total) if total else 1.0
+        labels = _labels(session=session.name, kind=kind)
+        lines["magpie_session_coverage_ratio"].append(f"{{{labels}}} {ratio:.4f}")
+
+    for kind, collection in (("state", results.states), ("action", results.actions)):
+        failures = sum(item.fail_count for item in list(collection.values()))
+        labels = _labels(session=session.name, kind=kind)
+        lines["magpie_session_failures_total"].append(f"{{{labels}}} {failures}")
+
+
+def _action_duration_lines(lines: Dict[str, List[str]], session: Session) -> None:
+    metric_lines = lines["magpie_action_duration_seconds"]
+    for action_name, action_results in list(session.machine.summary.results.actions.items()):
+        durations = action_results.durations.copy()
+        for bound in LATENCY_BUCKETS_S:
+            labels = _labels(session=session.name, action=action_name, le=str(bound))
+            metric_lines.append(f"_bucket{{{labels}}} {durations.count_at_or_below(bound)}")
+        labels = _labels(session=session.name, action=action_name)
+        metric_lines += [
+            f'_bucket{{{labels},le="+Inf"}} {durations.count}',
+            f"_sum{{{labels}}} {durations.total_us / 1_000_000:.6f}",
+            f"_count{{{labels}}} {durations.count}",
+        ]
+
+
+def render_metrics(sessions: List[Session]) -> str:
+    """Return the metrics of all sessions in the Prometheus text format"""
+    lines: Dict[str, List[str]] = {name: [] for name, _, _ in _HELP}
+    for session in sessions:
+        _session_lines(lines, session)
+        _coverage_lines(lines, session)
+        _action_duration_lines(lines, session)
+
+    out = []
+    for metric_name, metric_type, help_text in _HELP:
+        out.append(f"# HELP {metric_name} {help_text}")
+        out.append(f"# TYPE {metric_name} {metric_type}")
+        out += [f"{metric_name}{line}" for line in lines[metric_name]]
+    return "\n".join(out) + "\n"
+
+
+class MetricsServer:
+    """Serve the metrics over HTTP from a background thread"""
+
+    def __init__(self, port: int, get_sessions: Callable[[], List[Session]]) -> None:
+        self.get_sessions = get_sessions
+        metrics_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = render_metrics(metrics_server.get_sessions()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_):
+                # Don't flood the log with scrapes
+                pass
+
+        self._server = ThreadingHTTPServer(("", port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True, name="Metrics server"
+        )
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread.start()
+        LOGGER.info("Serving metrics on http://localhost:%s/metrics", self.port)
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,194 @@
+"""Cache parsed models, to skip parsing on startup
+
+Parsed models are kept in a compact serialized form, both in memory and in a
+cache directory on disk. An entry is only used if the model file's path,
+size, modification time and content hash all match, so a stale model is
+never returned.
+
+Each call to parse() returns a new Model object, which the caller is free
+to modify.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import pickle
+
+from pathlib import Path
+from threading import Lock, get_ident
+from typing import Dict, Tuple
+
+from app.fsm.model import Model
+from app.fsm.transition import Transition
+from app.parser import FileParser
+
+
+# Bump when the serialized format changes:
+CACHE_FORMAT_VERSION = 1
+
+Fingerprint = Tuple[str, int, int, str]
+
+
+##############################
+# SERIALIZATION OF MODELS
+#
+def _dump(model: Model) -> bytes:
+    """Serialize a parsed model into a flat, compact representation"""
+    transitions = tuple(
+        (
+            trns.start_state.name,
+            trns.condition.name if trns.condition else "",
+            trns.action.name if trns.action else "",
+            trns.happy_path,
+            trns.end_state.name,
+            trns.source_code_file,
+            trns.source_code_line,
+        )
+        for trns in model.transitions.values()
+    )
+    data = (
+        model.name,
+        tuple(model.states),
+        tuple(model.actions),
+        tuple(model.conditions),
+        model.initial_state.name if model.initial_state else "",
+        transitions,
+    )
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load_transition(model: Model, row: Tuple) -> Transition:
+    """Construct a transition between the states of the model from its serialized row"""
+    start, condition, action, happy_path, end, source_file, source_line = row
+    transition = Transition(model.states[start], model.states[end])
+    transition.action = model.actions[action] if action else None
+    transition.condition = model.conditions[condition] if condition else None
+    transition.happy_path = happy_path
+    transition.source_code_file = source_file
+    transition.source_code_line = source_line
+    return transition
+
+
+def _load(blob: bytes) -> Model:
+    """Construct a new model object from its serialized representation"""
+    name, state_names, action_names, condition_names, initial_state_name, rows = pickle.loads(
+        blob
+    )
+    model = Model(name)
+    for state_name in state_names:
+        model.add_state(state_name)
+    for action_name in action_names:
+        model.add_action(action_name)
+    for condition_name in condition_names:
+        model.add_condition(condition_name)
+    for row in rows:
+        transition = _load_transition(model, row)
+        model.add_transition(transition)
+        transition.start_state.outbounds.append(transition)
+        transition.end_state.inbounds.append(transition)
+    if initial_state_name:
+        model.initial_state = model.states[initial_state_name]
+    return model
+
+
+###############
+# MODEL CACHE
+#
+class ModelCache:
+    """Keep parsed models in memory and in a cache directory
+
+    Set `cache_dir` to an empty string to only cache models in memory.
+    """
+
+    def __init__(self, cache_dir: str | Path | None = None) -> None:
+        if cache_dir is None:
+            cache_dir = os.environ.get("MAGPIE_CACHE_DIR", Path(".") / ".magpie_cache")
+        self.cache_dir: Path | None = Path(cache_dir) / "models" if str(cache_dir) else None
+        self._entries: Dict[str, Tuple[Fingerprint, bytes]] = {}
+        self._lock = Lock()
+
+    def parse(self, file_path: str | Path) -> Model:
+        """Return the model in the model file, parse the file only if needed
+
+        Raises the same exceptions as FileParser.parse().
+        """
+        try:
+            fingerprint, source = self._read(file_path)
+        except OSError:
+            # Let the parser report the problem:
+            return FileParser().parse(file_path)
+
+        # In memory?
+        with self._lock:
+            entry = self._entries.get(fingerprint[0])
+        if entry and entry[0] == fingerprint:
+            return _load(entry[1])
+
+        # On disk?
+        blob = self._read_from_disk(fingerprint)
+        if blob is None:
+            # Parse exactly the contents that were fingerprinted:
+            # (decoded the same way as Path.read_text() does)
+            template = io.TextIOWrapper(io.BytesIO(source)).read()
+            model = FileParser().parse_source(template, file_path)
+            blob = _dump(model)
+            self._write_to_disk(fingerprint, blob)
+        else:
+            model = _load(blob)
+
+        with self._lock:
+            self._entries[fingerprint[0]] = (fingerprint, blob)
+        return model
+
+    def clear(self) -> None:
+        """Forget all models cached in memory"""
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _read(file_path: str | Path) -> Tuple[Fingerprint, bytes]:
+        """Return the fingerprint (path, size, modification time and content hash)
+        and the contents of the file
+        """
+        with open(os.path.abspath(file_path), "rb") as model_file:
+            stat = os.fstat(model_file.fileno())
+            source = model_file.read()
+        content_hash = hashlib.sha256(source).hexdigest()
+        return (str(file_path), stat.st_size, stat.st_mtime_ns, content_hash), source
+
+    def _cache_file(self, fingerprint: Fingerprint) -> Path:
+        path_hash = hashlib.sha256(os.path.abspath(fingerprint[0]).encode()).hexdigest()
+        return self.cache_dir / f"{path_hash[:32]}.pickle"
+
+    def _read_from_disk(self, fingerprint: Fingerprint) -> bytes | None:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_file(fingerprint), "rb") as cache_file:
+                version, cached_fingerprint, blob = pickle.load(cache_file)
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+            return None
+        if version != CACHE_FORMAT_VERSION or tuple(cached_fingerprint) != fingerprint:
+            return None
+        return blob
+
+    def _write_to_disk(self, fingerprint: Fingerprint, blob: bytes) -> None:
+        if not self.cache_dir:
+            return
+        cache_file = self._cache_file(fingerprint)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}_{get_ident()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, "wb") as out:
+                pickle.dump(
+                    (CACHE_FORMAT_VERSION, fingerprint, blob), out, protocol=pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            # The disk cache is an optimization only, carry on without it
+            pass
+
+
+# Create global model cache:
+MODEL_CACHE = ModelCache()
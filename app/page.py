@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, Optional, Callable
+from typing import Any, Dict, Optional, Callable, TYPE_CHECKING
 
 from assertpy.assertpy import AssertionBuilder
 from playwright.sync_api import APIResponse, Response
@@ -11,6 +11,9 @@ from playwright.sync_api import Page as PlaywrightPage
 # Expose `expect` in the page namespace:
 from playwright.sync_api import expect  # pylint: disable=unused-import
 
+if TYPE_CHECKING:
+    from app.sync import Barrier, Latch, Semaphore
+
 
 class Page(PlaywrightPage):
     """Add the assert_that method to the Page class
@@ -57,6 +60,35 @@ class Page(PlaywrightPage):
     def resumeall() -> None:
         """Resume script execution for all actors."""
 
+    @staticmethod
+    def barrier(name: str, parties: int) -> Barrier:
+        """Return the barrier with this name, shared by all sessions.
+
+        Example:
+            # Let three users submit at the same time:
+            assert page.barrier("all users submit", parties=3).wait(timeout_s=60)
+        """
+
+    @staticmethod
+    def semaphore(name: str, value: int = 1) -> Semaphore:
+        """Return the counting semaphore with this name, shared by all sessions.
+
+        Example:
+            # Only one session at a time may use the admin account:
+            with page.semaphore("admin account", value=1):
+                log_in_as_admin(page)
+        """
+
+    @staticmethod
+    def latch(name: str, count: int) -> Latch:
+        """Return the countdown latch with this name, shared by all sessions.
+
+        Example:
+            page.latch("items created", count=3).count_down()
+            ...
+            assert page.latch("items created", count=3).wait(timeout_s=60)
+        """
+
     @staticmethod
     def mock_route(
         url_mask: str,
@@ -211,10 +211,16 @@ class FileParser:
 
         return model_row, line_errors
 
-    def parse(  # pylint: disable=too-many-locals, too-many-branches, too-many-statements
-        self, file_path: str
-    ) -> Model:
+    def parse(self, file_path: str) -> Model:
         """Construct a model object from a model file"""
+        if not os.path.exists(file_path):
+            raise ParsingError(f"File not found: {file_path}")
+        return self.parse_source(Path(file_path).read_text(), file_path)
+
+    def parse_source(  # pylint: disable=too-many-locals, too-many-branches, too-many-statements
+        self, template: str, file_path: str
+    ) -> Model:
+        """Construct a model object from the contents of a model file"""
         model = Model()
         model_errors: List[Tuple[int, str]] = []
         all_action_names: Set[str] = set()
@@ -222,11 +228,6 @@ class FileParser:
         all_state_names: Set[str] = set()
         model_parts: List[ModelRowParts] = []
         initial_state_name: str = ""
-        template: str = ""
-
-        if not os.path.exists(file_path):
-            raise ParsingError(f"File not found: {file_path}")
-        template = Path(file_path).read_text()
 
         # Iterate over all lines in the template string
         # and create string representations of objects that
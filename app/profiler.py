@@ -0,0 +1,107 @@
+"""Profile session threads
+
+Running main.py under cProfile only profiles the main thread, not the
+session threads. Instead, use `main.py run --profile <mode>` to profile each
+session in its own thread:
+
+  cprofile: deterministic profiling with cProfile, saved as <session>.pstats
+  sample:   low-overhead sampling of the session's stack, saved as collapsed
+            stacks in <session>.collapsed, ready for flamegraph.pl/speedscope
+
+From Python 3.12, only one cProfile profiler can be active in a process.
+With cprofile, the first session is profiled with cProfile, and the others
+fall back to sampling.
+"""
+from __future__ import annotations
+
+import cProfile
+import sys
+import threading
+
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from app import LOGGER
+
+
+PROFILE_MODES = ("cprofile", "sample")
+DEFAULT_SAMPLE_INTERVAL_S = 0.005
+
+
+class StackSampler:
+    """Sample the stack of one thread from a background thread"""
+
+    def __init__(self, thread_id: int, interval_s: float = DEFAULT_SAMPLE_INTERVAL_S) -> None:
+        self.thread_id: int = thread_id
+        self.interval_s: float = interval_s
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="Stack sampler")
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def sample(self) -> None:
+        """Count the current stack of the sampled thread"""
+        frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if stack:
+            self.counts[";".join(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.sample()
+
+    def save(self, file_path: str | Path) -> None:
+        """Save the samples in the collapsed stack format: `frame;frame;frame count`"""
+        with open(file_path, "w") as collapsed_file:
+            for stack, count in self.counts.most_common():
+                collapsed_file.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile_thread(mode: str, file_stem: str | Path) -> Iterator[None]:
+    """Profile the current thread while in the context
+
+    The result is saved to `file_stem` + `.pstats` or `.collapsed`.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode `{mode}`, choose one of {', '.join(PROFILE_MODES)}")
+    Path(file_stem).parent.mkdir(parents=True, exist_ok=True)
+    profiler = None
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as err:
+            # Python 3.12+: "Another profiling tool is already active"
+            LOGGER.warning("⚠️  Can't use cProfile in this thread (%s), sampling instead", err)
+            profiler = None
+    if profiler:
+        try:
+            yield
+        finally:
+            profiler.disable()
+            file_path = f"{file_stem}.pstats"
+            profiler.dump_stats(file_path)
+            LOGGER.info("Saved profile: %s", file_path)
+    else:
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            file_path = f"{file_stem}.collapsed"
+            sampler.save(file_path)
+            LOGGER.info("Saved profile: %s (%s samples)", file_path, sum(sampler.counts.values()))
@@ -0,0 +1,163 @@
+"""Limit the rate of actions across all sessions
+
+Shared test environments often have an agreed load ceiling. Configure a
+process-wide limit by adding a RATE_LIMIT object to the test file:
+
+    RATE_LIMIT = RateLimit(actions_per_s=5, per_action={"log in": 0.5})
+
+The Machine consults the rate limiter before running each action function.
+Sessions are throttled (they wait) when the limit would be exceeded. While
+a session waits, it lets the other sessions run.
+"""
+from __future__ import annotations
+
+import time
+
+from contextlib import nullcontext
+from threading import Lock
+from typing import Callable, ContextManager, Dict
+
+
+def _normalized(action_name: str) -> str:
+    """Make `Log in`, `log in` and `log_in` refer to the same action"""
+    return action_name.lower().replace(" ", "_")
+
+
+class TokenBucket:
+    """Implement a thread-safe token bucket
+
+    Tokens are added at `rate_per_s` tokens per second, up to `burst` tokens.
+    """
+
+    def __init__(self, rate_per_s: float, burst: float = 1.0) -> None:
+        if rate_per_s <= 0:
+            raise ValueError(f"The rate must be positive, got {rate_per_s}")
+        self.rate_per_s: float = rate_per_s
+        self.burst: float = max(burst, 1.0)
+        self._tokens: float = self.burst
+        self._last_update: float = time.monotonic()
+        self._lock = Lock()
+
+    def reserve(self) -> float:
+        """Take a token, return the number of seconds to wait before using it
+
+        Tokens may be reserved ahead of time, which makes waiting callers
+        get their tokens in the order they asked for them.
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_update
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_s)
+            self._last_update = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_s
+
+
+class RateLimit:
+    """Configure the rate limiter from a test file"""
+
+    def __init__(
+        self,
+        actions_per_s: float | None = None,
+        per_action: Dict[str, float] | None = None,
+        burst: float = 1.0,
+    ) -> None:
+        """Define rate limits
+
+        Args:
+            actions_per_s (float): [optional] max number of actions per second, for all sessions together
+            per_action (Dict[str, float]): [optional] max number of calls per second for specific actions
+            burst (float): [optional] number of actions allowed to run back-to-back before throttling
+        """  # pylint: disable=line-too-long
+        self.actions_per_s: float | None = actions_per_s
+        self.per_action: Dict[str, float] = per_action or {}
+        self.burst: float = burst
+
+
+class RateLimiterStats:
+    """Keep track of calls and throttling for one rate limit"""
+
+    def __init__(self, target_per_s: float) -> None:
+        self.target_per_s: float = target_per_s
+        self.count: int = 0
+        self.throttled_s: float = 0.0
+        self.first_call: float | None = None
+        self.last_call: float | None = None
+
+    @property
+    def achieved_per_s(self) -> float | None:
+        """Return the achieved rate, None if it can't be determined yet"""
+        if self.count < 2 or self.last_call == self.first_call:
+            return None
+        return (self.count - 1) / (self.last_call - self.first_call)
+
+
+class RateLimiter:
+    """Throttle actions according to the configured rate limits"""
+
+    def __init__(self) -> None:
+        self._global_bucket: TokenBucket | None = None
+        self._action_buckets: Dict[str, TokenBucket] = {}
+        self.stats: Dict[str, RateLimiterStats] = {}
+        self._lock = Lock()
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._global_bucket is not None or bool(self._action_buckets)
+
+    def configure(self, rate_limit: RateLimit | None) -> None:
+        """Apply the rate limits, or remove all limits if rate_limit is None"""
+        with self._lock:
+            self._global_bucket = None
+            self._action_buckets = {}
+            self.stats = {}
+            if rate_limit is None:
+                return
+            if rate_limit.actions_per_s:
+                self._global_bucket = TokenBucket(rate_limit.actions_per_s, rate_limit.burst)
+                self.stats["*"] = RateLimiterStats(rate_limit.actions_per_s)
+            for action_name, rate in rate_limit.per_action.items():
+                key = _normalized(action_name)
+                self._action_buckets[key] = TokenBucket(rate, rate_limit.burst)
+                self.stats[key] = RateLimiterStats(rate)
+
+    def acquire(
+        self,
+        action_name: str,
+        while_waiting: Callable[[], ContextManager] = nullcontext,
+    ) -> float:
+        """Block until the action is allowed to run. Return the time spent waiting.
+
+        The action's own limit is waited for first, so that a global token is
+        not held back while the action waits. Each wait is counted against the
+        limit that caused it. Sleeping happens inside `while_waiting()`, e.g.
+        to release a lock meanwhile.
+        """
+        if not self.is_enabled:
+            return 0.0
+        key = _normalized(action_name)
+        waits: Dict[str, float] = {}
+        for stats_key, bucket in ((key, self._action_buckets.get(key)), ("*", self._global_bucket)):
+            if bucket is None:
+                continue
+            waits[stats_key] = bucket.reserve()
+            if waits[stats_key] > 0:
+                with while_waiting():
+                    time.sleep(waits[stats_key])
+        now = time.monotonic()
+        with self._lock:
+            for stats_key, wait_s in waits.items():
+                stats = self.stats.get(stats_key)
+                if stats is None:
+                    continue
+                stats.count += 1
+                stats.throttled_s += wait_s
+                stats.first_call = stats.first_call if stats.first_call is not None else now
+                stats.last_call = now
+        return sum(waits.values())
+
+
+# Create the global rate limiter:
+RATE_LIMITER = RateLimiter()
@@ -8,11 +8,11 @@ from app.sessions import Session
 
 
 def render_session(session: Session, output_path=None) -> str:  # pylint: disable=too-many-locals
+    # The model is shared between sessions, don't modify it:
     model = session.machine.model
-    model.name = model.name + rf"\n{session.name}"
     summary = session.machine.summary
     output_path = output_path or OUTPUTDIR
     filename: str = os.path.join(output_path, session.name.replace(" ", "_") + ".dot")
-    digraph = model.to_digraph(summary)
+    digraph = model.to_digraph(summary, label=rf"{model.name}\n{session.name}")
 
     return digraph.render(filename, cleanup=True, format="svg").replace("\\", "/")
@@ -0,0 +1,55 @@
+"""Save sessions for replay, and load them again
+
+After a run, the seed and the transitions attempted by each session are
+saved to OUTPUTDIR/replay/<session>.json. `main.py replay` runs the session
+again, following exactly the same transitions:
+
+    python main.py replay tests/my_test.py output/replay/consumer.json
+"""
+from __future__ import annotations
+
+import json
+
+from typing import TYPE_CHECKING, List, NamedTuple
+
+if TYPE_CHECKING:
+    from app.sessions import Session
+
+
+class ReplayError(Exception):
+    """Raise when a replay file can't be used"""
+
+
+class ReplayInfo(NamedTuple):
+    session: str
+    seed: int
+    transitions: List[str]
+    failed: bool
+    error: str
+
+
+def save_replay(session: Session, file_path: str) -> None:
+    """Save what is needed to replay the session"""
+    machine = session.machine
+    replay_info = ReplayInfo(
+        session=session.name,
+        seed=machine.seed,
+        transitions=[transition.name for transition in machine.audit_trail.attempts],
+        failed=session.has_failures,
+        error=machine.error_msg,
+    )
+    write_replay(replay_info, file_path)
+
+
+def write_replay(replay_info: ReplayInfo, file_path: str) -> None:
+    with open(file_path, "w") as replay_file:
+        json.dump(replay_info._asdict(), replay_file, indent=2)
+
+
+def load_replay(file_path: str) -> ReplayInfo:
+    try:
+        with open(file_path) as replay_file:
+            data = json.load(replay_file)
+        return ReplayInfo(**data)
+    except (OSError, ValueError, TypeError) as exc:
+        raise ReplayError(f"Can't read replay file {file_path}: {exc}") from exc
@@ -0,0 +1,232 @@
+"""Sample resource usage while the sessions run
+
+A background thread reads /proc once per interval and records CPU, memory
+(RSS), thread count and open file descriptors, both for the Magpie process
+and for its child processes (Playwright and the browsers). Each sample is
+stamped with what every session was doing at that moment, so resource
+spikes can be tied to specific states and actions.
+
+Sampling is off by default, switch it on with `main.py run
+--resource-interval 1`. Only the last `MAX_SAMPLES` samples are kept, but
+the peaks are tracked over the whole run. The process tree is scanned for
+new child processes every `RESCAN_EVERY` samples; in between, only the
+known children are read.
+
+Only Linux is supported. On other platforms the sampler does nothing.
+"""
+from __future__ import annotations
+
+import csv
+import os
+import threading
+import time
+
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, NamedTuple, Tuple
+
+from app import LOGGER
+
+if TYPE_CHECKING:
+    from app.sessions import Session
+
+
+PROC = Path("/proc")
+DEFAULT_INTERVAL_S = 1.0
+MAX_SAMPLES = 3600
+RESCAN_EVERY = 10
+PEAK_FIELDS = ("cpu_percent", "rss_bytes", "threads", "fds")
+
+
+class ProcessUsage(NamedTuple):
+    cpu_ticks: int
+    rss_bytes: int
+    threads: int
+    fds: int
+
+
+class ResourceSample(NamedTuple):
+    """Resource usage at one point in time, CPU in percent of one core"""
+
+    timestamp: float
+    cpu_percent: float
+    rss_bytes: int
+    threads: int
+    fds: int
+    children_cpu_percent: float
+    children_rss_bytes: int
+    children_threads: int
+    children_fds: int
+    transitions: int
+    activity: str  # What each session is doing, e.g. `Consumer #1: "Todo list" add_todo()`
+
+
+####################
+# READING FROM /proc
+#
+def _read(path: Path) -> str:
+    with open(path) as proc_file:
+        return proc_file.read()
+
+
+def _read_usage(pid: int | str) -> ProcessUsage | None:
+    """Return the resource usage of a process, None if it is gone"""
+    try:
+        stat = _read(PROC / str(pid) / "stat")
+        # The process name may contain spaces, the fields start after its closing parenthesis:
+        fields = stat[stat.rindex(")") + 2 :].split()
+        cpu_ticks = int(fields[11]) + int(fields[12])  # utime + stime
+        threads = int(fields[17])
+        rss_bytes = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        fds = len(os.listdir(PROC / str(pid) / "fd"))
+    except (OSError, ValueError, IndexError):
+        return None
+    return ProcessUsage(cpu_ticks, rss_bytes, threads, fds)
+
+
+def _descendants(pid: int) -> List[int]:
+    """Return the ids of all child processes of pid, and their children etc."""
+    children: Dict[int, List[int]] = {}
+    for entry in PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = _read(entry / "stat")
+            parent = int(stat[stat.rindex(")") + 2 :].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry.name))
+    found = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def session_activity(session: Session) -> str:
+    """Return a short description of what the session is doing right now"""
+    machine = session.machine
+    state = machine.current_state.name if machine.current_state else "-"
+    action = machine.current_action
+    return f'{session.name}: "{state}"' + (f" {action.fn_name}()" if action else "")
+
+
+###########
+# SAMPLER
+#
+class ResourceSampler:  # pylint: disable=too-many-instance-attributes
+    """Sample resource usage from a background thread"""
+
+    def __init__(
+        self,
+        get_sessions: Callable[[], List[Session]],
+        interval_s: float = DEFAULT_INTERVAL_S,
+    ) -> None:
+        self.get_sessions = get_sessions
+        self.interval_s: float = interval_s
+        self.samples: Deque[ResourceSample] = deque(maxlen=MAX_SAMPLES)
+        self.first_timestamp: float | None = None
+        self._peaks: Dict[str, ResourceSample] = {}
+        self._children: List[int] = []
+        self._sample_count: int = 0
+        self.is_supported: bool = (PROC / "self" / "stat").exists()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="Resource sampler")
+        self._previous: Tuple[float, int, Dict[int, int]] | None = None
+
+    def start(self) -> None:
+        if not self.is_supported:
+            LOGGER.info("Resource sampling is only supported on Linux")
+            return
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+
+    def _run(self) -> None:
+        self.sample()
+        while not self._stop.wait(self.interval_s):
+            self.sample()
+
+    def sample(self) -> ResourceSample | None:
+        """Take a sample. The first sample has no CPU usage, since it needs a previous one."""
+        now = time.monotonic()
+        own = _read_usage(os.getpid())
+        if own is None:
+            return None
+        if self._sample_count % RESCAN_EVERY == 0:
+            self._children = _descendants(os.getpid())
+        self._sample_count += 1
+        children = {pid: _read_usage(pid) for pid in self._children}
+        children = {pid: usage for pid, usage in children.items() if usage is not None}
+        cpu_percent, children_cpu_percent = self._cpu_percents(now, own, children)
+
+        sessions = self.get_sessions()
+        sample = ResourceSample(
+            timestamp=time.time(),
+            cpu_percent=round(cpu_percent, 1),
+            rss_bytes=own.rss_bytes,
+            threads=own.threads,
+            fds=own.fds,
+            children_cpu_percent=round(children_cpu_percent, 1),
+            children_rss_bytes=sum(usage.rss_bytes for usage in children.values()),
+            children_threads=sum(usage.threads for usage in children.values()),
+            children_fds=sum(usage.fds for usage in children.values()),
+            transitions=sum(
+                _session.machine.summary.total_transitions_visits_count for _session in sessions
+            ),
+            activity=" | ".join(session_activity(_session) for _session in sessions),
+        )
+        self.samples.append(sample)
+        if self.first_timestamp is None:
+            self.first_timestamp = sample.timestamp
+        for field in ResourceSample._fields:
+            if field.replace("children_", "") in PEAK_FIELDS:
+                peak = self._peaks.get(field)
+                if peak is None or getattr(sample, field) > getattr(peak, field):
+                    self._peaks[field] = sample
+        return sample
+
+    def _cpu_percents(
+        self, now: float, own: ProcessUsage, children: Dict[int, ProcessUsage]
+    ) -> Tuple[float, float]:
+        """Return the CPU usage of Magpie and of its children since the previous sample"""
+        child_ticks = {pid: usage.cpu_ticks for pid, usage in children.items()}
+        cpu_percent = children_cpu_percent = 0.0
+        if self._previous is not None:
+            previous_time, previous_ticks, previous_child_ticks = self._previous
+            ticks_per_s = os.sysconf("SC_CLK_TCK") * (now - previous_time)
+            cpu_percent = 100 * (own.cpu_ticks - previous_ticks) / ticks_per_s
+            # Only count the CPU time of children that were there last time, too:
+            children_ticks = sum(
+                ticks - previous_child_ticks[pid]
+                for pid, ticks in child_ticks.items()
+                if pid in previous_child_ticks
+            )
+            children_cpu_percent = 100 * children_ticks / ticks_per_s
+        self._previous = (now, own.cpu_ticks, child_ticks)
+        return cpu_percent, children_cpu_percent
+
+    def transitions_per_second(self) -> List[Tuple[float, float]]:
+        """Return (seconds since the first sample, transitions per second) for each interval"""
+        samples = list(self.samples)
+        timeline = []
+        for previous, sample in zip(samples, samples[1:]):
+            duration = sample.timestamp - previous.timestamp
+            rate = (sample.transitions - previous.transitions) / duration if duration > 0 else 0.0
+            timeline.append((sample.timestamp - self.first_timestamp, rate))
+        return timeline
+
+    def peaks(self) -> Dict[str, ResourceSample]:
+        """Return the sample with the highest value of each resource, over the whole run"""
+        return dict(self._peaks)
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(ResourceSample._fields)
+            writer.writerows(self.samples)
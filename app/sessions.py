@@ -20,7 +20,7 @@ import traceback
 from fnmatch import fnmatch
 from pathlib import Path
 from threading import Thread
-from time import sleep
+from time import monotonic, sleep
 from typing import List, Callable, Optional, Dict, Any
 from types import ModuleType
 
@@ -37,7 +37,12 @@ from playwright.sync_api import (
 
 from app import LOGGER, Strategy, EVENT_STORE, OUTPUTDIR, expect
 from app.actor import Actor
+from app.coverage_board import CoverageBoard
+from app.coverage_target import CoverageTarget
+from app.load_profiles import LoadProfile
 from app.pause_manager import pauseall
+from app.profiler import profile_thread
+from app.sync import SYNC, shutdown as sync_shutdown
 from app.fsm.model_based_actor import ModelBasedActor
 from app.fsm.machine import Machine, RunOptions
 
@@ -107,7 +112,7 @@ class SessionExecutionFailure(Exception):
 
 
 class Session:  # pylint:disable=too-many-instance-attributes
-    def __init__(  # pylint: disable=too-many-arguments
+    def __init__(  # pylint: disable=too-many-arguments, too-many-locals
         self,
         *,
         name: str,
@@ -122,6 +127,11 @@ class Session:  # pylint:disable=too-many-instance-attributes
         stop_at_state: str | None = None,
         retain_trace_file: bool = False,
         device: str | None = None,
+        seed: int | None = None,
+        data: Dict[str, Any] | None = None,
+        coverage_target: CoverageTarget | None = None,
+        saturation_transitions: int = -1,
+        saturation_s: float = -1,
     ) -> None:
         # pragma pylint: disable=line-too-long
         """Define a session
@@ -141,6 +151,11 @@ class Session:  # pylint:disable=too-many-instance-attributes
             stop_at_state (str): [optional] if specified, stop session at the state with this name
             retain_trace_file (bool): [optional] if True, always keep the recoded trace file (for sessions with browsers)
             device (str): [optional] name of device to emulate, see this list: https://github.com/microsoft/playwright/blob/main/packages/playwright-core/src/server/deviceDescriptorsSource.json
+            seed (int): [optional] seed for the random choices of the strategy. A random seed is used if not specified.
+            data (Dict[str, Any]): [optional] initial contents of `page.data`
+            coverage_target (CoverageTarget): [optional] if specified, stop when the state, action and/or transition coverage reaches these percentages
+            saturation_transitions (int): [optional] if specified, stop after this number of transitions without new coverage
+            saturation_s (float): [optional] if specified, stop after this number of seconds without new coverage
         """
         # Guard clauses - check data integrity
         for character in r"/\|*%?":
@@ -153,6 +168,11 @@ class Session:  # pylint:disable=too-many-instance-attributes
         self.tags: List[str] = tags
         self.retain_trace_file: bool = retain_trace_file
         self.device: str | None = device
+        self.data: Dict[str, Any] = data or {}
+        self.group: SessionGroup | None = None
+        # Schedule, in seconds from the start of all sessions (see load profiles):
+        self.start_offset_s: float = 0.0
+        self.stop_offset_s: float | None = None
         self._has_generic_failure: bool = False
 
         # If not supplied, assume actor is a model-based one for now (add more types later):
@@ -169,9 +189,16 @@ class Session:  # pylint:disable=too-many-instance-attributes
 
         # OK, proceed:
         self.run_options = RunOptions(
-            max_run_time_s, max_transitions, stop_on_fail, stop_at_state, strategy
+            max_run_time_s,
+            max_transitions,
+            stop_on_fail,
+            stop_at_state,
+            strategy,
+            coverage_target=coverage_target,
+            saturation_transitions=saturation_transitions,
+            saturation_s=saturation_s,
         )
-        self.machine = Machine(self.actor, **self.run_options.as_dict())
+        self.machine = Machine(self.actor, seed=seed, **self.run_options.as_dict())
 
     def record_generic_failure(self):
         self._has_generic_failure = True
@@ -189,6 +216,10 @@ class Session:  # pylint:disable=too-many-instance-attributes
     def start(self):
         self.machine.start()
 
+    def stop(self):
+        """Ask the session to stop after the current step"""
+        self.machine.stop()
+
     def teardown(self):
         """Run teardown functions"""
         if hasattr(self.actor, "teardown") and callable(self.actor.teardown):
@@ -217,12 +248,105 @@ class Session:  # pylint:disable=too-many-instance-attributes
     def name_lowercase(self):
         return re.sub(r"[^a-z0-9_]", "", self.name.lower().replace(" ", "_"))
 
+    @property
+    def seed(self) -> int:
+        """Return the seed used for the random choices of the strategy"""
+        return self.machine.seed
+
+
+def share_coverage(sessions: List[Session]) -> CoverageBoard:
+    """Let the sessions share one coverage board. They must have the same model."""
+    board = CoverageBoard(sessions[0].machine.model)
+    for session in sessions:
+        session.machine.coverage_board = board
+    return board
+
+
+class SessionGroup:
+    """Multiply one session definition into a number of replicas
+
+    Each replica is a session of its own, named "<name> #<number>". All
+    replicas share the same compiled model, but get a seed and data of
+    their own.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        replicas: int,
+        seed: int | None = None,
+        data_factory: Callable[[int], Dict[str, Any]] | None = None,
+        load_profile: LoadProfile | None = None,
+        shared_coverage: bool = False,
+        **session_kwargs,
+    ) -> None:
+        # pragma pylint: disable=line-too-long
+        """Define a group of sessions
+
+        Args:
+            name (str): The name of the group. Replicas are named "<name> #1", "<name> #2" etc.
+            replicas (int): The number of sessions to create
+            seed (int): [optional] if specified, replica number n gets the seed `seed + n`. Otherwise each replica gets a random seed.
+            data_factory (Callable[[int], Dict[str, Any]]): [optional] called with the replica number, returns the initial `page.data` of the replica
+            load_profile (LoadProfile): [optional] when to start and stop the replicas, see the load_profiles module. Default is to start all replicas at once.
+            shared_coverage (bool): [optional] if True, the replicas share a coverage board and spread out over the model, see the coverage_board module
+            session_kwargs: Any other arguments accepted by Session, e.g. `actor_module`, `browser` and `strategy`
+        """
+        # pragma pylint: enable=line-too-long
+        if replicas < 1:
+            raise SessionConfigurationError(f"Session group {name}: replicas must be at least 1")
+        if "actor" in session_kwargs:
+            raise SessionConfigurationError(
+                f"Session group {name}: Use `actor_module`, replicas can't share an actor instance"
+            )
+        self.name: str = name
+        self.load_profile: LoadProfile = load_profile or LoadProfile()
+        self.sessions: List[Session] = []
+        schedule = self.load_profile.schedule(replicas)
+        for number in range(1, replicas + 1):
+            session = Session(
+                name=f"{name} #{number}",
+                seed=None if seed is None else seed + number,
+                data=data_factory(number) if data_factory else None,
+                **session_kwargs,
+            )
+            session.group = self
+            session.start_offset_s, session.stop_offset_s = schedule[number - 1]
+            self.sessions.append(session)
+        if shared_coverage:
+            share_coverage(self.sessions)
+
+    @property
+    def load_profile_description(self) -> str:
+        return self.load_profile.describe(len(self.sessions))
+
+    @property
+    def has_failures(self) -> bool:
+        return any(session.has_failures for session in self.sessions)
+
+    def __iter__(self):
+        return iter(self.sessions)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
 
 def start_session(
-    session: Session, headless: bool = False
+    session: Session, headless: bool = False, profile: str | None = None
 ):  # pylint: disable=too-many-locals, too-many-statements
-    """Runs a session. Returns False on failure, True otherwise."""
-    session_data = dict()
+    """Runs a session. Returns False on failure, True otherwise.
+
+    If `profile` is set to a profile mode (see the profiler module), the
+    session's thread is profiled.
+    """
+    if profile:
+        file_stem = Path(OUTPUTDIR) / "profile" / session.name_lowercase
+        with profile_thread(profile, file_stem):
+            start_session(session, headless)
+        return
+
+    session_data = dict(session.data)
     has_browser = session.browser
 
     LOGGER.info("STARTING SESSION %s", session.name)
@@ -263,8 +387,12 @@ def start_session(
             page.register_on_response_callback = on_response(page)
             page.pauseall = lambda: pauseall(page)
             page.pauseall.__doc__ = pauseall.__doc__
+            page.barrier = SYNC.barrier
+            page.semaphore = SYNC.semaphore
+            page.latch = SYNC.latch
             #   Set default timeout:
             session.machine.browser_page = page
+            session.machine.flight_recorder.watch_page(page)
             session_aborted = False
 
             context.tracing.start(screenshots=True, snapshots=True, sources=True)
@@ -274,6 +402,7 @@ def start_session(
                 session.start()
             except KeyboardInterrupt as exc:
                 LOGGER.info("✋ Session aborted by user!")
+                sync_shutdown()
                 try:
                     page._loop.close()  # pylint: disable=protected-access
                 except RuntimeError:
@@ -305,6 +434,28 @@ def start_session(
     LOGGER.info('"%s": 🏁 Stopping session', session.machine.current_state.name)
 
 
+def _run_schedule(sessions: List[Session], threads: List[Thread]) -> None:
+    """Start and stop session threads at their scheduled offsets"""
+    # (offset, is_start, index), stops go before starts at the same offset:
+    events = [(session.start_offset_s, 1, idx) for idx, session in enumerate(sessions)]
+    events += [
+        (session.stop_offset_s, 0, idx)
+        for idx, session in enumerate(sessions)
+        if session.stop_offset_s is not None
+    ]
+    start_time = monotonic()
+    for offset, is_start, idx in sorted(events):
+        delay = start_time + offset - monotonic()
+        if delay > 0:
+            sleep(delay)
+        if is_start:
+            LOGGER.info("Scheduler: starting `%s` at %ss", sessions[idx].name, round(offset, 1))
+            threads[idx].start()
+        else:
+            LOGGER.info("Scheduler: stopping `%s` at %ss", sessions[idx].name, round(offset, 1))
+            sessions[idx].stop()
+
+
 def _stop_tracing(session: Session, context: BrowserContext, save_file: bool = False):
     if save_file:
         outputdir = Path(OUTPUTDIR)
@@ -317,36 +468,49 @@ def _stop_tracing(session: Session, context: BrowserContext, save_file: bool = F
         context.tracing.stop()
 
 
-def start_sessions(sessions: List[Session], headless: bool = False) -> None:
-    """Run each session in a new thread until all threads are finished."""
+def start_sessions(
+    sessions: List[Session], headless: bool = False, profile: str | None = None
+) -> None:
+    """Run each session in a new thread until all threads are finished.
+
+    Sessions with a schedule (see load profiles) are started and stopped by
+    a central scheduler, running on the main thread.
+    """
     threads: List[Thread] = []
+    is_scheduled = any(
+        session.start_offset_s > 0 or session.stop_offset_s is not None for session in sessions
+    )
 
-    if len(sessions) == 1:
+    if len(sessions) == 1 and not is_scheduled:
         # Run on main thread if only one session.
         session = sessions[0]
-        start_session(session, headless)
+        start_session(session, headless, profile)
 
-    elif len(sessions) > 1:
+    elif sessions:
         # Run each session in a separate thread.
         for session in sessions:
             thread = Thread(
                 target=start_session,
-                args=(session, headless),
+                args=(session, headless, profile),
                 daemon=True,
                 name=session.name,
             )
             threads.append(thread)
 
-        for thread in threads:
-            thread.start()
-
-        # Wait for execution to finish:
         try:
+            if is_scheduled:
+                _run_schedule(sessions, threads)
+            else:
+                for thread in threads:
+                    thread.start()
+
+            # Wait for execution to finish:
             for thread in threads:
                 LOGGER.info("Waiting for thread `%s` to finish.", thread.name)
                 thread.join()
         except KeyboardInterrupt:
             LOGGER.info("User pressed CTRL+C. Stopping all threads...")
+            sync_shutdown()
 
     # Save event store:
     event_store_file = str(Path(OUTPUTDIR) / "event_store.csv")
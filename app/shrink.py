@@ -0,0 +1,190 @@
+"""Shrink a failing session to a short path that fails the same way
+
+Start from a replay file (see the replay module) of a failing session:
+
+    python main.py shrink tests/my_test.py output/replay/consumer.json
+
+The recorded transitions are minimized with delta debugging: parts of the
+path are removed, and where that leaves a gap between two transitions, the
+gap is bridged with the shortest path through the model. A candidate path is
+kept if replaying it fails at the same state or action as the original.
+Candidates are replayed one at a time, in clones of the failing session.
+Running them in parallel would let them interfere with each other through
+EVENT_STORE and STATE_STORE.
+
+The result is saved next to the replay file as <session>_shrunk.json, ready
+for `main.py replay`.
+"""
+from __future__ import annotations
+
+from typing import Callable, List
+
+from app import LOGGER
+from app.fsm.model import Model, PathError
+from app.fsm.transition import Transition
+from app.replay import ReplayInfo
+from app.sessions import Session, SessionConfigurationError, start_session
+
+
+# Replays each path, returns the first failure of each (empty if none):
+RunnerType = Callable[[List[List[str]]], List[str]]
+
+
+def _bridge(model: Model, from_state: str, to_state: str) -> List[str] | None:
+    """Return the names of the transitions of the shortest path between two states"""
+    try:
+        state_names = list(model.shortest_path(from_state, to_state))
+    except (PathError, ValueError):
+        return None
+    names = []
+    for state_name in state_names:
+        outbounds = [
+            outbound
+            for outbound in model.states[from_state].outbounds
+            if outbound.end_state.name == state_name
+        ]
+        # Prefer transitions without conditions, they can always be taken:
+        outbounds.sort(key=lambda outbound: outbound.condition is not None)
+        names.append(outbounds[0].name)
+        from_state = state_name
+    return names
+
+
+def splice(model: Model, transition_names: List[str]) -> List[str] | None:
+    """Make a path that can be followed from the initial state
+
+    Gaps between transitions are bridged with shortest paths. Return None
+    if a gap can't be bridged.
+    """
+    state_name = model.initial_state.name
+    path = []
+    for name in transition_names:
+        transition: Transition = model.transitions[name]
+        if transition.start_state.name != state_name:
+            bridge = _bridge(model, state_name, transition.start_state.name)
+            if bridge is None:
+                return None
+            path += bridge
+        path.append(name)
+        state_name = transition.end_state.name
+    return path
+
+
+class Shrinker:
+    """Minimize a failing path with delta debugging and shortest path splicing"""
+
+    def __init__(self, model: Model, run_candidates: RunnerType) -> None:
+        self.model: Model = model
+        self.run_candidates: RunnerType = run_candidates
+        self.failure: str = ""
+        self.runs: int = 0
+
+    def _first_reproducing(self, candidates: List[List[str]]) -> List[str] | None:
+        """Replay the candidates, return the first one that fails like the original"""
+        if not candidates:
+            return None
+        failures = self.run_candidates(candidates)
+        self.runs += len(candidates)
+        for candidate, failure in zip(candidates, failures):
+            if failure == self.failure:
+                return candidate
+        return None
+
+    def shrink(self, transition_names: List[str]) -> List[str] | None:
+        """Return the shortest failing path found, None if the original path doesn't fail"""
+        # Replay the original path, to learn how it fails and where it stops:
+        self.failure = self.run_candidates([transition_names])[0]
+        self.runs += 1
+        if not self.failure:
+            return None
+        LOGGER.info(
+            "Shrinking %s transitions failing with: %s", len(transition_names), self.failure
+        )
+        path = list(transition_names)
+        granularity = 2
+        while len(path) >= 2:
+            granularity = min(granularity, len(path))
+            size = len(path) / granularity
+            chunks = [path[int(idx * size) : int((idx + 1) * size)] for idx in range(granularity)]
+            subsets = [splice(self.model, chunk) for chunk in chunks]
+            complements = [
+                splice(self.model, path[: int(idx * size)] + path[int((idx + 1) * size) :])
+                for idx in range(granularity)
+            ]
+            candidates = []
+            for candidate in subsets + complements:
+                if (
+                    candidate is not None
+                    and len(candidate) < len(path)
+                    and candidate not in candidates
+                ):
+                    candidates.append(candidate)
+            shorter = self._first_reproducing(candidates)
+            if shorter is not None:
+                LOGGER.info("Shrinking: %s -> %s transitions", len(path), len(shorter))
+                granularity = 2 if shorter in subsets else max(granularity - 1, 2)
+                path = shorter
+            elif granularity >= len(path):
+                break
+            else:
+                granularity = min(granularity * 2, len(path))
+        return path
+
+
+def _clone(session: Session, number: int) -> Session:
+    """Return a new session defined like the given one, that stops on its first failure"""
+    actor_module = getattr(session.actor, "actor_module", None)
+    if actor_module is None:
+        raise SessionConfigurationError(
+            f"Session {session.name}: only sessions with an `actor_module` can be shrunk"
+        )
+    # A new actor of the same kind, with the same configuration:
+    actor = session.actor.__class__(actor_module=actor_module, config=session.actor.config)
+    return Session(
+        name=f"{session.name} (shrink {number})",
+        actor=actor,
+        browser=session.browser,
+        strategy=session.run_options.strategy,
+        stop_at_state=session.run_options.stop_at_state,
+        tags=session.tags,
+        retain_trace_file=session.retain_trace_file,
+        device=session.device,
+        data=dict(session.data),
+        stop_on_fail=True,
+    )
+
+
+def session_runner(session: Session, seed: int, headless: bool = False) -> RunnerType:
+    """Return a function that replays paths in clones of the session, one at a time"""
+    clones: List[Session] = []
+
+    def run_candidates(paths: List[List[str]]) -> List[str]:
+        failures = []
+        for path in paths:
+            clone = _clone(session, len(clones) + 1)
+            clone.machine.follow(path, seed)
+            clone.machine.pacing = False
+            clones.append(clone)
+            start_session(clone, headless)
+            failures.append("" if clone.machine.replay_diverged else clone.machine.first_failure)
+        return failures
+
+    return run_candidates
+
+
+def shrink_replay(
+    session: Session, replay_info: ReplayInfo, headless: bool = False
+) -> ReplayInfo | None:
+    """Shrink a recorded session. Return the shrunk replay, None if the failure didn't reproduce."""
+    runner = session_runner(session, replay_info.seed, headless)
+    shrinker = Shrinker(session.machine.model, runner)
+    path = shrinker.shrink(replay_info.transitions)
+    if path is None:
+        return None
+    LOGGER.info(
+        "Shrunk %s transitions to %s in %s runs",
+        len(replay_info.transitions),
+        len(path),
+        shrinker.runs,
+    )
+    return ReplayInfo(session.name, replay_info.seed, path, True, shrinker.failure)
@@ -0,0 +1,295 @@
+"""Synchronization primitives shared by all sessions
+
+Barriers, counting semaphores and countdown latches are identified by name,
+so that state and action functions in different sessions can reach the same
+object through `page` or `actor`:
+
+    page.barrier("all users submit", parties=3).wait(timeout_s=60)
+
+    with actor.semaphore("scarce test account", value=1):
+        ...
+
+All waits block with a timeout. The timeout clock is stopped while execution
+is paused (see the pause_manager module), and all waits return early when
+the test is shutting down, or when the waiting session is asked to stop.
+Call reset() before each run.
+
+Actions run while their session holds THREAD_LOCK. A session that waits
+releases the lock until the wait is over, so that the other sessions can
+reach the same barrier, or free the slot it is waiting for.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from contextlib import contextmanager
+from threading import Condition, Event, Lock
+from typing import Callable, Dict, Iterator, Type, TypeVar
+
+import app.pause_manager
+
+from app.lock_profiler import THREAD_LOCK
+
+
+DEFAULT_TIMEOUT_S = 30.0
+_WAIT_SLICE_S = 0.1
+
+_SHUTDOWN = Event()
+# The stop check of the session running in each thread, see stop_waits_when():
+_THREAD_STATE = threading.local()
+
+PrimitiveT = TypeVar("PrimitiveT", "Barrier", "Semaphore", "Latch")
+
+
+#####################
+# CUSTOM EXCEPTIONS
+#
+class SyncTimeoutError(Exception):
+    """Raise when a synchronization primitive could not be acquired in time"""
+
+
+####################
+# HELPER FUNCTIONS
+#
+def shutdown() -> None:
+    """Wake up all waiting sessions and make further waits fail immediately"""
+    _SHUTDOWN.set()
+    wake_all()
+
+
+def is_shutting_down() -> bool:
+    """Return True if shutdown() has been called"""
+    return _SHUTDOWN.is_set()
+
+
+def reset() -> None:
+    """Forget the shutdown and all primitives of an earlier run"""
+    _SHUTDOWN.clear()
+    SYNC.clear()
+
+
+def wake_all() -> None:
+    """Wake up all waiting sessions, so that they check whether they should stop"""
+    for primitive in SYNC.primitives():
+        primitive.notify_all()
+
+
+@contextmanager
+def stop_waits_when(stop_requested: Callable[[], bool]) -> Iterator[None]:
+    """Make the waits of the current thread return early once stop_requested() is True"""
+    _THREAD_STATE.stop_requested = stop_requested
+    try:
+        yield
+    finally:
+        _THREAD_STATE.stop_requested = None
+
+
+def _wait_until(condition: Condition, predicate: Callable[[], bool], timeout_s: float) -> bool:
+    """Wait on condition until predicate() is True
+
+    Must be called with the condition's lock held. Time spent while execution
+    is paused does not count towards the timeout. Return the final value of
+    predicate(), i.e. False on timeout, shutdown or when the session stops.
+    """
+    stop_requested = getattr(_THREAD_STATE, "stop_requested", None)
+    remaining = timeout_s
+    while not predicate():
+        if _SHUTDOWN.is_set() or remaining <= 0 or (stop_requested and stop_requested()):
+            return False
+        start = time.monotonic()
+        condition.wait(min(_WAIT_SLICE_S, remaining))
+        if not app.pause_manager.is_paused():
+            remaining -= time.monotonic() - start
+    return True
+
+
+##############
+# PRIMITIVES
+#
+class Barrier:
+    """Let a number of parties wait for each other
+
+    Unlike threading.Barrier, a party that times out withdraws from the
+    barrier instead of breaking it for everybody else.
+    """
+
+    def __init__(self, name: str, parties: int) -> None:
+        if parties < 1:
+            raise ValueError(f"Barrier `{name}` needs at least one party, got {parties}")
+        self.name: str = name
+        self.parties: int = parties
+        self._condition = Condition(Lock())
+        self._waiting: int = 0
+        self._generation: int = 0
+
+    @property
+    def waiting(self) -> int:
+        """Return the number of parties currently waiting"""
+        with self._condition:
+            return self._waiting
+
+    def wait(self, timeout_s: float = DEFAULT_TIMEOUT_S) -> bool:
+        """Block until all parties have called wait()
+
+        Return True when the barrier was passed, False on timeout or shutdown.
+        """
+        with THREAD_LOCK.released(), self._condition:
+            generation = self._generation
+            self._waiting += 1
+            if self._waiting == self.parties:
+                self._waiting = 0
+                self._generation += 1
+                self._condition.notify_all()
+                return True
+            passed = _wait_until(
+                self._condition, lambda: self._generation != generation, timeout_s
+            )
+            if not passed:
+                self._waiting -= 1
+            return passed
+
+    def notify_all(self) -> None:
+        """Wake up all waiting sessions, so that they notice a shutdown"""
+        with self._condition:
+            self._condition.notify_all()
+
+
+class Semaphore:
+    """Cap the number of sessions using a shared resource at the same time"""
+
+    def __init__(self, name: str, value: int) -> None:
+        if value < 1:
+            raise ValueError(f"Semaphore `{name}` needs a value of at least one, got {value}")
+        self.name: str = name
+        self.value: int = value
+        self._condition = Condition(Lock())
+        self._available: int = value
+
+    @property
+    def available(self) -> int:
+        """Return the number of free slots"""
+        with self._condition:
+            return self._available
+
+    def acquire(self, timeout_s: float = DEFAULT_TIMEOUT_S) -> bool:
+        """Take a slot. Return False if none became free in time, or on shutdown."""
+        with THREAD_LOCK.released(), self._condition:
+            if not _wait_until(self._condition, lambda: self._available > 0, timeout_s):
+                return False
+            self._available -= 1
+            return True
+
+    def release(self) -> None:
+        """Give back a slot"""
+        with self._condition:
+            if self._available >= self.value:
+                raise ValueError(f"Semaphore `{self.name}` released too many times")
+            self._available += 1
+            self._condition.notify()
+
+    def notify_all(self) -> None:
+        """Wake up all waiting sessions, so that they notice a shutdown"""
+        with self._condition:
+            self._condition.notify_all()
+
+    def __enter__(self) -> Semaphore:
+        if not self.acquire(DEFAULT_TIMEOUT_S):
+            raise SyncTimeoutError(
+                f"Semaphore `{self.name}`: no slot became free within {DEFAULT_TIMEOUT_S}s"
+            )
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.release()
+
+
+class Latch:
+    """Let sessions wait until a number of events have happened"""
+
+    def __init__(self, name: str, count: int) -> None:
+        if count < 0:
+            raise ValueError(f"Latch `{name}` can't have a negative count, got {count}")
+        self.name: str = name
+        self._condition = Condition(Lock())
+        self._count: int = count
+
+    @property
+    def count(self) -> int:
+        """Return the number of count_down() calls left before the latch opens"""
+        with self._condition:
+            return self._count
+
+    def count_down(self) -> None:
+        """Decrease the count, open the latch when it reaches zero"""
+        with self._condition:
+            if self._count > 0:
+                self._count -= 1
+                if self._count == 0:
+                    self._condition.notify_all()
+
+    def wait(self, timeout_s: float = DEFAULT_TIMEOUT_S) -> bool:
+        """Block until the count reaches zero. Return False on timeout or shutdown."""
+        with THREAD_LOCK.released(), self._condition:
+            return _wait_until(self._condition, lambda: self._count == 0, timeout_s)
+
+    def notify_all(self) -> None:
+        """Wake up all waiting sessions, so that they notice a shutdown"""
+        with self._condition:
+            self._condition.notify_all()
+
+
+############
+# REGISTRY
+#
+class SyncRegistry:
+    """Hand out named synchronization primitives, creating them on first use"""
+
+    def __init__(self) -> None:
+        self._primitives: Dict[str, Barrier | Semaphore | Latch] = {}
+        self._lock = Lock()
+
+    def barrier(self, name: str, parties: int) -> Barrier:
+        """Return the barrier with this name, create it for `parties` parties if it doesn't exist"""
+        return self._get(Barrier, name, parties, "parties")
+
+    def semaphore(self, name: str, value: int = 1) -> Semaphore:
+        """Return the semaphore with this name, create it with `value` slots if it doesn't exist"""
+        return self._get(Semaphore, name, value, "value")
+
+    def latch(self, name: str, count: int) -> Latch:
+        """Return the latch with this name, create it with `count` if it doesn't exist"""
+        return self._get(Latch, name, count, None)
+
+    def primitives(self) -> list:
+        """Return all primitives created so far"""
+        with self._lock:
+            return list(self._primitives.values())
+
+    def clear(self) -> None:
+        """Forget all primitives"""
+        with self._lock:
+            self._primitives.clear()
+
+    def _get(
+        self, cls: Type[PrimitiveT], name: str, size: int, size_attr: str | None
+    ) -> PrimitiveT:
+        with self._lock:
+            primitive = self._primitives.get(name)
+            if primitive is None:
+                primitive = cls(name, size)
+                self._primitives[name] = primitive
+        if not isinstance(primitive, cls):
+            raise ValueError(
+                f"`{name}` is a {primitive.__class__.__name__}, not a {cls.__name__}"
+            )
+        if size_attr and getattr(primitive, size_attr) != size:
+            raise ValueError(
+                f"{cls.__name__} `{name}` already exists with "
+                f"{size_attr}={getattr(primitive, size_attr)}, not {size}"
+            )
+        return primitive
+
+
+# Create global registry of synchronization primitives:
+SYNC = SyncRegistry()
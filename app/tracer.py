@@ -0,0 +1,110 @@
+"""Trace sessions, states, actions and conditions as spans
+
+Spans are written to a JSON file in the Trace Event Format, which can be
+opened in Chrome (about:tracing) or Perfetto (https://ui.perfetto.dev).
+All session threads are shown on one timeline.
+
+Tracing is off by default, enable it with `main.py run --trace`. When it
+is off, begin() and end() return right away. Only the last `MAX_EVENTS`
+spans are kept, older spans are dropped.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+from collections import deque
+from typing import Any, Deque, Dict
+
+from app.logger import LOGGER
+
+MAX_EVENTS = 200_000
+
+
+class Span:  # pylint: disable=too-few-public-methods
+    """An open span, returned by Tracer.begin()"""
+
+    __slots__ = ("name", "category", "start_us", "thread_id", "args")
+
+    def __init__(self, name: str, category: str, args: Dict[str, Any]) -> None:
+        self.name = name
+        self.category = category
+        self.start_us = time.perf_counter_ns() // 1000
+        self.thread_id = threading.get_ident()
+        self.args = args
+
+
+class Tracer:
+    """Collect spans from all threads"""
+
+    def __init__(self, max_events: int = MAX_EVENTS) -> None:
+        self.enabled: bool = False
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self.dropped: int = 0
+        self._thread_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def begin(self, name: str, category: str, **args: Any) -> Span | None:
+        """Start a span. Return None if tracing is disabled."""
+        if not self.enabled:
+            return None
+        span = Span(name, category, args)
+        if span.thread_id not in self._thread_names:
+            self._thread_names[span.thread_id] = threading.current_thread().name
+        return span
+
+    def end(self, span: Span | None, **args: Any) -> None:
+        """Finish a span, adding args (e.g. the result) to it"""
+        if span is None:
+            return
+        span.args.update(args)
+        event = {
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            "ts": span.start_us,
+            "dur": time.perf_counter_ns() // 1000 - span.start_us,
+            "pid": os.getpid(),
+            "tid": span.thread_id,
+            "args": {key: str(value) for key, value in span.args.items()},
+        }
+        with self._lock:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+
+    def save(self, file_path: str) -> None:
+        """Save all finished spans to a trace file"""
+        with self._lock:
+            events = list(self.events)
+        if self.dropped:
+            LOGGER.warning(
+                "⚠️  The trace only has the last %s spans, %s dropped", len(events), self.dropped
+            )
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": thread_id,
+                "args": {"name": thread_name},
+            }
+            for thread_id, thread_name in self._thread_names.items()
+        ]
+        with open(file_path, "w") as trace_file:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, trace_file)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.events.clear()
+            self.dropped = 0
+            self._thread_names.clear()
+
+
+# Create the global tracer:
+TRACER = Tracer()
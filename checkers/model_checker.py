@@ -8,7 +8,7 @@ from __future__ import annotations
 import sys
 
 from app.fsm.model import ModelError
-from app.parser import FileParser
+from app.model_cache import MODEL_CACHE
 
 from typing import List
 
@@ -19,13 +19,12 @@ def check(args: str | List[str]) -> int:
     Log output to STDOUT. Return exit code 0 on success, 
     exit code > 0 on fail.
     """
-    file_parser = FileParser()
     if isinstance(args, str):
         args = [args]
     exit_code = 0
     for file_to_check in args:
         try:
-            file_parser.parse(file_to_check)
+            MODEL_CACHE.parse(file_to_check)
         except ModelError as err:
             print(err)
             exit_code = 1
@@ -1,12 +1,16 @@
-#!.pyenv/bin/python  # pylint: disable=missing-module-docstring
+#!.pyenv/bin/python  # pylint: disable=missing-module-docstring, too-many-lines
 import argparse
+import csv
+import json
+import logging
 import os
 import sys
 import time
 from pathlib import Path
 
 from importlib import import_module
-from typing import List, Dict
+from types import ModuleType
+from typing import List, Dict, Optional
 
 import graphviz
 
@@ -15,13 +19,30 @@ from packaging import version
 from playwright._repo_version import version as playwright_version
 from texttable import Texttable
 
-from app import LOGGER
+from app import EVENT_STORE, LOGGER, THREAD_LOCK
 from app.fsm.action import Action
+from app.fsm.results import VisitsAndResults
 from app.fsm.state import State
-from app.sessions import start_sessions, Session
+from app.fsm.transition import Transition
+from app.capacity import CapacitySearch
+from app.sessions import start_sessions, share_coverage, Session, SessionGroup
 from app.render import render_session
 from app.fsm.model import ModelError
+from app.coverage_board import CoverageBoard
+from app.coverage_store import CoverageStore, actor_key, resume_from_journal
+from app.coverage_target import CoverageTarget, GlobalCoverage
+from app.flight_recorder import DEFAULT_STEPS
+from app.journal import JOURNAL, JournalError, JournalReader, JournalRecord
+from app.replay import ReplayError, ReplayInfo, load_replay, save_replay, write_replay
+from app.shrink import shrink_replay
+from app.memory_tracker import MemoryTracker
+from app.metrics import MetricsServer
 from app.parser import ParsingError
+from app.profiler import PROFILE_MODES
+from app.rate_limiter import RATE_LIMITER, RateLimit
+from app.resource_sampler import ResourceSampler
+from app.sync import reset as sync_reset
+from app.tracer import TRACER
 from app.ide.server import main as magpie_ide_main
 from app.properties import running_in_docker
 from app.versions import get_version_string, GitNotFoundError
@@ -48,6 +69,9 @@ SESSIONS_ASCII = r"""
 """
 
 SESSIONS: List[Session] = []
+GROUPS: List[SessionGroup] = []
+CAPACITY_SEARCHES: List[CapacitySearch] = []
+RESOURCE_SAMPLER: Optional[ResourceSampler] = None
 RESULTS: Dict[str, any] = dict()
 WHAT_TO_RUN: str
 
@@ -78,20 +102,14 @@ def check_playwright_compatibility():
         raise PlaywrightVersionError(err_msg)
 
 
-def run(  # pylint: disable=too-many-locals, too-many-branches, too-many-statements
-    what_to_run: str, headless=False
-) -> int:
-    """Run a test and return the exit code"""
-    global SESSIONS, WHAT_TO_RUN  # pylint: disable=global-statement
-    # TODO: Refactor to decrease cyclomatic complexy, increase testability etc.
-
+def import_test(what_to_run: str) -> ModuleType:
+    """Import the test file or directory as a module and return it"""
     # Sanity check:
     what_path = Path(what_to_run)
     if not what_path.exists():
         LOGGER.warning("Could not find '%s', stopping...", what_to_run)
         sys.exit(1)
 
-    WHAT_TO_RUN = what_to_run
     # Import what to run as a module:
     module = None
     if what_path.is_file():
@@ -120,22 +138,90 @@ def run(  # pylint: disable=too-many-locals, too-many-branches, too-many-stateme
         LOGGER.info("   Errors:")
         LOGGER.info("     %s", "\n     ".join(str(err).split("\n")))
         sys.exit(1)
+    return test
+
+
+def run(  # pylint: disable=too-many-locals, too-many-branches, too-many-statements
+    what_to_run: str,
+    headless=False,
+    *,
+    profile: str = None,
+    track_memory: int = 0,
+    memory_budget_mb: float = None,
+    flight_recorder_steps: int = DEFAULT_STEPS,
+    coverage_store: Optional[CoverageStore] = None,
+    resume_records: Optional[List[JournalRecord]] = None,
+    shared_coverage: bool = False,
+) -> int:
+    """Run a test and return the exit code"""
+    global SESSIONS, GROUPS, CAPACITY_SEARCHES, WHAT_TO_RUN  # pylint: disable=global-statement
+    # TODO: Refactor to decrease cyclomatic complexy, increase testability etc.
+
+    WHAT_TO_RUN = what_to_run
+    test = import_test(what_to_run)
 
     # Create sessions list from module:
     SESSIONS = []
+    GROUPS = []
+    CAPACITY_SEARCHES = []
+    RATE_LIMITER.configure(None)
+    THREAD_LOCK.reset()
+    sync_reset()
     test_setup_fn = None
     test_teardown_fn = None
+    coverage_target = None
     for attr_name in dir(test):
         attr = getattr(test, attr_name)
         if isinstance(attr, Session):
             SESSIONS.append(attr)
+        if isinstance(attr, SessionGroup):
+            GROUPS.append(attr)
+            SESSIONS.extend(attr.sessions)
+        if isinstance(attr, CapacitySearch):
+            CAPACITY_SEARCHES.append(attr)
+        if attr_name == "RATE_LIMIT" and isinstance(attr, RateLimit):
+            RATE_LIMITER.configure(attr)
+        if attr_name == "COVERAGE_TARGET" and isinstance(attr, CoverageTarget):
+            coverage_target = attr
         if attr_name == "test_setup" and callable(attr):
             test_setup_fn = attr
         if attr_name == "test_teardown" and callable(attr):
             test_teardown_fn = attr
 
+    # Apply the run settings to each session, capacity searches apply them to their replicas:
+    global_coverage = GlobalCoverage(coverage_target, []) if coverage_target else None
+    coverage_boards: Dict[str, CoverageBoard] = {}
+
+    def configure_session(_session: Session) -> None:
+        _session.machine.flight_recorder.steps = flight_recorder_steps
+        # Carry coverage over from earlier runs, if required by user:
+        if coverage_store:
+            _session.machine.coverage_history = coverage_store.history(
+                actor_key(_session), _session.machine.model
+            )
+        if shared_coverage:
+            board = coverage_boards.get(actor_key(_session))
+            if board:
+                _session.machine.coverage_board = board
+            else:
+                coverage_boards[actor_key(_session)] = share_coverage([_session])
+        if global_coverage:
+            global_coverage.sessions.append(_session)
+            _session.machine.global_coverage = global_coverage
+        # Track memory, if required by user:
+        if track_memory or memory_budget_mb:
+            _session.machine.memory_tracker = MemoryTracker(
+                track_memory or 1000, budget_mb=memory_budget_mb
+            )
+
+    for _session in SESSIONS:
+        configure_session(_session)
+    if resume_records:
+        resumed_count = resume_from_journal(SESSIONS, resume_records)
+        LOGGER.info("Resumed %s visits from the journal", resumed_count)
+
     # Anything to run?
-    if not test_setup_fn and not SESSIONS and not test_teardown_fn:
+    if not test_setup_fn and not SESSIONS and not CAPACITY_SEARCHES and not test_teardown_fn:
         LOGGER.info("Nothing to run. Bye, bye! 👋")
         sys.exit(0)
 
@@ -150,10 +236,16 @@ def run(  # pylint: disable=too-many-locals, too-many-branches, too-many-stateme
 
     # Start the sessions:
     exec_ok = True
-    if SESSIONS:
+    if SESSIONS or CAPACITY_SEARCHES:
         start_time = time.time()
         LOGGER.info("----- SESSIONS -----")
-        start_sessions(SESSIONS, headless)
+        if SESSIONS:
+            start_sessions(SESSIONS, headless, profile)
+        # Capacity searches add sessions as they go:
+        for search in CAPACITY_SEARCHES:
+            LOGGER.info("----- CAPACITY SEARCH: %s -----", search.name)
+            search.run(headless, profile, configure_session)
+            SESSIONS.extend(search.sessions)
         for _session in SESSIONS:
             exec_ok = exec_ok and not _session.has_failures
         session_exec_time = round(time.time() - start_time, 3)
@@ -168,6 +260,7 @@ def run(  # pylint: disable=too-many-locals, too-many-branches, too-many-stateme
         teardown_exec_time = round(time.time() - start_time, 3)
     else:
         teardown_exec_time = 0
+    EVENT_STORE.close()
     LOGGER.info("----- DONE! -----")
 
     total_exec_time = setup_exec_time + session_exec_time + teardown_exec_time
@@ -180,17 +273,147 @@ def run(  # pylint: disable=too-many-locals, too-many-branches, too-many-stateme
     return 0 if exec_ok else 1
 
 
+def _step_prompt(step: int, transition: Transition) -> None:
+    """Wait for the user before taking the next transition of a replay"""
+    arrow = f"{transition.start_state.name} {transition.arrow} {transition.end_state.name}"
+    input(f"Step {step}: {arrow}. Press Enter to continue...")
+
+
+def _load_replay_session(what_to_run: str, replay_file: str) -> tuple:
+    """Return the replay info and the session it was recorded from"""
+    try:
+        replay_info = load_replay(replay_file)
+    except ReplayError as err:
+        LOGGER.warning("%s, stopping...", err)
+        sys.exit(1)
+    test = import_test(what_to_run)
+
+    # Find the session, it may be a replica of a session group:
+    candidates = []
+    for attr_name in dir(test):
+        attr = getattr(test, attr_name)
+        if isinstance(attr, Session):
+            candidates.append(attr)
+        if isinstance(attr, SessionGroup):
+            candidates.extend(attr.sessions)
+    session = next((cand for cand in candidates if cand.name == replay_info.session), None)
+    if session is None:
+        LOGGER.warning(
+            "Could not find session '%s' in '%s', stopping...", replay_info.session, what_to_run
+        )
+        sys.exit(1)
+    return replay_info, session
+
+
+def replay(what_to_run: str, replay_file: str, headless=False, step=False) -> int:
+    """Replay a session from a replay file and return the exit code"""
+    global SESSIONS, WHAT_TO_RUN  # pylint: disable=global-statement
+
+    WHAT_TO_RUN = what_to_run
+    replay_info, session = _load_replay_session(what_to_run, replay_file)
+    SESSIONS = [session]
+    RATE_LIMITER.configure(None)
+    THREAD_LOCK.reset()
+    sync_reset()
+
+    # Follow the recorded transitions, quickly or step by step:
+    session.machine.follow(replay_info.transitions, replay_info.seed)
+    if step:
+        session.machine.step_callback = _step_prompt
+    else:
+        session.machine.pacing = False
+    LOGGER.info(
+        "----- REPLAY: %s (%s transitions, seed %s) -----",
+        session.name,
+        len(replay_info.transitions),
+        replay_info.seed,
+    )
+    start_sessions(SESSIONS, headless)
+    EVENT_STORE.close()
+
+    failed = session.has_failures
+    if session.machine.replay_diverged:
+        LOGGER.warning("⚠️  The replay diverged from the recorded session")
+    elif replay_info.failed and failed:
+        LOGGER.info("✅ The failure was reproduced")
+    elif replay_info.failed:
+        LOGGER.warning("⚠️  The failure was NOT reproduced")
+    return 1 if failed or session.machine.replay_diverged else 0
+
+
+def shrink(what_to_run: str, replay_file: str, headless=False) -> int:
+    """Shrink a failing session from a replay file and return the exit code"""
+    global WHAT_TO_RUN  # pylint: disable=global-statement
+
+    WHAT_TO_RUN = what_to_run
+    replay_info, session = _load_replay_session(what_to_run, replay_file)
+    LOGGER.info(
+        "----- SHRINK: %s (%s transitions) -----", session.name, len(replay_info.transitions)
+    )
+    shrunk: Optional[ReplayInfo] = shrink_replay(session, replay_info, headless)
+    EVENT_STORE.close()
+    if shrunk is None:
+        LOGGER.warning("⚠️  Replaying '%s' did not fail, nothing to shrink", replay_file)
+        return 1
+    file_path = str(Path(replay_file).parent / f"{session.name_lowercase}_shrunk.json")
+    write_replay(shrunk, file_path)
+    LOGGER.info("Failure: %s", shrunk.error)
+    LOGGER.info("Shortest failing path:")
+    for transition_name in shrunk.transitions:
+        LOGGER.info("  %s", transition_name)
+    LOGGER.info("Saved shrunk replay: %s", file_path)
+    return 0
+
+
+def save_coverage(coverage_store: CoverageStore) -> None:
+    """Add the coverage of all sessions to the coverage store, per actor"""
+    sessions_by_actor: Dict[str, List[Session]] = {}
+    for _session in SESSIONS:
+        sessions_by_actor.setdefault(actor_key(_session), []).append(_session)
+    for key, sessions in sessions_by_actor.items():
+        coverage_store.update(key, sessions)
+    coverage_store.save()
+
+
+def save_replays(outputdir: str) -> None:
+    """Save the seed and the attempted transitions of each session, for replay"""
+    replay_dir = Path(outputdir) / "replay"
+    replay_dir.mkdir(exist_ok=True)
+    for _session in SESSIONS:
+        save_replay(_session, str(replay_dir / f"{_session.name_lowercase}.json"))
+
+
+def live_sessions() -> List[Session]:
+    """Return all sessions, including the ones started so far by capacity searches"""
+    sessions = list(SESSIONS)
+    for search in CAPACITY_SEARCHES:
+        sessions += [_session for _session in list(search.sessions) if _session not in sessions]
+    return sessions
+
+
 def compile_sessions_info() -> str:  # pylint: disable=too-many-locals, too-many-statements
     """Return a multiline string containing sessions data"""
     table = Texttable()
     table.set_deco(Texttable.HEADER)
     table.set_chars(["-", "|", "+", "-"])
-    table.set_cols_width([40, 25])
+    table.set_cols_width([40, 20, 7, 7, 7, 7])
+    table.set_cols_align(["l", "l", "r", "r", "r", "r"])
+    table.set_cols_dtype(["t", "t", "t", "t", "t", "t"])
+    header = ["RESULT COUNTS", "P50", "P95", "P99", "MAX"]
 
     def _coverage_string(coverage: int) -> str:
         """Return a human-friendly coverage string"""
         return f"{round(coverage)}%" if coverage else "--"
 
+    def _result_columns(results: Optional[VisitsAndResults]) -> List[str]:
+        """Return the result counts and latency percentiles, in seconds"""
+        if results is None:
+            return ["", "", "", "", ""]
+        durations = results.durations
+        latencies = [durations.percentile(pct) for pct in (50, 95, 99)] + [durations.max_s]
+        latencies = [f"{latency:.3f}" if latency is not None else "" for latency in latencies]
+        return [results.short_summary] + latencies
+
     out = ""
 
     for _session in SESSIONS:
@@ -203,7 +426,10 @@ def compile_sessions_info() -> str:  # pylint: disable=too-many-locals, too-many
         out += "* " + "=" * (len(title) + 2) + "\n"
         out += "*\n"
         out += f"*   Run time..............: {round(_summary.duration, 3)}s\n"
+        out += f"*   Seed..................: {_session.seed}\n"
         out += f"*   Transitions...........: {_summary.total_transitions_visits_count}\n"
+        if _session.machine.flight_recorder.flush_count:
+            out += f"*   Flight recorder.......: {_session.machine.flight_recorder.file_path}\n"
         # Coverage info:
         coverage = _coverage_string(_summary.states_coverage)
         out += f"*   States coverage.......: {coverage}\n"
@@ -213,6 +439,11 @@ def compile_sessions_info() -> str:  # pylint: disable=too-many-locals, too-many
         out += f"*   Transitions coverage..: {coverage}\n"
         # TODO: Separate transition coverage (Happy / all)
         out += "*\n"
+        # Time breakdown:
+        out += "*   Time breakdown:\n"
+        for description, seconds, percentage in _summary.time_breakdown.rows(_summary.duration):
+            out += f"*     {(description + '.' * 22)[:22]}: {seconds:9.3f}s {percentage:>4}%\n"
+        out += "*\n"
         # Switch formatting with Black on again:
         # fmt: on
 
@@ -226,28 +457,40 @@ def compile_sessions_info() -> str:  # pylint: disable=too-many-locals, too-many
 
         # STATES:
         table.reset()
-        table.add_rows([["STATE NAME", "RESULT COUNTS"]], header=True)
+        table.add_rows([["STATE NAME"] + header], header=True)
         for state_name in sorted(_session.machine.model.states.keys()):
             state_results = _summary.results.states.get(state_name, None)
-            short_summary = state_results.short_summary if state_results else ""
             state_string = (f"{state_name[:40]}" + "." * 40)[:40]
-            table.add_row([state_string, short_summary])
+            table.add_row([state_string] + _result_columns(state_results))
         lines = table.draw()
         out += "*" + "\n*   ".join(lines.split("\n")) + "\n"
         out += "*\n"
 
         # ACTIONS:
         table.reset()
-        table.add_rows([["ACTION NAME", "RESULT COUNTS"]], header=True)
+        table.add_rows([["ACTION NAME"] + header], header=True)
         for action_name in sorted(_session.machine.model.actions.keys()):
             action_results = _summary.results.actions.get(action_name, None)
-            short_summary = action_results.short_summary if action_results else ""
             action_name = action_name.replace(" ", "_").lower()
             action_string = (f"{action_name[:38]}()" + "." * 40)[:40]
-            table.add_row([action_string, short_summary])
+            table.add_row([action_string] + _result_columns(action_results))
         lines = table.draw()
         out += "*" + "\n*   ".join(lines.split("\n")) + "\n"
 
+        # CONDITIONS:
+        if _summary.results.conditions:
+            out += "*\n"
+            table.reset()
+            table.add_rows([["CONDITION NAME", "EVALUATIONS"] + header[1:]], header=True)
+            for condition_name in sorted(_summary.results.conditions.keys()):
+                condition_results = _summary.results.conditions[condition_name]
+                condition_string = (f"{condition_name[:40]}" + "." * 40)[:40]
+                columns = _result_columns(condition_results)
+                columns[0] = str(condition_results.visits_count)
+                table.add_row([condition_string] + columns)
+            lines = table.draw()
+            out += "*" + "\n*   ".join(lines.split("\n")) + "\n"
+
         # UNCOVERED STATES:
         out += "*\n"
         uncovered_states = _summary.unvisited_states.keys()
@@ -276,6 +519,28 @@ def compile_sessions_info() -> str:  # pylint: disable=too-many-locals, too-many
     return out
 
 
+def save_latency_histograms(outputdir: str) -> str:
+    """Save the latency histograms of all sessions to a JSON file, return the file path"""
+
+    def _histograms(collection: Dict[str, VisitsAndResults]) -> Dict:
+        return {name: results.durations.as_dict() for name, results in collection.items()}
+
+    data = {"module": WHAT_TO_RUN, "sessions": {}}
+    for _session in SESSIONS:
+        _results = _session.machine.summary.results
+        data["sessions"][_session.name] = {
+            "seed": _session.seed,
+            "duration": _session.machine.summary.duration,
+            "actions": _histograms(_results.actions),
+            "states": _histograms(_results.states),
+            "conditions": _histograms(_results.conditions),
+        }
+    file_path = os.path.join(outputdir, "latency_histograms.json")
+    with open(file_path, "w") as histograms_file:
+        json.dump(data, histograms_file, indent=2)
+    return file_path
+
+
 def get_file_contents_if_it_exists(relative_path: str, alt_text="") -> str:
     """Returns the contents of a file, if it can be found
 
@@ -402,6 +667,13 @@ def compile_summary() -> str:  # pylint: disable=too-many-locals, too-many-state
     out += f"  States per session and second......: {states_per_session_and_second}\n"
     # pylint: enable=line-too-long
 
+    out += compile_groups_summary(duration)
+    out += compile_rate_limit_summary()
+    out += compile_capacity_summary()
+    out += compile_lock_summary()
+    out += compile_resources_summary()
+    out += compile_memory_summary()
+
     if actions_with_errors:
         out += "\n  " + "\n  ".join(actions_with_errors) + "\n"
     if states_with_errors:
@@ -409,11 +681,225 @@ def compile_summary() -> str:  # pylint: disable=too-many-locals, too-many-state
     return out
 
 
+def peak_concurrency(sessions: List[Session]) -> int:
+    """Return the highest number of sessions that were running at the same time"""
+    events = []
+    for _session in sessions:
+        if _session.machine.start_time is not None:
+            events.append((_session.machine.start_time, 1))
+            events.append((_session.machine.start_time + _session.machine.summary.duration, -1))
+    running = peak = 0
+    for _, change in sorted(events):
+        running += change
+        peak = max(peak, running)
+    return peak
+
+
+def compile_groups_summary(duration: float) -> str:
+    """Return a multiline string containing summary data aggregated per session group"""
+
+    def _coverage(visited: set, total: dict) -> str:
+        percentage = round(100 * len(visited) / len(total)) if total else 100
+        return f"{len(visited)} of {len(total)} ({percentage}%)"
+
+    out = ""
+    for group in GROUPS:
+        summaries = [_session.machine.summary for _session in group.sessions]
+        model = group.sessions[0].machine.model
+        transitions_count = sum(_summary.total_transitions_visits_count for _summary in summaries)
+        visited_states = set().union(*(_summary.visited_states for _summary in summaries))
+        visited_actions = set().union(*(_summary.visited_actions for _summary in summaries))
+        visited_transitions = set().union(
+            *(_summary.visited_transitions for _summary in summaries)
+        )
+        failing_replicas = [_session for _session in group.sessions if _session.has_failures]
+        per_second = round(transitions_count / duration, 2) if duration > 0 else "N/A"
+
+        # pylint: disable=line-too-long
+        out += "\n"
+        out += f"  GROUP: {group.name} ({len(group.sessions)} replicas)\n"
+        out += f"    Load profile................: {group.load_profile_description}\n"
+        out += f"    Peak concurrent sessions....: {peak_concurrency(group.sessions)}\n"
+        out += f"    Transitions visited.........: {transitions_count} ({per_second} per second)\n"
+        out += f"    Unique states visited.......: {_coverage(visited_states, model.states)}\n"
+        out += f"    Unique actions visited......: {_coverage(visited_actions, model.actions)}\n"
+        out += f"    Unique transitions visited..: {_coverage(visited_transitions, model.transitions)}\n"
+        out += f"    Replicas with failures......: {len(failing_replicas)} of {len(group.sessions)}\n"
+        # pylint: enable=line-too-long
+    return out
+
+
+def compile_rate_limit_summary() -> str:
+    """Return a multiline string containing the target and achieved rates, if rate limited"""
+    if not RATE_LIMITER.stats:
+        return ""
+    out = "\n  RATE LIMITS:\n"
+    for key, stats in RATE_LIMITER.stats.items():
+        name = "All actions" if key == "*" else key
+        achieved = stats.achieved_per_s
+        achieved = f"{achieved:.2f}" if achieved is not None else "N/A"
+        out += (
+            f"    {name}: target {stats.target_per_s}/s, achieved {achieved}/s, "
+            f"{stats.count} calls, throttled for {stats.throttled_s:.1f}s\n"
+        )
+    throttled = [_session for _session in SESSIONS if _session.machine.throttled_s > 0]
+    for _session in throttled:
+        out += f"    {_session.name}: throttled for {_session.machine.throttled_s:.1f}s\n"
+    return out
+
+
+def compile_capacity_summary() -> str:
+    """Return a multiline string containing the latency curve of each capacity search"""
+
+    def _seconds(value: Optional[float]) -> str:
+        return f"{value:.3f}s" if value is not None else "N/A"
+
+    out = ""
+    for search in CAPACITY_SEARCHES:
+        out += "\n"
+        out += f"  CAPACITY SEARCH: {search.name}\n"
+        out += f"    Max sustainable concurrency.: {search.max_sustainable_concurrency}\n"
+        out += f"    Limits......................: p95 <= {search.p95_threshold_s}s, "
+        out += f"failure rate <= {search.max_failure_rate:.0%}\n"
+        out += "    SESSIONS   ACTIONS   P50       P95       P99       FAILED   VERDICT\n"
+        for step in search.steps:
+            out += (
+                f"    {step.concurrency:<10} {step.actions_count:<9} {_seconds(step.p50_s):<9} "
+                f"{_seconds(step.p95_s):<9} {_seconds(step.p99_s):<9} "
+                f"{step.failure_rate:<8.1%} {step.verdict}\n"
+            )
+        action_names = sorted({name for step in search.steps for name in step.action_p95_s})
+        if action_names:
+            out += f"{'    P95 PER ACTION, BY SESSIONS':<34}: "
+            out += " ".join(f"{step.concurrency:<9}" for step in search.steps).rstrip() + "\n"
+            for name in action_names:
+                out += f"      {name[:28]:.<28}: "
+                out += " ".join(
+                    f"{_seconds(step.action_p95_s.get(name)):<9}" for step in search.steps
+                ).rstrip()
+                out += "\n"
+    return out
+
+
+def compile_lock_summary() -> str:
+    """Return a multiline string showing who held the sessions lock while others waited"""
+    blockers = THREAD_LOCK.top_blockers()
+    blocked = THREAD_LOCK.most_blocked()
+    if not blockers and not blocked:
+        return ""
+    out = "\n  LOCK CONTENTION:\n"
+    out += "    Top blockers (others waited while these held the lock):\n"
+    for holder, label, stats in blockers:
+        out += (
+            f"      {holder}, {label}: caused {stats.caused_wait_s:.2f}s of waiting, "
+            f"held {stats.count} times for {stats.hold_s:.2f}s (max {stats.max_hold_s:.2f}s)\n"
+        )
+    out += "    Most blocked sessions:\n"
+    for holder, stats in blocked:
+        out += (
+            f"      {holder}: waited {stats.wait_s:.2f}s in total (max {stats.max_wait_s:.2f}s), "
+            f"held the lock for {stats.hold_s:.2f}s\n"
+        )
+    return out
+
+
+def compile_resources_summary() -> str:
+    """Return a multiline string with peak resource usage and the transitions per second"""
+    if not RESOURCE_SAMPLER or not RESOURCE_SAMPLER.samples:
+        return ""
+    start = RESOURCE_SAMPLER.first_timestamp
+    units = {"cpu_percent": "%", "rss_bytes": " MB", "fds": "", "threads": ""}
+    out = "\n  RESOURCES (peaks):\n"
+    for field, sample in RESOURCE_SAMPLER.peaks().items():
+        value = getattr(sample, field)
+        unit = units[field.replace("children_", "")]
+        value = round(value / 2**20) if unit == " MB" else value
+        process = "Browsers etc." if field.startswith("children_") else "Magpie"
+        resource = field.replace("children_", "").replace("_percent", "").replace("_bytes", "")
+        out += (
+            f"    {(process + ' ' + resource.upper() + '.' * 24)[:24]}: {value}{unit} "
+            f"at {round(sample.timestamp - start)}s - {sample.activity or 'no sessions'}\n"
+        )
+    timeline = RESOURCE_SAMPLER.transitions_per_second()
+    if timeline:
+        # Show at most 20 points, each the average of a number of intervals:
+        points_per_bucket = -(-len(timeline) // 20)
+        buckets = [
+            timeline[idx : idx + points_per_bucket]
+            for idx in range(0, len(timeline), points_per_bucket)
+        ]
+        out += "    Transitions per second:\n"
+        for bucket in buckets:
+            rate = sum(rate for _, rate in bucket) / len(bucket)
+            out += f"      {bucket[0][0]:>7.1f}s: {rate:8.2f}\n"
+    return out
+
+
+def compile_memory_summary() -> str:
+    """Return a multiline string with the allocation sites that grew the most, per session"""
+    out = ""
+    for _session in SESSIONS:
+        tracker = _session.machine.memory_tracker
+        if not tracker or not tracker.intervals:
+            continue
+        growth_mb = sum(interval.growth_bytes for interval in tracker.intervals) / 2**20
+        out += "\n"
+        out += f"  MEMORY: {_session.name}\n"
+        out += f"    Snapshots...................: {len(tracker.intervals)}, every {tracker.every_n_transitions} transitions\n"  # pylint: disable=line-too-long
+        out += f"    Growth......................: {growth_mb:.1f} MB, {tracker.traced_bytes / 2**20:.1f} MB traced at the end\n"  # pylint: disable=line-too-long
+        if tracker.budget_exceeded:
+            out += "    Budget......................: EXCEEDED, the session was stopped\n"
+        out += "    Top growing allocation sites:\n"
+        for site, size_diff, count_diff in tracker.top_growth()[:5]:
+            out += f"      {size_diff / 1024:+.1f} KiB ({count_diff:+} blocks) {site}\n"
+    return out
+
+
+def save_memory_growth(outputdir: str) -> Optional[str]:
+    """Save the growth per interval of all tracked sessions to a CSV file, return the file path"""
+    trackers = [
+        (_session.name, _session.machine.memory_tracker)
+        for _session in SESSIONS
+        if _session.machine.memory_tracker and _session.machine.memory_tracker.intervals
+    ]
+    if not trackers:
+        return None
+    file_path = os.path.join(outputdir, "memory_growth.csv")
+    with open(file_path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(
+            (
+                "Session",
+                "Transitions",
+                "TracedBytes",
+                "GrowthBytes",
+                "Site",
+                "SiteGrowthBytes",
+                "SiteGrowthBlocks",
+            )
+        )
+        for session_name, tracker in trackers:
+            for interval in tracker.intervals:
+                for site, size_diff, count_diff in interval.top_growth:
+                    writer.writerow(
+                        (
+                            session_name,
+                            interval.transitions,
+                            interval.traced_bytes,
+                            interval.growth_bytes,
+                            site,
+                            size_diff,
+                            count_diff,
+                        )
+                    )
+    return file_path
+
+
 def parse_arguments(*args) -> argparse.Namespace:
     # Configure the argument parser:
     parser = argparse.ArgumentParser("main.py")
 
-    subparsers = parser.add_subparsers()
+    subparsers = parser.add_subparsers(dest="command")
     run_parser = subparsers.add_parser("run", help="Run a Magpie test")
     run_parser.add_argument("MODULE")
     run_parser.add_argument(
@@ -422,6 +908,114 @@ def parse_arguments(*args) -> argparse.Namespace:
         default=False,
         help="Run web browser(s) in the backgound",
     )
+    run_parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        default=None,
+        help="Profile each session thread, save the results in OUTPUTDIR/profile",
+    )
+    run_parser.add_argument(
+        "--trace",
+        action="store_true",
+        default=False,
+        help="Trace all states, actions and conditions to OUTPUTDIR/magpie_trace.json",
+    )
+    run_parser.add_argument(
+        "--profile-lock",
+        action="store_true",
+        default=False,
+        help="Save who held the sessions lock while others waited to OUTPUTDIR/lock_timeline.csv",
+    )
+    run_parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve live metrics for Prometheus on this port, at /metrics",
+    )
+    run_parser.add_argument(
+        "--quiet",
+        action="store_true",
+        default=False,
+        help="Only log warnings and errors while running, rely on the flight recorder",
+    )
+    run_parser.add_argument(
+        "--flight-recorder",
+        type=int,
+        default=DEFAULT_STEPS,
+        metavar="N",
+        help=(
+            "Save the last N steps of a session when it fails, 0 to switch off "
+            f"(default={DEFAULT_STEPS})"
+        ),
+    )
+    run_parser.add_argument(
+        "--coverage-store",
+        default=None,
+        metavar="FILE",
+        help="Prefer transitions not covered by recent runs, and add this run's coverage to FILE",
+    )
+    run_parser.add_argument(
+        "--shared-coverage",
+        action="store_true",
+        default=False,
+        help=(
+            "Let all sessions of the same actor share their coverage "
+            "and spread out over the model"
+        ),
+    )
+    run_parser.add_argument(
+        "--resume",
+        default=None,
+        metavar="JOURNAL",
+        help="Continue the coverage, and failures, of a crashed run from its run.journal",
+    )
+    run_parser.add_argument(
+        "--track-memory",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Compare tracemalloc snapshots every N transitions of each session",
+    )
+    run_parser.add_argument(
+        "--memory-budget-mb",
+        type=float,
+        default=None,
+        help="Stop a session when Python has allocated more than this many MB",
+    )
+    run_parser.add_argument(
+        "--resource-interval",
+        type=float,
+        default=0,
+        help="Sample CPU, memory etc. every this many seconds, e.g. 1 (default=0, off)",
+    )
+
+    replay_parser = subparsers.add_parser("replay", help="Replay a session of an earlier run")
+    replay_parser.add_argument("MODULE")
+    replay_parser.add_argument("REPLAY_FILE", help="A file from OUTPUTDIR/replay")
+    replay_parser.add_argument(
+        "--headless",
+        action="store_true",
+        default=False,
+        help="Run web browser(s) in the backgound",
+    )
+    replay_parser.add_argument(
+        "--step",
+        action="store_true",
+        default=False,
+        help="Wait for Enter before each transition, instead of replaying as fast as possible",
+    )
+
+    shrink_parser = subparsers.add_parser(
+        "shrink", help="Find a short path that fails like a session of an earlier run"
+    )
+    shrink_parser.add_argument("MODULE")
+    shrink_parser.add_argument("REPLAY_FILE", help="A file from OUTPUTDIR/replay")
+    shrink_parser.add_argument(
+        "--headless",
+        action="store_true",
+        default=False,
+        help="Run web browser(s) in the backgound",
+    )
 
     ide_parser = subparsers.add_parser("ide", help="Open the Magpie model IDE")
     ide_parser.add_argument("ACTOR")
@@ -550,10 +1144,11 @@ def send_test_issues_info_to_azure_devops(ci_test_spec_display_name: str, ci_mod
 ########
 # MAIN
 #
-def main():
+def main():  # pylint: disable=too-many-locals, too-many-branches, too-many-statements
+    global RESOURCE_SAMPLER  # pylint: disable=global-statement
     parsed_args = parse_arguments(sys.argv[1:])
 
-    if hasattr(parsed_args, "ACTOR"):
+    if parsed_args.command == "ide":
         # Start the Magpie IDE and exit:
         magpie_ide_main(parsed_args.ACTOR, parsed_args.port)
         sys.exit(0)
@@ -586,17 +1181,97 @@ def main():
     # Run the test file:
     LOGGER.info("-" * 79)
     sys.path.append(os.getcwd())
+    if parsed_args.command == "shrink":
+        exit_code = shrink(parsed_args.MODULE, parsed_args.REPLAY_FILE, parsed_args.headless)
+        LOGGER.info("Exiting with exit code %s", exit_code)
+        sys.exit(exit_code)
+    if parsed_args.command == "replay":
+        exit_code = replay(
+            parsed_args.MODULE, parsed_args.REPLAY_FILE, parsed_args.headless, parsed_args.step
+        )
+        print_test_summary(parsed_args.MODULE, outputdir, ci_mode)
+        LOGGER.info("Exiting with exit code %s", exit_code)
+        sys.exit(exit_code)
+    if parsed_args.trace:
+        TRACER.enable()
+    if parsed_args.profile_lock:
+        THREAD_LOCK.enable()
+    if parsed_args.resource_interval > 0:
+        RESOURCE_SAMPLER = ResourceSampler(live_sessions, parsed_args.resource_interval)
+        RESOURCE_SAMPLER.start()
+    if parsed_args.quiet:
+        LOGGER.info("Running quietly, only warnings and errors are logged until the summary")
+        LOGGER.setLevel(logging.WARNING)
+    # Read the journal to resume from before it may be overwritten by this run's journal:
+    resume_records = None
+    if parsed_args.resume:
+        try:
+            resume_records = list(JournalReader(parsed_args.resume))
+        except (OSError, JournalError) as err:
+            LOGGER.warning("Can't resume from '%s': %s, stopping...", parsed_args.resume, err)
+            sys.exit(1)
+    coverage_store = None
+    if parsed_args.coverage_store:
+        coverage_store = CoverageStore(parsed_args.coverage_store)
+    journal_path = os.path.join(outputdir, "run.journal")
+    JOURNAL.open(journal_path)
+    metrics_server = None
+    if parsed_args.metrics_port is not None:
+        metrics_server = MetricsServer(parsed_args.metrics_port, live_sessions)
+        metrics_server.start()
     try:
-        exit_code = run(parsed_args.MODULE, parsed_args.headless)
+        exit_code = run(
+            parsed_args.MODULE,
+            parsed_args.headless,
+            profile=parsed_args.profile,
+            track_memory=parsed_args.track_memory,
+            memory_budget_mb=parsed_args.memory_budget_mb,
+            flight_recorder_steps=parsed_args.flight_recorder,
+            coverage_store=coverage_store,
+            resume_records=resume_records,
+            shared_coverage=parsed_args.shared_coverage,
+        )
     except RuntimeError:
         LOGGER.warning(
             "WARNING: All operations on the page did not finish. "
             "The forced shutdown may cause side effects!"
         )
         exit_code = 1
+    finally:
+        LOGGER.setLevel(logging.INFO)
+        JOURNAL.close()
+        if metrics_server:
+            metrics_server.stop()
+        if RESOURCE_SAMPLER:
+            RESOURCE_SAMPLER.stop()
 
     send_test_issues_info_to_azure_devops(ci_test_spec_display_name, ci_mode)
     print_test_summary(parsed_args.MODULE, outputdir, ci_mode)
+    if SESSIONS and coverage_store:
+        save_coverage(coverage_store)
+        LOGGER.info(
+            "Saved coverage store: %s (run %s)", coverage_store.file_path, coverage_store.run
+        )
+    if SESSIONS:
+        save_replays(outputdir)
+        LOGGER.info("Saved replay files: %s", os.path.join(outputdir, "replay"))
+        LOGGER.info("Saved latency histograms: %s", save_latency_histograms(outputdir))
+    if SESSIONS and THREAD_LOCK.enabled:
+        lock_timeline_path = os.path.join(outputdir, "lock_timeline.csv")
+        THREAD_LOCK.save_timeline(lock_timeline_path)
+        LOGGER.info("Saved lock timeline: %s", lock_timeline_path)
+    memory_growth_path = save_memory_growth(outputdir)
+    if memory_growth_path:
+        LOGGER.info("Saved memory growth: %s", memory_growth_path)
+    if RESOURCE_SAMPLER and RESOURCE_SAMPLER.samples:
+        resources_path = os.path.join(outputdir, "resources.csv")
+        RESOURCE_SAMPLER.save(resources_path)
+        LOGGER.info("Saved resource usage: %s", resources_path)
+    LOGGER.info("Saved run journal: %s", journal_path)
+    if TRACER.enabled:
+        trace_path = os.path.join(outputdir, "magpie_trace.json")
+        TRACER.save(trace_path)
+        LOGGER.info("Saved trace: %s (open in https://ui.perfetto.dev)", trace_path)
 
     # Exit with exit code
     LOGGER.info("Exiting with exit code %s", exit_code)
@@ -0,0 +1,130 @@
+"""Test the capacity search"""
+import time
+
+import pytest
+
+from app.capacity import CapacitySearch, CapacityStep
+from app.fsm.action import Action
+from app.fsm.histogram import LatencyHistogram
+from app.fsm.results import Result
+from app.sessions import SessionConfigurationError
+
+
+def test_capacity_step():
+    durations = LatencyHistogram()
+    for duration_s in (0.1, 0.2, 0.3, 0.4):
+        durations.record(duration_s)
+    rare = LatencyHistogram()
+    rare.record(0.9)
+    step = CapacityStep(concurrency=2, durations={"Common": durations, "Rare": rare}, failures=1)
+    assert step.actions_count == 5
+    assert step.p50_s == pytest.approx(0.3, rel=0.02)
+    assert step.action_p95_s["Common"] == pytest.approx(0.4, rel=0.02)
+    assert step.action_p95_s["Rare"] == pytest.approx(0.9, rel=0.02)
+    assert step.slowest_action()[0] == "Rare"
+    assert step.failure_rate == 0.2
+
+
+def test_invalid_capacity_search(mock_actor_module):
+    with pytest.raises(SessionConfigurationError):
+        CapacitySearch(
+            name="Bad", initial_replicas=3, max_replicas=2, actor_module=mock_actor_module
+        )
+
+
+def test_capacity_search_finds_knee(mock_actor_module, mocker):
+    action = Action("Do it")
+
+    def fake_start_session(session, *_):
+        # Latency grows with the number of sessions, 10 ms per session:
+        while not session.machine._stop_requested:  # pylint: disable=protected-access
+            latency = 0.01 * len(search.sessions)
+            session.machine.summary.record_visit(action, Result.PASSED, latency)
+            time.sleep(0.005)
+
+    mocker.patch("app.capacity.start_session", side_effect=fake_start_session)
+    search = CapacitySearch(
+        name="Capacity",
+        step=1,
+        max_replicas=10,
+        step_duration_s=0.05,
+        p95_threshold_s=0.035,
+        actor_module=mock_actor_module,
+    )
+
+    assert search.run() == 3
+    assert [step.concurrency for step in search.steps] == [1, 2, 3, 4]
+    assert [step.verdict for step in search.steps][-1] == "p95 of 'Do it' above 0.035s"
+    assert len(search.sessions) == 4
+
+
+def test_capacity_search_stops_on_slow_rare_action(mock_actor_module, mocker):
+    fast = Action("Fast")
+    rare = Action("Rare")
+
+    def fake_start_session(session, *_):
+        # From two sessions on, one in fifty actions is slow. The p95 of all actions together
+        # doesn't show it:
+        count = 0
+        while not session.machine._stop_requested:  # pylint: disable=protected-access
+            count += 1
+            if len(search.sessions) > 1 and count % 50 == 0:
+                session.machine.summary.record_visit(rare, Result.PASSED, 0.5)
+            else:
+                session.machine.summary.record_visit(fast, Result.PASSED, 0.001)
+            time.sleep(0.0005)
+
+    mocker.patch("app.capacity.start_session", side_effect=fake_start_session)
+    search = CapacitySearch(
+        name="Capacity",
+        step=1,
+        max_replicas=10,
+        step_duration_s=0.05,
+        p95_threshold_s=0.1,
+        actor_module=mock_actor_module,
+    )
+
+    assert search.run() == 1
+    assert search.steps[-1].p95_s < 0.1
+    assert search.steps[-1].verdict == "p95 of 'Rare' above 0.1s"
+
+
+def test_capacity_search_stops_at_max_replicas(mock_actor_module, mocker):
+    def fake_start_session(session, *_):
+        while not session.machine._stop_requested:  # pylint: disable=protected-access
+            time.sleep(0.005)
+
+    mocker.patch("app.capacity.start_session", side_effect=fake_start_session)
+    search = CapacitySearch(
+        name="Capacity",
+        initial_replicas=2,
+        step=2,
+        max_replicas=5,
+        step_duration_s=0.01,
+        actor_module=mock_actor_module,
+    )
+    search.run()
+    assert len(search.sessions) == 5
+    assert len(search.steps) == 3
+    assert all(step.verdict == "OK" for step in search.steps)
+    assert search.max_sustainable_concurrency == 5
+
+
+def test_capacity_search_stops_when_sessions_end(mock_actor_module, mocker):
+    mocker.patch("app.capacity.start_session")
+    search = CapacitySearch(name="Capacity", step_duration_s=0.01, actor_module=mock_actor_module)
+    assert search.run() == 0
+    assert search.steps[0].verdict == "all sessions have ended"
+
+
+def test_capacity_search_configures_replicas_before_they_start(mock_actor_module, mocker):
+    configured = []
+    started_configured = []
+    mocker.patch(
+        "app.capacity.start_session",
+        side_effect=lambda session, *_: started_configured.append(session in configured),
+    )
+    search = CapacitySearch(name="Capacity", step_duration_s=0.01, actor_module=mock_actor_module)
+    search.run(configure_session=configured.append)
+    assert configured == search.sessions
+    assert started_configured == [True]
@@ -0,0 +1,62 @@
+"""Test sharing coverage between sessions"""
+from app import Strategy
+from app.coverage_board import CoverageBoard
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.parser import FileParser
+from app.sessions import SessionGroup
+
+TEMPLATE = """
+A  first   ->  B
+A  second  ->  C
+A  third   ->  D
+"""
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+def test_board(mocker):
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=TEMPLATE)
+    board = CoverageBoard(FileParser().parse("using/template/instead"))
+    board.cover("A:None:first:B", "Session #1")
+    board.cover("A:None:first:B", "Session #2")
+    assert board.is_covered("A:None:first:B")
+    assert not board.is_covered("A:None:second:C")
+    assert board.covered == {"A:None:first:B": "Session #1"}
+    assert board.coverage == 1 / 3
+
+
+def test_sessions_spread_out(mocker):
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=TEMPLATE)
+    board = None
+    taken = []
+    for _ in range(3):
+        mock_actor = MockActor()
+        mock_actor.model = FileParser().parse("using/template/instead")
+        for action in mock_actor.model.actions.values():
+            action.fn = lambda _: None
+        board = board or CoverageBoard(mock_actor.model)
+        # The same seed would make the same choice, if it were not for the board:
+        machine = Machine(mock_actor, strategy=Strategy.SmartRandom, seed=0)
+        machine.coverage_board = board
+        machine.start()
+        taken += [transition.name for transition in machine.audit_trail.attempts]
+    assert sorted(taken) == sorted(mock_actor.model.transitions)
+    assert board.coverage == 1.0
+
+
+def test_group_shares_board(mock_actor_module):
+    group = SessionGroup(
+        name="Shared", replicas=3, actor_module=mock_actor_module, shared_coverage=True
+    )
+    boards = {id(session.machine.coverage_board) for session in group}
+    assert len(boards) == 1
+    assert group.sessions[0].machine.coverage_board is not None
+
+    group = SessionGroup(name="Own", replicas=2, actor_module=mock_actor_module)
+    assert all(session.machine.coverage_board is None for session in group)
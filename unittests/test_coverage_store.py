@@ -0,0 +1,120 @@
+"""Test carrying coverage over between runs"""
+from app import Strategy
+from app.coverage_store import (
+    CoverageStore,
+    actor_key,
+    resume_from_journal,
+    transition_fingerprint,
+)
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.fsm.results import Result
+from app.journal import Journal, JournalReader
+from app.parser import FileParser
+from app.sessions import Session
+
+TEMPLATE = """
+A  go     ->  B
+A  other  ->  C
+"""
+GO, OTHER = "A:None:go:B", "A:None:other:C"
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+def go_v1(_):
+    pass
+
+
+def go_v2(_):
+    return None
+
+
+def other_action(_):
+    pass
+
+
+def parse_model(mocker) -> Model:
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=TEMPLATE)
+    model = FileParser().parse("using/template/instead")
+    model.actions["go"].fn = go_v1
+    model.actions["other"].fn = other_action
+    return model
+
+
+def test_save_and_load(mock_actor_module, tmp_path):
+    file_path = str(tmp_path / "coverage.json")
+    session = Session(name="Covered", actor_module=mock_actor_module)
+    transition = next(iter(session.machine.model.transitions.values()))
+    session.machine.summary.record_visit(transition, Result.PASSED)
+
+    store = CoverageStore(file_path)
+    assert store.run == 1
+    assert not store.history(actor_key(session), session.machine.model)
+    store.update(actor_key(session), [session])
+    store.save()
+
+    store = CoverageStore(file_path)
+    assert store.run == 2
+    assert store.history(actor_key(session), session.machine.model) == {transition.name: 1}
+
+
+def test_changed_code_invalidates_only_affected_transitions(mocker, tmp_path):
+    model = parse_model(mocker)
+    session = mocker.Mock()
+    session.machine.model = model
+    session.machine.summary.results.transitions = {}
+    for name in (GO, OTHER):
+        session.machine.summary.results.transitions[name] = mocker.Mock(
+            visits_count=1, fail_count=0
+        )
+    store = CoverageStore(str(tmp_path / "coverage.json"))
+    store.update("actor", [session])
+
+    fingerprint = transition_fingerprint(model.transitions[GO])
+    model.actions["go"].fn = go_v2
+    assert transition_fingerprint(model.transitions[GO]) != fingerprint
+    assert store.history("actor", model) == {OTHER: 1}
+
+
+def test_prefers_least_recently_covered(mocker):
+    for seed in range(10):
+        mock_actor = MockActor()
+        mock_actor.model = parse_model(mocker)
+        machine = Machine(mock_actor, strategy=Strategy.SmartRandom, seed=seed)
+        machine.coverage_history = {GO: 3, OTHER: 1}
+        machine.start()
+        assert [trns.name for trns in machine.audit_trail.attempts] == [OTHER]
+
+
+def test_resume_from_journal(mock_actor_module, tmp_path):
+    file_path = str(tmp_path / "run.journal")
+    session = Session(name="Resumed", actor_module=mock_actor_module)
+    transition = next(iter(session.machine.model.transitions.values()))
+    journal = Journal()
+    journal.open(file_path)
+    journal.record("Resumed", "state", "Start", result=Result.PASSED, duration_s=0.5)
+    journal.record("Resumed", "transition", transition.name, result=Result.NOT_APPLICABLE)
+    journal.record("Someone else", "state", "Start", result=Result.PASSED)
+    journal.close()
+
+    assert resume_from_journal([session], JournalReader(file_path)) == 2
+    results = session.machine.summary.results
+    assert results.states["Start"].visits_count == 1
+    assert results.transitions[transition.name].visits_count == 1
+
+
+def test_resumed_failures_are_failures_of_the_run(mock_actor_module, tmp_path):
+    file_path = str(tmp_path / "run.journal")
+    session = Session(name="Resumed", actor_module=mock_actor_module)
+    journal = Journal()
+    journal.open(file_path)
+    journal.record("Resumed", "state", "Start", result=Result.FAILED, duration_s=0.5)
+    journal.close()
+
+    assert resume_from_journal([session], JournalReader(file_path)) == 1
+    assert session.has_failures
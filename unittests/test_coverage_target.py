@@ -0,0 +1,136 @@
+"""Test coverage targets and saturation"""
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app import Strategy
+from app.coverage_target import CoverageTarget, GlobalCoverage
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.fsm.results import Result
+from app.parser import FileParser
+from app.sessions import Session
+
+TEMPLATE = """
+A  go     ->  B
+B  back   ->  A
+A  other  ->  C
+C  back   ->  A
+"""
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+@pytest.fixture
+def mock_actor(mocker):
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=TEMPLATE)
+    actor = MockActor()
+    actor.model = FileParser().parse("using/template/instead")
+    for action in actor.model.actions.values():
+        action.fn = lambda _: None
+    return actor
+
+
+def test_target_reached():
+    percentages = {"states": 100.0, "actions": 50.0, "transitions": 75.0}
+    assert CoverageTarget(states=100).reached(percentages) == "100% states"
+    assert CoverageTarget(transitions=75, states=90).reached(percentages)
+    assert not CoverageTarget(transitions=75, actions=60).reached(percentages)
+    assert not CoverageTarget().reached(percentages)
+
+
+def test_stops_at_coverage_target(mock_actor):
+    target = CoverageTarget(transitions=100)
+    machine = Machine(mock_actor, strategy=Strategy.SmartRandom, coverage_target=target)
+    machine.start()
+    assert len(machine.summary.results.transitions) == 4
+    # SmartRandom takes each transition once:
+    assert len(machine.audit_trail.attempts) == 4
+
+
+def test_stops_when_saturated(mock_actor):
+    machine = Machine(mock_actor, strategy=Strategy.SmartRandom, saturation_transitions=10)
+    machine.start()
+    assert len(machine.summary.results.transitions) == 4
+    assert len(machine.audit_trail.attempts) == 4 + 10
+
+
+def test_global_target(mock_actor_module):
+    sessions = [Session(name=f"Global #{n}", actor_module=mock_actor_module) for n in (1, 2)]
+    global_coverage = GlobalCoverage(CoverageTarget(states=100), sessions)
+    assert global_coverage.percentages()["states"] == 0
+
+    first, second = (session.machine for session in sessions)
+    first.summary.record_visit(first.model.states["Start"], Result.PASSED)
+    assert not global_coverage.update()
+    second.summary.record_visit(second.model.states["End"], Result.PASSED)
+    assert global_coverage.update() == "100% states"
+    # Each session has covered half of the states, together they have covered all:
+    assert global_coverage.percentages()["states"] == 100
+
+
+def test_global_target_updated_by_many_sessions(mock_actor_module, mocker):
+    sessions = [Session(name=f"Global #{n}", actor_module=mock_actor_module) for n in (1, 2)]
+    global_coverage = GlobalCoverage(CoverageTarget(states=100), sessions)
+    # Every session has covered something new when it checks the target:
+    mocker.patch.object(global_coverage, "_covered", side_effect=itertools.count())
+    percentages = global_coverage.percentages
+    computing = []
+    overlaps = []
+
+    def slow_percentages():
+        computing.append(True)
+        overlaps.append(len(computing))
+        time.sleep(0.01)
+        computing.pop()
+        return percentages()
+
+    mocker.patch.object(global_coverage, "percentages", side_effect=slow_percentages)
+    barrier = threading.Barrier(8)
+
+    def update():
+        barrier.wait()
+        global_coverage.update()
+
+    threads = [threading.Thread(target=update) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [1] * 8
+
+
+
+def test_stops_when_other_session_reaches_global_target(mocker):
+    template = """
+    A  go             ->  A
+    A  [never]  skip  ->  A
+    """
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=template)
+    actor, other = MockActor(), MockActor()
+    actor.model = FileParser().parse("using/template/instead")
+    other.model = FileParser().parse("using/template/instead")
+    machine = Machine(actor, strategy=Strategy.SmartRandom, max_run_time_s=5)
+    other_machine = Machine(other, strategy=Strategy.SmartRandom)
+    sessions = [SimpleNamespace(actor=actor, machine=machine)]
+    sessions.append(SimpleNamespace(actor=other, machine=other_machine))
+    machine.global_coverage = GlobalCoverage(CoverageTarget(transitions=100), sessions)
+
+    def go(_):
+        # This session can't take "skip", the other session takes it after a few steps:
+        if len(machine.audit_trail.attempts) == 3:
+            skip = other.model.transitions["A:never:skip:A"]
+            other_machine.summary.record_visit(skip, Result.PASSED)
+
+    actor.model.actions["go"].fn = go
+    actor.model.conditions["never"].fn = lambda _: False
+    machine.start()
+    assert len(machine.audit_trail.attempts) == 3
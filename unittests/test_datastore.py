@@ -0,0 +1,131 @@
+"""Unit tests for the key-value store"""
+import threading
+import time
+
+import pytest
+
+from app import Strategy
+from app.datastore import TSKeyValueStore, MISSING, NO_WORK
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.parser import FileParser
+
+
+@pytest.fixture
+def store():
+    return TSKeyValueStore()
+
+
+def test_get_set_delete(store: TSKeyValueStore):
+    store.set("apa", 1)
+    assert store.get("apa") == 1
+    assert "apa" in store
+    store.delete("apa")
+    assert store.get("apa", "default") == "default"
+    assert len(store) == 0
+
+
+def test_compare_and_swap(store: TSKeyValueStore):
+    assert store.compare_and_swap("apa", MISSING, 1) is True
+    assert store.compare_and_swap("apa", MISSING, 2) is False
+    assert store.compare_and_swap("apa", 1, 3) is True
+    assert store.get("apa") == 3
+
+
+def test_counters_are_atomic(store: TSKeyValueStore):
+    def count():
+        for _ in range(1000):
+            store.increment("counter")
+
+    threads = [threading.Thread(target=count) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.get("counter") == 4000
+    assert store.decrement("counter", 1000) == 3000
+
+
+def test_claim_and_release(store: TSKeyValueStore):
+    assert store.claim("Buy apples", "consumer 1") is True
+    assert store.claim("Buy apples", "consumer 1") is True
+    assert store.claim("Buy apples", "consumer 2") is False
+    assert store.owner_of("Buy apples") == "consumer 1"
+    assert store.release("Buy apples", "consumer 2") is False
+    assert store.release("Buy apples", "consumer 1") is True
+    assert store.claim("Buy apples", "consumer 2") is True
+
+
+def test_work_queue_hand_off(store: TSKeyValueStore):
+    store.put_work("todo", "Buy apples")
+    store.put_work("todo", "Get Sara")
+
+    assert store.take_work("todo", "consumer 1") == "Buy apples"
+    assert store.take_work("todo", "consumer 2") == "Get Sara"
+    assert store.take_work("todo", "consumer 2") is NO_WORK
+    assert store.work_owner_of("todo", "Buy apples") == "consumer 1"
+
+    assert store.return_work("todo", "Buy apples", "consumer 1") is True
+    assert store.work_count("todo") == 1
+    assert store.take_work("todo", "consumer 2") == "Buy apples"
+
+
+def test_take_work_waits_for_producer(store: TSKeyValueStore):
+    timer = threading.Timer(0.1, store.put_work, args=("todo", "Call workshop"))
+    timer.start()
+
+    assert store.take_work("todo", "consumer", timeout_s=5) == "Call workshop"
+
+
+def test_claimed_work_items_are_skipped_not_lost(store: TSKeyValueStore):
+    store.put_work("todo", "Buy apples")
+    store.put_work("todo", "Buy apples")
+    store.put_work("todo", "Get Sara")
+    assert store.take_work("todo", "consumer 1") == "Buy apples"
+    # The second "Buy apples" waits for the first one to be finished:
+    assert store.take_work("todo", "consumer 2") == "Get Sara"
+    assert store.take_work("todo", "consumer 2") is NO_WORK
+    assert store.work_count("todo") == 1
+
+    assert store.release_work("todo", "Buy apples", "consumer 2") is False
+    assert store.release_work("todo", "Buy apples", "consumer 1") is True
+    assert store.take_work("todo", "consumer 2") == "Buy apples"
+
+
+def test_work_items_and_key_claims_are_separate(store: TSKeyValueStore):
+    assert store.claim("Buy apples", "someone")
+    store.put_work("todo", "Buy apples")
+    store.put_work("todo", None)
+    assert store.take_work("todo", "consumer") == "Buy apples"
+    assert store.take_work("todo", "consumer") is None
+    assert store.owner_of("Buy apples") == "someone"
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+def test_consumer_waiting_in_action_lets_producer_run(store: TSKeyValueStore, mocker):
+    mocker.patch("os.path.exists", return_value=True)
+    taken = []
+    machines = []
+    for name, action, fn in (
+        ("Consumer", "take", lambda _: taken.append(store.take_work("todo", "c", timeout_s=2))),
+        ("Producer", "give", lambda _: store.put_work("todo", "Buy apples")),
+    ):
+        mocker.patch("pathlib.Path.read_text", return_value=f"A  {action}  ->  B")
+        mock_actor = MockActor()
+        mock_actor.name = name
+        mock_actor.model = FileParser().parse("using/template/instead")
+        mock_actor.model.actions[action].fn = fn
+        machines.append(Machine(mock_actor, strategy=Strategy.SmartRandom))
+    consumer = threading.Thread(target=machines[0].start)
+    start = time.monotonic()
+    consumer.start()
+    time.sleep(0.1)  # The consumer is now waiting for work in its action
+    machines[1].start()
+    consumer.join()
+    assert taken == ["Buy apples"]
+    assert time.monotonic() - start < 1
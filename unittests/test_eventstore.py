@@ -3,9 +3,13 @@
 Will indirectly test relevant parts of the TSDataStore class as well.
 """
 import datetime
+import queue
+import threading
+
 import pytest
 
-from app.eventstore import TSEventStore, Event
+from app import THREAD_LOCK
+from app.eventstore import TSEventStore, Event, Overflow
 
 
 DATA_1 = {"apa": 1, "bepa": 2}
@@ -124,3 +128,142 @@ def test_pop_is_not_allowed(eventstore: TSEventStore):
 def test_delete_is_not_allowed(eventstore: TSEventStore):
     with pytest.raises(TypeError):
         del eventstore._data[1]  # pylint: disable=protected-access
+
+
+def test_subscribe_receives_matching_events_only(eventstore: TSEventStore):
+    subscription = eventstore.subscribe("TEST_.*")
+    eventstore.append("TEST_EVENT", DATA_1)
+    eventstore.append("ANOTHER_EVENT", DATA_3)
+
+    events = subscription.drain()
+
+    # Events appended before subscribing are not delivered:
+    assert [event.data for event in events] == [DATA_1]
+    assert subscription.get() is None
+
+
+def test_subscribe_with_data_filter(eventstore: TSEventStore):
+    subscription = eventstore.subscribe(".*", data_filter_fn=lambda item: "cepa" in item.data)
+    eventstore.append("TEST_EVENT", DATA_1)
+    eventstore.append("TEST_EVENT", DATA_2)
+
+    assert [event.data for event in subscription.events] == [DATA_2]
+    assert [event.data for event in subscription.events] == [DATA_2]
+
+
+def test_subscribe_to_user_supplied_queue(eventstore: TSEventStore):
+    user_queue = queue.Queue()
+    eventstore.subscribe("ANOTHER_EVENT", user_queue)
+    eventstore.append("ANOTHER_EVENT", DATA_3)
+
+    assert user_queue.get_nowait().data == DATA_3
+
+
+@pytest.mark.parametrize(
+    "overflow, expected", ((Overflow.DROP_OLDEST, [2, 3]), (Overflow.DROP_NEWEST, [1, 2]))
+)
+def test_subscribe_overflow(eventstore: TSEventStore, overflow, expected):
+    subscription = eventstore.subscribe("COUNT", maxsize=2, overflow=overflow)
+    for count in (1, 2, 3):
+        eventstore.append("COUNT", count)
+
+    assert [event.data for event in subscription.drain()] == expected
+    assert subscription.dropped_count == 1
+
+
+def test_subscribe_with_callback(eventstore: TSEventStore):
+    received = []
+    done = threading.Event()
+
+    def callback(event: Event):
+        received.append(event.data)
+        if len(received) == 3:
+            done.set()
+
+    eventstore.subscribe("COUNT", callback)
+    for count in (1, 2, 3):
+        eventstore.append("COUNT", count)
+
+    assert done.wait(timeout=5)
+    assert received == [1, 2, 3]
+
+
+def test_dropped_events_counted_by_all_publishers(eventstore: TSEventStore):
+    subscription = eventstore.subscribe("COUNT", maxsize=1, overflow=Overflow.DROP_NEWEST)
+
+    def publish():
+        for count in range(1000):
+            eventstore.append("COUNT", count)
+
+    publishers = [threading.Thread(target=publish) for _ in range(4)]
+    for publisher in publishers:
+        publisher.start()
+    for publisher in publishers:
+        publisher.join()
+    assert subscription.dropped_count == 4 * 1000 - 1
+
+
+def test_close_shuts_down_callback_workers(eventstore: TSEventStore):
+    received = []
+    subscription = eventstore.subscribe("COUNT", received.append)
+    eventstore.append("COUNT", 1)
+    worker_pool = eventstore.worker_pool
+
+    eventstore.close()
+    # Callbacks of events published before close() have been called:
+    assert [event.data for event in received] == [1]
+    assert not subscription.active
+    with pytest.raises(RuntimeError):
+        worker_pool.submit(print)
+    eventstore.append("COUNT", 2)
+    assert len(received) == 1
+
+
+def test_unsubscribe(eventstore: TSEventStore):
+    with eventstore.subscribe("TEST_EVENT") as subscription:
+        eventstore.append("TEST_EVENT", DATA_1)
+    eventstore.append("TEST_EVENT", DATA_2)
+
+    assert [event.data for event in subscription.drain()] == [DATA_1]
+
+
+def test_failing_callback_is_logged_and_delivery_continues(eventstore: TSEventStore, caplog):
+    received = []
+    done = threading.Event()
+
+    def callback(event: Event):
+        if event.data == 1:
+            raise ValueError("Bad subscriber")
+        received.append(event.data)
+        done.set()
+
+    eventstore.subscribe("COUNT", callback)
+    eventstore.append("COUNT", 1)
+    eventstore.append("COUNT", 2)
+
+    assert done.wait(timeout=5)
+    assert received == [2]
+    assert "Subscriber callback for `COUNT` failed" in caplog.text
+
+
+def test_blocking_publisher_releases_thread_lock(eventstore: TSEventStore):
+    subscription = eventstore.subscribe(
+        "COUNT", maxsize=1, overflow=Overflow.BLOCK, block_timeout_s=5
+    )
+    eventstore.append("COUNT", 1)
+    THREAD_LOCK.acquire(holder="Publisher")  # pylint: disable=consider-using-with
+
+    def consume():
+        # Other sessions take THREAD_LOCK before doing anything:
+        with THREAD_LOCK:
+            subscription.get()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    try:
+        eventstore.append("COUNT", 2)
+    finally:
+        THREAD_LOCK.release()
+    consumer.join()
+    assert [event.data for event in subscription.drain()] == [2]
+    assert subscription.dropped_count == 0
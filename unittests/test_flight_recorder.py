@@ -0,0 +1,118 @@
+"""Test the flight recorder"""
+import json
+
+from app import Strategy
+from app.flight_recorder import FlightRecorder
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.parser import FileParser
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+class FakeMessage:  # pylint: disable=too-few-public-methods
+    def __init__(self, message_type: str, text: str) -> None:
+        self.type = message_type
+        self.text = text
+
+
+class FakePage:
+    url = "http://localhost/todo"
+
+    def __init__(self) -> None:
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+
+def read_lines(file_path):
+    with open(file_path) as recorder_file:
+        return [json.loads(line) for line in recorder_file]
+
+
+def test_keeps_only_the_last_steps(tmp_path):
+    recorder = FlightRecorder(str(tmp_path / "session.jsonl"), steps=3)
+    for idx in range(5):
+        recorder.record("state", f"State {idx}", "PASSED", 0.1)
+    assert [record.name for record in recorder.records] == ["State 2", "State 3", "State 4"]
+
+
+def test_flush_writes_reason_and_steps(tmp_path):
+    file_path = tmp_path / "flight_recorder" / "session.jsonl"
+    recorder = FlightRecorder(str(file_path), steps=10)
+    assert recorder.flush("Nothing recorded") is None
+    recorder.record("action", "A -> B", "FAILED", 0.25, state="A")
+    assert recorder.flush("Action go() failed") == str(file_path)
+    assert len(recorder.records) == 0
+    recorder.record("state", "B", "FAILED")
+    recorder.flush('State "B" failed')
+
+    lines = read_lines(file_path)
+    assert [line.get("reason") for line in lines] == [
+        "Action go() failed",
+        None,
+        'State "B" failed',
+        None,
+    ]
+    assert lines[1]["details"] == {"state": "A"}
+    assert lines[1]["duration_s"] == 0.25
+    assert recorder.flush_count == 2
+
+
+def test_switched_off(tmp_path):
+    recorder = FlightRecorder(str(tmp_path / "session.jsonl"), steps=10)
+    recorder.steps = 0
+    recorder.record("state", "A")
+    assert recorder.flush("Failed") is None
+
+
+def test_records_console_errors(tmp_path):
+    recorder = FlightRecorder(str(tmp_path / "session.jsonl"))
+    page = FakePage()
+    recorder.watch_page(page)
+    page.handlers["console"](FakeMessage("log", "Loaded"))
+    page.handlers["console"](FakeMessage("error", "Failed to fetch"))
+    page.handlers["pageerror"](ValueError("x is undefined"))
+    assert [(record.name, record.details["text"]) for record in recorder.records] == [
+        ("console.error", "Failed to fetch"),
+        ("pageerror", "x is undefined"),
+    ]
+    assert recorder.records[0].details["url"] == FakePage.url
+
+
+def test_machine_flushes_on_failed_action(mocker, tmp_path):
+    # ARRANGE
+    template = """
+    A  go    ->  B
+    B        ->  C
+    """
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=template)
+    mock_actor = MockActor()
+    mock_actor.model = FileParser().parse("using/template/instead")
+
+    def failing_action(_):
+        raise ValueError("Button not found")
+
+    mock_actor.model.actions["go"].fn = failing_action
+    machine = Machine(
+        mock_actor, max_run_time_s=5, stop_on_fail=True, strategy=Strategy.SmartRandom
+    )
+    machine.flight_recorder.file_path = str(tmp_path / "mock_actor.jsonl")
+
+    # ACT
+    machine.start()
+
+    # ASSERT
+    lines = read_lines(machine.flight_recorder.file_path)
+    assert lines[0]["reason"] == "Action go() failed"
+    assert [(line["kind"], line["result"]) for line in lines[1:]] == [
+        ("state", "NOT_APPLICABLE"),
+        ("error", "ValueError"),
+        ("action", "FAILED"),
+    ]
+    assert lines[2]["details"]["message"] == "Button not found"
@@ -0,0 +1,82 @@
+"""Test the latency histograms"""
+import pytest
+
+from app.fsm.condition import Condition
+from app.fsm.histogram import LatencyHistogram
+from app.fsm.model import Model
+from app.fsm.results import SessionSummary
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.count == 0
+    assert histogram.percentile(50) is None
+    assert histogram.max_s is None
+    assert histogram.mean_s is None
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value_us in range(1, 101):
+        histogram.record(value_us / 1_000_000)
+    assert histogram.percentile(50) == 50 / 1_000_000
+    assert histogram.percentile(99) == 99 / 1_000_000
+    assert histogram.max_s == 100 / 1_000_000
+
+
+@pytest.mark.parametrize("duration_s", (0.000_2, 0.012_345, 1.5, 42.0, 3600.0))
+def test_large_values_are_within_precision(duration_s):
+    histogram = LatencyHistogram()
+    histogram.record(0.000_001)
+    histogram.record(duration_s)
+    assert histogram.percentile(100) == pytest.approx(duration_s, rel=1 / 64)
+    assert histogram.percentile(100) <= duration_s
+
+
+def test_histogram_is_compact():
+    histogram = LatencyHistogram()
+    for idx in range(100_000):
+        histogram.record(0.1 + (idx % 1000) / 10_000)
+    assert histogram.count == 100_000
+    assert len(histogram.counts) < 100
+    assert histogram.percentile(50) == pytest.approx(0.15, rel=0.02)
+
+
+def test_merge_and_since():
+    first = LatencyHistogram()
+    first.record(0.1)
+    snapshot = first.copy()
+    first.record(0.2)
+    first.record(0.3)
+
+    interval = first.since(snapshot)
+    assert interval.count == 2
+    assert interval.percentile(1) == pytest.approx(0.2, rel=0.02)
+
+    merged = LatencyHistogram()
+    merged.merge(first)
+    merged.merge(interval)
+    assert merged.count == 5
+    assert merged.max_s == pytest.approx(0.3)
+
+
+def test_serialization_round_trip():
+    histogram = LatencyHistogram()
+    for duration_s in (0.001, 0.01, 0.1, 1.0):
+        histogram.record(duration_s)
+    restored = LatencyHistogram.from_dict(histogram.as_dict())
+    assert restored.counts == histogram.counts
+    assert restored.count == 4
+    assert restored.percentile(50) == histogram.percentile(50)
+    assert restored.max_s == histogram.max_s
+
+
+def test_summary_records_durations():
+    summary = SessionSummary(Model("test"))
+    condition = Condition("is logged in")
+    summary.record_visit(condition, None, 0.002)
+    summary.record_visit(condition, None, 0.004)
+    results = summary.results.conditions["is logged in"]
+    assert results.visits_count == 2
+    assert results.durations.count == 2
+    assert results.durations.max_s == pytest.approx(0.004)
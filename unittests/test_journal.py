@@ -0,0 +1,131 @@
+"""Test the binary run journal"""
+import threading
+
+import pytest
+
+from app import Strategy
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.fsm.results import Result
+from app.journal import JOURNAL, Journal, JournalError, JournalReader
+from app.parser import FileParser
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+def test_write_and_read(tmp_path):
+    file_path = str(tmp_path / "run.journal")
+    journal = Journal()
+    journal.open(file_path)
+    journal.record("Consumer", "state", "Todo list", result=Result.PASSED, duration_s=0.25)
+    journal.record("Consumer", "condition", "[has_todos]", result=False, duration_s=0.001)
+    journal.record("Producer", "transition", "A -> B", result=Result.NOT_APPLICABLE)
+    journal.close()
+
+    reader = JournalReader(file_path)
+    records = list(reader)
+    assert reader.start_time > 0
+    assert [(rec.session, rec.kind, rec.name, rec.result) for rec in records] == [
+        ("Consumer", "state", "Todo list", Result.PASSED),
+        ("Consumer", "condition", "[has_todos]", False),
+        ("Producer", "transition", "A -> B", Result.NOT_APPLICABLE),
+    ]
+    assert records[0].duration_s == 0.25
+    assert records[2].duration_s is None
+    assert records[0].offset_s <= records[1].offset_s <= records[2].offset_s
+
+
+def test_concurrent_writers(tmp_path):
+    file_path = str(tmp_path / "run.journal")
+    journal = Journal()
+    journal.open(file_path)
+
+    def write(session):
+        for idx in range(500):
+            journal.record(
+                session, "action", f"action_{idx % 7}", result=Result.PASSED, duration_s=0.001
+            )
+
+    threads = [threading.Thread(target=write, args=(f"Session {idx}",)) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+
+    records = list(JournalReader(file_path))
+    assert len(records) == 2000
+    assert {rec.session for rec in records} == {f"Session {idx}" for idx in range(4)}
+
+
+def test_late_record_does_not_end_up_in_next_journal(tmp_path):
+    journal = Journal()
+    journal.open(str(tmp_path / "first.journal"))
+    first_queue = journal._queue  # pylint: disable=protected-access
+    journal.close()
+    journal.record("Session", "state", "Too late", result=Result.PASSED)
+    # A record() that had already checked is_open when close() was called:
+    first_queue.put(b"Too late")
+
+    second_path = str(tmp_path / "second.journal")
+    journal.open(second_path)
+    journal.record("Session", "state", "Start", result=Result.PASSED)
+    journal.close()
+    assert [rec.name for rec in JournalReader(second_path)] == ["Start"]
+
+
+def test_reads_cut_off_journal(tmp_path):
+    file_path = tmp_path / "run.journal"
+    journal = Journal()
+    journal.open(str(file_path))
+    for idx in range(3):
+        journal.record("Session", "state", f"State {idx}", result=Result.PASSED)
+    journal.close()
+    file_path.write_bytes(file_path.read_bytes()[:-5])
+    assert [rec.name for rec in JournalReader(str(file_path))] == ["State 0", "State 1"]
+
+
+def test_not_a_journal(tmp_path):
+    file_path = tmp_path / "run.journal"
+    file_path.write_bytes(b"Timestamp,Type,Name,Result\n")
+    with pytest.raises(JournalError):
+        JournalReader(str(file_path))
+
+
+def test_machine_writes_to_journal(mocker, tmp_path):
+    # ARRANGE
+    template = """
+    A  go  ->  B
+    B      ->  C
+    """
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=template)
+    mock_actor = MockActor()
+    mock_actor.model = FileParser().parse("using/template/instead")
+    mock_actor.model.actions["go"].fn = lambda _: None
+    machine = Machine(mock_actor, max_run_time_s=5, strategy=Strategy.SmartRandom, seed=42)
+    file_path = str(tmp_path / "run.journal")
+
+    # ACT
+    JOURNAL.open(file_path)
+    try:
+        machine.start()
+    finally:
+        JOURNAL.close()
+
+    # ASSERT
+    records = list(JournalReader(file_path))
+    assert [(rec.kind, rec.name) for rec in records] == [
+        ("session_start", "42"),
+        ("state", "A"),
+        ("action", "go"),
+        ("transition", "A:None:go:B"),
+        ("state", "B"),
+        ("transition", "B:None:None:C"),
+        ("state", "C"),
+        ("session_end", ""),
+    ]
+    assert all(rec.session == "Mock Actor" for rec in records)
@@ -0,0 +1,91 @@
+"""Test the load profiles for session groups"""
+import pytest
+
+from app.load_profiles import (
+    ConstantArrival,
+    LinearRamp,
+    LoadProfile,
+    LoadProfileError,
+    Spike,
+    Step,
+)
+from app.sessions import SessionGroup, start_sessions
+
+
+def test_default_profile_starts_all_at_once():
+    assert LoadProfile().schedule(3) == [(0.0, None), (0.0, None), (0.0, None)]
+
+
+def test_linear_ramp():
+    assert LinearRamp(ramp_up_s=10).schedule(3) == [(0.0, None), (5.0, None), (10.0, None)]
+    assert LinearRamp(ramp_up_s=10, hold_s=20, ramp_down_s=4).schedule(3) == [
+        (0.0, 30.0),
+        (5.0, 32.0),
+        (10.0, 34.0),
+    ]
+    assert LinearRamp(ramp_up_s=10).schedule(1) == [(0.0, None)]
+
+
+def test_step():
+    assert Step(sessions_per_step=2, step_interval_s=10).schedule(5) == [
+        (0, None),
+        (0, None),
+        (10, None),
+        (10, None),
+        (20, None),
+    ]
+    assert Step(sessions_per_step=2, step_interval_s=10, hold_s=5).schedule(3) == [
+        (0, 15),
+        (0, 15),
+        (10, 15),
+    ]
+
+
+def test_spike():
+    assert Spike(baseline=1, spike_at_s=10, spike_duration_s=5).schedule(3) == [
+        (0.0, None),
+        (10, 15),
+        (10, 15),
+    ]
+
+
+def test_constant_arrival():
+    assert ConstantArrival(arrivals_per_s=2, session_duration_s=10).schedule(3) == [
+        (0.0, 10.0),
+        (0.5, 10.5),
+        (1.0, 11.0),
+    ]
+
+
+@pytest.mark.parametrize(
+    "create_profile",
+    (
+        lambda: LinearRamp(ramp_up_s=-1),
+        lambda: Step(sessions_per_step=0, step_interval_s=1),
+        lambda: ConstantArrival(arrivals_per_s=0),
+    ),
+)
+def test_invalid_profiles(create_profile):
+    with pytest.raises(LoadProfileError):
+        create_profile()
+
+
+def test_scheduler_starts_and_stops_sessions(mock_actor_module, mocker):
+    group = SessionGroup(
+        name="Ramp",
+        replicas=2,
+        load_profile=LinearRamp(ramp_up_s=0.2, hold_s=0.1),
+        actor_module=mock_actor_module,
+    )
+    started = []
+    mocker.patch(
+        "app.sessions.start_session", side_effect=lambda session, *_: started.append(session)
+    )
+    stop_spies = [mocker.spy(session.machine, "stop") for session in group]
+
+    start_sessions(group.sessions)
+
+    assert [session.start_offset_s for session in group] == [0.0, 0.2]
+    assert [session.stop_offset_s for session in group] == [pytest.approx(0.3)] * 2
+    assert started == group.sessions
+    assert all(spy.call_count == 1 for spy in stop_spies)
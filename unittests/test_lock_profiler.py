@@ -0,0 +1,121 @@
+"""Test the instrumented sessions lock"""
+import csv
+import threading
+import time
+
+import pytest
+
+from app.lock_profiler import ProfiledLock
+
+
+def test_works_like_a_lock():
+    lock = ProfiledLock()
+    lock.enable()
+    assert lock.acquire(holder="A")
+    assert lock.locked()
+    assert not lock.acquire(blocking=False)
+    lock.release()
+    with lock:
+        assert lock.locked()
+    assert not lock.locked()
+    assert lock.by_holder["A"].count == 1
+    assert len(lock.timeline) == 2
+
+
+def test_blames_waiting_on_holder(tmp_path):
+    lock = ProfiledLock()
+    lock.enable()
+    lock.acquire(holder="Slow")
+    lock.annotate("slow_action")
+
+    def waiter():
+        lock.acquire(holder="Waiter")
+        lock.annotate("fast_action")
+        lock.release()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)
+    lock.release()
+    thread.join()
+
+    [(holder, label, stats)] = lock.top_blockers()
+    assert (holder, label) == ("Slow", "slow_action")
+    assert stats.caused_wait_s >= 0.09
+    assert stats.hold_s >= 0.1
+    holder, stats = lock.most_blocked()[0]
+    assert holder == "Waiter"
+    assert stats.wait_s >= 0.09
+
+    timeline_path = tmp_path / "timeline.csv"
+    lock.save_timeline(str(timeline_path))
+    with open(timeline_path, newline="") as timeline_file:
+        rows = list(csv.DictReader(timeline_file))
+    assert [row["Holder"] for row in rows] == ["Slow", "Waiter"]
+    assert rows[0]["Waiters"] == "1"
+    assert float(rows[1]["Acquired"]) >= float(rows[0]["Released"])
+
+    lock.reset()
+    assert not lock.timeline
+    assert lock.top_blockers() == []
+
+
+def test_records_nothing_unless_enabled():
+    lock = ProfiledLock()
+    with lock:
+        lock.annotate("action")
+        assert lock.locked()
+    assert not lock.locked()
+    assert not lock.timeline
+    assert not lock.by_holder
+
+
+def test_only_holder_can_release():
+    lock = ProfiledLock()
+    lock.enable()
+    with pytest.raises(RuntimeError):
+        lock.release()
+    lock.acquire(holder="Holder")
+    errors = []
+
+    def other():
+        try:
+            lock.release()
+        except RuntimeError as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    thread.join()
+    assert errors
+    assert lock.locked()
+    assert not lock.timeline
+    lock.release()
+    assert [hold.holder for hold in lock.timeline] == ["Holder"]
+
+
+def test_released_while_waiting():
+    lock = ProfiledLock()
+    lock.enable()
+    with lock.released():
+        # Not held by this thread, nothing to release:
+        assert not lock.locked()
+    lock.acquire(holder="Waiting")
+    lock.annotate("wait_for_others")
+    taken = []
+
+    def other():
+        with lock:
+            taken.append(True)
+
+    with lock.released():
+        thread = threading.Thread(target=other)
+        thread.start()
+        thread.join(timeout=5)
+    assert taken == [True]
+    assert lock.locked()
+    lock.release()
+    assert [(hold.holder, hold.label) for hold in lock.timeline][-1] == (
+        "Waiting",
+        "wait_for_others",
+    )
@@ -1,4 +1,10 @@
 """Test the Finite State Machine logic"""
+import time
+
+import pytest
+
+from app import Strategy
+from app.coverage_target import CoverageTarget
 from app.fsm.machine import Machine, RunOptions
 from app.fsm.model import Model
 
@@ -56,3 +62,90 @@ def test_non_cyclic_model_no_actions_or_state_fn(mocker):
     assert machine.summary.states_count == 3
     assert machine.summary.transitions_count == 2
     assert machine.summary.visited_actions == {}
+
+
+def test_time_breakdown(mocker):
+    # ARRANGE
+    template = """
+    A  go  ->  B
+    B      ->  C
+    """
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=template)
+    mock_model = FileParser().parse("using/template/instead")
+    mock_model.actions["go"].fn = lambda _: time.sleep(0.05)
+    mock_model.states["B"].fn = lambda _: time.sleep(0.02)
+    mock_actor = MockActor()
+    mock_actor.model = mock_model
+    machine = Machine(mock_actor, max_run_time_s=1, strategy=Strategy.SmartRandom)
+
+    # ACT
+    machine.start()
+
+    # ASSERT
+    breakdown = machine.summary.time_breakdown
+    assert breakdown.seconds["actions"] >= 0.05
+    assert breakdown.seconds["states"] >= 0.02
+    assert breakdown.seconds["throttled"] == machine.throttled_s == 0.0
+    rows = breakdown.rows(machine.summary.duration)
+    assert [row[0] for row in rows][-1] == "Engine"
+    assert sum(row[1] for row in rows) == pytest.approx(machine.summary.duration, abs=0.01)
+
+
+FRONTIER_TEMPLATE = """
+A  loop  ->  A
+A  [blocked]  short  ->  C
+A  long  ->  B
+B  on    ->  C
+C  new   ->  D
+D  back  ->  A
+"""
+
+
+def test_first_step_towards_frontier(mocker):
+    # pylint: disable=protected-access
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=FRONTIER_TEMPLATE)
+    mock_actor = MockActor()
+    mock_actor.model = FileParser().parse("using/template/instead")
+    machine = Machine(mock_actor, strategy=Strategy.SmartRandom)
+    machine.current_state = mock_actor.model.states["A"]
+    transitions = {trns.action.name: trns for trns in mock_actor.model.transitions.values()}
+    for name in ("loop", "short", "long", "on", "back"):
+        machine.summary.record_visit(transitions[name], None)
+    loop, short, long = (transitions[name] for name in ("loop", "short", "long"))
+
+    # C, with `new` left to cover, is nearest via `short`, or via `long` when `short` is blocked:
+    assert machine._frontier_outbounds([loop, short, long]) == [short]
+    assert machine._frontier_outbounds([loop, long]) == [long]
+
+    machine.summary.record_visit(transitions["new"], None)
+    assert not machine._frontier_outbounds([loop, short, long])
+
+
+def test_smart_random_covers_far_transitions(mocker):
+    template = """
+    A  a1    ->  A
+    A  a2    ->  A
+    A  a3    ->  A
+    A  to_b  ->  B
+    B  b1    ->  B
+    B  back  ->  A
+    B  to_c  ->  C
+    C  c1    ->  C
+    C  back  ->  B
+    """
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=template)
+    for seed in range(20):
+        mock_actor = MockActor()
+        mock_actor.model = FileParser().parse("using/template/instead")
+        for action in mock_actor.model.actions.values():
+            action.fn = lambda _: None
+        target = CoverageTarget(transitions=100)
+        machine = Machine(
+            mock_actor, strategy=Strategy.SmartRandom, seed=seed, coverage_target=target
+        )
+        machine.start()
+        # 9 transitions to cover, plus a few steps back to the transitions left behind:
+        assert len(machine.audit_trail.attempts) <= 14
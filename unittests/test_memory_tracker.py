@@ -0,0 +1,88 @@
+"""Test memory growth tracking"""
+import tracemalloc
+
+import pytest
+
+from app import Strategy
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.logger import CsvFileLogger
+from app.memory_tracker import MemoryTracker
+from app.parser import FileParser
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    tracemalloc.stop()
+
+
+def test_snapshots_every_n_transitions():
+    tracker = MemoryTracker(every_n_transitions=10)
+    tracker.start()
+    for transitions in range(1, 26):
+        assert tracker.check(transitions)
+    assert [interval.transitions for interval in tracker.intervals] == [10, 20]
+
+
+def test_top_growth_finds_growing_list():
+    tracker = MemoryTracker(every_n_transitions=1)
+    tracker.start()
+    leak = []
+    for transitions in range(1, 4):
+        leak.extend(bytearray(1000) for _ in range(200))  # Growing allocation site
+        tracker.check(transitions)
+    assert all(interval.growth_bytes > 100_000 for interval in tracker.intervals)
+    site, size_diff, count_diff = tracker.top_growth()[0]
+    assert "test_memory_tracker.py" in site
+    assert size_diff > 500_000
+    assert count_diff >= 600
+
+
+def test_budget_exceeded():
+    tracker = MemoryTracker(every_n_transitions=1000, budget_mb=0.001)
+    tracker.start()
+    assert tracker.check(1)
+    data = bytearray(10_000)
+    assert not tracker.check(2)
+    assert len(data) == 10_000
+    assert tracker.budget_exceeded
+    assert not tracker.intervals
+
+
+def test_invalid_interval():
+    with pytest.raises(ValueError):
+        MemoryTracker(every_n_transitions=0)
+
+
+def test_machine_stops_when_over_budget(mocker, tmp_path):
+    # ARRANGE
+    template = """
+    A  go    ->  B
+    B  back  ->  A
+    """
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=template)
+    mock_actor = MockActor()
+    mock_actor.model = FileParser().parse("using/template/instead")
+    leak = []
+    mock_actor.model.actions["go"].fn = lambda _: leak.append(bytearray(10_000))
+    machine = Machine(mock_actor, max_run_time_s=5, strategy=Strategy.SmartRandom)
+    machine.memory_tracker = MemoryTracker(every_n_transitions=1, budget_mb=0.001)
+    # Keep the log and flight recorder files out of the real OUTPUTDIR:
+    machine.log_file = CsvFileLogger(str(tmp_path / "log.csv"), ("Timestamp", "Type", "Name"))
+    machine.flight_recorder.file_path = str(tmp_path / "flight_recorder.jsonl")
+
+    # ACT
+    machine.start()
+
+    # ASSERT
+    assert machine.memory_tracker.budget_exceeded
+    assert machine.error_msg.startswith("Memory budget exceeded after 1 transitions")
+    assert machine.summary.total_transitions_visits_count == 1
+    assert (tmp_path / "flight_recorder.jsonl").exists()
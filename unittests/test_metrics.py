@@ -0,0 +1,57 @@
+"""Test the live metrics endpoint"""
+import urllib.error
+import urllib.request
+
+import pytest
+
+from app.fsm.action import Action
+from app.fsm.results import Result
+from app.metrics import MetricsServer, render_metrics
+from app.sessions import Session
+
+
+@pytest.fixture(name="session")
+def fixture_session(mock_actor_module):
+    session = Session(name='Session "one"', actor_module=mock_actor_module)
+    summary = session.machine.summary
+    action = Action("Log in")
+    summary.record_visit(action, Result.PASSED, 0.02)
+    summary.record_visit(action, Result.FAILED, 0.3)
+    session.machine.current_state = summary.model.states["Start"]
+    return session
+
+
+def test_render_metrics(session):
+    text = render_metrics([session])
+    labels = 'session="Session \\"one\\""'
+    assert "# TYPE magpie_action_duration_seconds histogram" in text
+    assert f"magpie_session_running{{{labels}}} 0" in text
+    assert f'magpie_session_current_state{{{labels},state="Start"}} 1' in text
+    assert f'magpie_session_failures_total{{{labels},kind="action"}} 1' in text
+    assert f'magpie_session_coverage_ratio{{{labels},kind="states"}} 0.0000' in text
+    assert f'magpie_action_duration_seconds_bucket{{{labels},action="Log in",le="0.025"}} 1' in text
+    assert f'magpie_action_duration_seconds_bucket{{{labels},action="Log in",le="+Inf"}} 2' in text
+    assert f'magpie_action_duration_seconds_count{{{labels},action="Log in"}} 2' in text
+
+
+def test_aborted_session_is_not_running(session, mocker):
+    mocker.patch.object(session.machine, "_main_loop", side_effect=RuntimeError("Browser crashed"))
+    with pytest.raises(RuntimeError):
+        session.machine.start()
+    text = render_metrics([session])
+    assert 'magpie_session_running{session="Session \\"one\\""} 0' in text
+    assert session.machine.summary.duration > 0
+
+
+def test_metrics_server(session):
+    server = MetricsServer(0, lambda: [session])
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://localhost:{server.port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert b"magpie_session_transitions_total" in response.read()
+        with pytest.raises(urllib.error.HTTPError):
+            with urllib.request.urlopen(f"http://localhost:{server.port}/other"):
+                pass
+    finally:
+        server.stop()
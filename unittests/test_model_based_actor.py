@@ -1,7 +1,13 @@
 """Test actor logic of Finite State Machine"""
+import os
+
+from unittest.mock import Mock
+
 import pytest
 
-from app.fsm.model_based_actor import ModelBasedActor
+from app.actors import model_based_actor as legacy
+from app.fsm.model import Model
+from app.fsm.model_based_actor import ModelBasedActor, ModelRegistry
 
 
 class MockStates:
@@ -53,3 +59,50 @@ def test_data_uniqueness(mock_actor_module):
     actor_2 = ModelBasedActor(actor_module=mock_actor_module, config=data_2)
     assert actor_1.config == data_1
     assert actor_2.config == data_2
+
+
+def test_actors_share_compiled_model(mock_actor_module):
+    actor_1 = ModelBasedActor(actor_module=mock_actor_module, config=1)
+    actor_2 = ModelBasedActor(actor_module=mock_actor_module, config=2)
+    assert actor_1 is not actor_2
+    assert actor_1.model is actor_2.model
+
+
+def test_model_registry_compiles_once():
+    registry = ModelRegistry()
+    modules = (object(), None, None, None)
+    compile_fn = Mock(side_effect=Model)
+
+    model_1 = registry.get("path/to/model", modules, compile_fn)
+    model_2 = registry.get("path/to/model", modules, compile_fn)
+    model_3 = registry.get("path/to/model", (object(), None, None, None), compile_fn)
+
+    assert model_1 is model_2
+    assert model_1 is not model_3
+    assert compile_fn.call_count == 2
+    assert len(registry) == 2
+
+
+def test_model_registry_compiles_edited_model_file(tmp_path):
+    registry = ModelRegistry()
+    modules = (object(), None, None, None)
+    compile_fn = Mock(side_effect=Model)
+    model_path = tmp_path / "model"
+    model_path.write_text("A  ->  B\n")
+
+    model_1 = registry.get(str(model_path), modules, compile_fn)
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    model_2 = registry.get(str(model_path), modules, compile_fn)
+
+    assert model_1 is not model_2
+    assert compile_fn.call_count == 2
+    # The model of the edited file replaces the old one:
+    assert len(registry) == 1
+    assert registry.get(str(model_path), modules, compile_fn) is model_2
+
+
+def test_legacy_actors_share_compiled_model(mock_actor_module):
+    actor_1 = legacy.ModelBasedActor(actor_module=mock_actor_module, config=1)
+    actor_2 = legacy.ModelBasedActor(actor_module=mock_actor_module, config=2)
+    assert actor_1.model is actor_2.model
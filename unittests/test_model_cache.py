@@ -0,0 +1,89 @@
+"""Test the compiled model cache"""
+import os
+
+import pytest
+
+from app.fsm.model import ModelError
+from app.model_cache import ModelCache
+from app.parser import FileParser
+
+
+MODEL = """
+A                  ->  B
+B  [cond1]  act1   =>  C
+C           act2   ->  A
+"""
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "model"
+    path.write_text(MODEL)
+    return path
+
+
+def _summary(model):
+    return (
+        model.initial_state.name,
+        sorted(model.states),
+        sorted(model.actions),
+        sorted(model.conditions),
+        [
+            (trns.name, trns.happy_path, trns.source_code_line)
+            for trns in model.transitions.values()
+        ],
+        {name: [trns.name for trns in state.outbounds] for name, state in model.states.items()},
+        {name: [trns.name for trns in state.inbounds] for name, state in model.states.items()},
+    )
+
+
+def test_cached_model_equals_parsed_model(model_file, tmp_path):
+    cache = ModelCache(tmp_path / "cache")
+    parsed = FileParser().parse(str(model_file))
+
+    assert _summary(cache.parse(str(model_file))) == _summary(parsed)
+    assert _summary(cache.parse(str(model_file))) == _summary(parsed)
+
+
+def test_parse_once_and_return_new_objects(model_file, tmp_path, mocker):
+    cache = ModelCache(tmp_path / "cache")
+    spy = mocker.spy(FileParser, "parse_source")
+
+    model_1 = cache.parse(str(model_file))
+    model_2 = cache.parse(str(model_file))
+
+    assert spy.call_count == 1
+    assert model_1 is not model_2
+    assert model_1.states["A"] is not model_2.states["A"]
+
+
+def test_disk_cache_is_shared_between_instances(model_file, tmp_path, mocker):
+    ModelCache(tmp_path / "cache").parse(str(model_file))
+    spy = mocker.spy(FileParser, "parse_source")
+
+    model = ModelCache(tmp_path / "cache").parse(str(model_file))
+
+    assert spy.call_count == 0
+    assert sorted(model.states) == ["A", "B", "C"]
+
+
+def test_changed_file_is_parsed_again(model_file, tmp_path):
+    cache = ModelCache(tmp_path / "cache")
+    cache.parse(str(model_file))
+    stat = os.stat(model_file)
+
+    # Same size and modification time, different contents:
+    model_file.write_text(MODEL.replace("A", "D"))
+    os.utime(model_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert sorted(cache.parse(str(model_file)).states) == ["B", "C", "D"]
+    assert sorted(ModelCache(tmp_path / "cache").parse(str(model_file)).states) == ["B", "C", "D"]
+
+
+def test_model_errors_are_not_cached(model_file):
+    cache = ModelCache("")
+    model_file.write_text("A  ->  B\nC  ->  B\n")
+
+    for _ in range(2):
+        with pytest.raises(ModelError):
+            cache.parse(str(model_file))
@@ -0,0 +1,82 @@
+"""Test the session thread profilers"""
+import pstats
+import threading
+import time
+
+import pytest
+
+from app.profiler import StackSampler, profile_thread
+
+
+def busy_function(duration_s: float) -> None:
+    end = time.monotonic() + duration_s
+    while time.monotonic() < end:
+        pass
+
+
+def test_cprofile_profiles_the_current_thread(tmp_path):
+    file_stem = tmp_path / "profile" / "session"
+    with profile_thread("cprofile", file_stem):
+        busy_function(0.05)
+    stats = pstats.Stats(str(file_stem) + ".pstats")
+    assert any(func[2] == "busy_function" for func in stats.stats)
+
+
+def test_cprofile_in_two_threads_at_once(tmp_path):
+    both_profiled = threading.Barrier(2)
+    finished = []
+
+    def target(name):
+        with profile_thread("cprofile", tmp_path / name):
+            both_profiled.wait(timeout=5)
+            busy_function(0.05)
+        finished.append(name)
+
+    threads = [threading.Thread(target=target, args=(name,)) for name in ("one", "two")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(finished) == ["one", "two"]
+    # Python 3.12+ samples the second thread instead:
+    for name in finished:
+        assert list(tmp_path.glob(f"{name}.pstats")) or list(tmp_path.glob(f"{name}.collapsed"))
+
+
+def test_cprofile_falls_back_to_sampling(tmp_path, mocker):
+    mocker.patch(
+        "cProfile.Profile.enable",
+        side_effect=ValueError("Another profiling tool is already active"),
+    )
+    with profile_thread("cprofile", tmp_path / "session"):
+        busy_function(0.05)
+    assert not (tmp_path / "session.pstats").exists()
+    assert (tmp_path / "session.collapsed").exists()
+
+
+def test_sampler_profiles_another_thread(tmp_path):
+    def target():
+        with profile_thread("sample", tmp_path / "session"):
+            busy_function(0.2)
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    lines = (tmp_path / "session.collapsed").read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "busy_function" in stack
+    assert stack.split(";")[0].startswith("_bootstrap")
+
+
+def test_sampler_ignores_unknown_thread():
+    sampler = StackSampler(thread_id=-1)
+    sampler.sample()
+    assert not sampler.counts
+
+
+def test_unknown_profile_mode(tmp_path):
+    with pytest.raises(ValueError):
+        with profile_thread("magic", tmp_path / "session"):
+            pass
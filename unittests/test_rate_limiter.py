@@ -0,0 +1,145 @@
+"""Test the global rate limiter"""
+import threading
+import time
+
+from contextlib import contextmanager
+
+import pytest
+
+from app import Strategy
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.parser import FileParser
+from app.rate_limiter import RATE_LIMITER, RateLimit, RateLimiter, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_throttles():
+    bucket = TokenBucket(rate_per_s=10, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    # Reservations queue up:
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_rejects_bad_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate_per_s=0)
+
+
+def test_rate_limiter_disabled_by_default():
+    limiter = RateLimiter()
+    assert not limiter.is_enabled
+    assert limiter.acquire("Log in") == 0.0
+    assert not limiter.stats
+
+
+def test_rate_limiter_throttles_and_records_stats():
+    limiter = RateLimiter()
+    limiter.configure(RateLimit(actions_per_s=20))
+    start = time.monotonic()
+    throttled = sum(limiter.acquire("some action") for _ in range(5))
+    elapsed = time.monotonic() - start
+    assert elapsed >= 0.19
+    assert throttled == pytest.approx(0.2, abs=0.05)
+    stats = limiter.stats["*"]
+    assert stats.count == 5
+    assert stats.target_per_s == 20
+    assert stats.achieved_per_s == pytest.approx(20, rel=0.25)
+
+
+def test_rate_limiter_per_action():
+    limiter = RateLimiter()
+    limiter.configure(RateLimit(per_action={"Log in": 10}))
+    assert limiter.acquire("log_in") == 0.0
+    assert limiter.acquire("LOG IN") > 0.0
+    assert limiter.acquire("log out") == 0.0
+    assert list(limiter.stats) == ["log_in"]
+    assert limiter.stats["log_in"].count == 2
+
+    limiter.configure(None)
+    assert not limiter.is_enabled
+
+
+def test_wait_is_counted_against_the_limit_that_caused_it():
+    limiter = RateLimiter()
+    limiter.configure(RateLimit(actions_per_s=100, per_action={"Log in": 10}))
+    waiting = []
+
+    @contextmanager
+    def while_waiting():
+        waiting.append(True)
+        yield
+
+    assert limiter.acquire("log in", while_waiting) == 0.0
+    assert not waiting
+    assert limiter.acquire("log in", while_waiting) == pytest.approx(0.1, abs=0.02)
+    assert waiting == [True]
+    assert limiter.stats["log_in"].throttled_s == pytest.approx(0.1, abs=0.02)
+    # The global token was only taken when the action was allowed to run:
+    assert limiter.stats["*"].throttled_s == 0.0
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+def test_throttled_session_lets_others_run(mocker):
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value="A  log_in  ->  B\nB  log_in  ->  C")
+    throttled_actor = MockActor()
+    throttled_actor.name = "Throttled"
+    throttled_actor.model = FileParser().parse("using/template/instead")
+    throttled_actor.model.actions["log_in"].fn = lambda _: None
+    mocker.patch("pathlib.Path.read_text", return_value="A  go  ->  B")
+    other_actor = MockActor()
+    other_actor.name = "Other"
+    other_actor.model = FileParser().parse("using/template/instead")
+    done = []
+    other_actor.model.actions["go"].fn = lambda _: done.append(time.monotonic())
+
+    RATE_LIMITER.configure(RateLimit(per_action={"log in": 2}))
+    try:
+        throttled = Machine(throttled_actor, strategy=Strategy.SmartRandom)
+        thread = threading.Thread(target=throttled.start)
+        thread.start()
+        time.sleep(0.1)  # The second log_in() is now waiting for 0.4 s more
+        start = time.monotonic()
+        Machine(other_actor, strategy=Strategy.SmartRandom).start()
+        thread.join()
+    finally:
+        RATE_LIMITER.configure(None)
+    assert done[0] - start < 0.2
+    assert throttled.throttled_s == pytest.approx(0.5, abs=0.1)
+
+
+def test_condition_is_checked_again_after_throttling(mocker):
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value="A  [is open]  enter  ->  A")
+    throttled_actor = MockActor()
+    throttled_actor.name = "Throttled"
+    throttled_actor.model = FileParser().parse("using/template/instead")
+    mocker.patch("pathlib.Path.read_text", return_value="X  close  ->  Y")
+    other_actor = MockActor()
+    other_actor.name = "Other"
+    other_actor.model = FileParser().parse("using/template/instead")
+    door = {"open": True}
+    entered = []
+    throttled_actor.model.conditions["is open"].fn = lambda _: door["open"]
+    throttled_actor.model.actions["enter"].fn = lambda _: entered.append(door["open"])
+    other_actor.model.actions["close"].fn = lambda _: door.update(open=False)
+
+    RATE_LIMITER.configure(RateLimit(per_action={"enter": 2}))
+    try:
+        throttled = Machine(throttled_actor, strategy=Strategy.SmartRandom, max_run_time_s=1)
+        thread = threading.Thread(target=throttled.start)
+        thread.start()
+        time.sleep(0.1)  # The second enter() is now waiting for 0.4 s more
+        Machine(other_actor, strategy=Strategy.SmartRandom).start()
+        thread.join()
+    finally:
+        RATE_LIMITER.configure(None)
+    # The door was closed while the second enter() was throttled:
+    assert entered == [True]
+    assert len(throttled.audit_trail.attempts) == 1
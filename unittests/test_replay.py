@@ -0,0 +1,108 @@
+"""Test replaying sessions"""
+import pytest
+
+from app import Strategy
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.parser import FileParser
+from app.replay import ReplayError, load_replay, save_replay
+from app.sessions import Session
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+TEMPLATE = """
+A  go     ->  B
+A  other  ->  C
+B  back   ->  A
+C  back   ->  A
+C  end    ->  D
+"""
+
+
+@pytest.fixture
+def new_machine(mocker, tmp_path):
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=TEMPLATE)
+
+    def create(**kwargs):
+        mock_actor = MockActor()
+        mock_actor.model = FileParser().parse("using/template/instead")
+        for action in mock_actor.model.actions.values():
+            action.fn = lambda _: None
+        machine = Machine(mock_actor, strategy=Strategy.PureRandom, **kwargs)
+        machine.flight_recorder.file_path = str(tmp_path / "flight_recorder.jsonl")
+        return machine
+
+    return create
+
+
+def attempted(machine):
+    return [transition.name for transition in machine.audit_trail.attempts]
+
+
+def test_follow_repeats_the_session(new_machine):
+    original = new_machine(seed=7)
+    original.start()
+    path = attempted(original)
+    assert path[-1] == "C:None:end:D"
+
+    replayed = new_machine(max_run_time_s=1)
+    replayed.follow(path, seed=7)
+    replayed.start()
+    assert attempted(replayed) == path
+    assert replayed.seed == 7
+    assert replayed.run_options.max_run_time_s == -1
+    assert not replayed.replay_diverged
+
+
+def test_follow_stops_at_end_of_path(new_machine):
+    machine = new_machine()
+    machine.follow(["A:None:go:B", "B:None:back:A"])
+    steps = []
+    machine.step_callback = lambda step, transition: steps.append((step, transition.name))
+    machine.start()
+    assert steps == [(1, "A:None:go:B"), (2, "B:None:back:A")]
+    assert machine.current_state.name == "A"
+
+
+def test_follow_diverges(new_machine):
+    machine = new_machine()
+    machine.follow(["A:None:go:B", "A:None:other:C"])
+    machine.start()
+    assert machine.replay_diverged
+    assert machine.error_msg.startswith("Replay diverged at step 2: A:None:other:C")
+    assert attempted(machine) == ["A:None:go:B"]
+
+
+def test_failed_actions_are_attempts(new_machine):
+    machine = new_machine(stop_on_fail=True)
+
+    def failing_action(_):
+        raise ValueError("Button not found")
+
+    machine.model.actions["go"].fn = failing_action
+    machine.follow(["A:None:go:B"])
+    machine.start()
+    assert attempted(machine) == ["A:None:go:B"]
+    assert machine.audit_trail.transitions == []
+
+
+def test_save_and_load(mock_actor_module, tmp_path):
+    session = Session(name="Replayed", actor_module=mock_actor_module, seed=1234)
+    transition = next(iter(session.machine.model.transitions.values()))
+    session.machine.audit_trail.attempt(transition)
+    file_path = str(tmp_path / "replayed.json")
+    save_replay(session, file_path)
+
+    replay_info = load_replay(file_path)
+    assert replay_info.session == "Replayed"
+    assert replay_info.seed == 1234
+    assert replay_info.transitions == [transition.name]
+    assert replay_info.failed is False
+
+    with pytest.raises(ReplayError):
+        load_replay(str(tmp_path / "missing.json"))
@@ -0,0 +1,64 @@
+"""Test the resource sampler"""
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import resource_sampler
+from app.resource_sampler import PROC, ResourceSampler, _descendants, _read_usage
+
+pytestmark = pytest.mark.skipif(not PROC.exists(), reason="Needs /proc (Linux)")
+
+
+def test_read_usage_of_own_process():
+    usage = _read_usage(os.getpid())
+    assert usage.rss_bytes > 0
+    assert usage.threads >= 1
+    assert usage.fds >= 3
+    assert _read_usage(-1) is None
+
+
+def test_finds_child_processes():
+    with subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"]) as child:
+        try:
+            assert child.pid in _descendants(os.getpid())
+        finally:
+            child.kill()
+
+
+def test_samples_timeline_and_peaks(mock_actor_module, tmp_path):
+    from app.sessions import Session  # pylint: disable=import-outside-toplevel
+
+    session = Session(name="Sampled", actor_module=mock_actor_module)
+    session.machine.current_state = session.machine.model.states["Start"]
+    sampler = ResourceSampler(lambda: [session])
+    first = sampler.sample()
+    second = sampler.sample()
+    assert first.cpu_percent == 0.0
+    assert second.activity == 'Sampled: "Start"'
+    assert len(sampler.transitions_per_second()) == 1
+    peaks = sampler.peaks()
+    assert peaks["rss_bytes"].rss_bytes == max(first.rss_bytes, second.rss_bytes)
+    assert "activity" not in peaks
+
+    csv_path = tmp_path / "resources.csv"
+    sampler.save(str(csv_path))
+    with open(csv_path, newline="") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert len(rows) == 2
+    assert rows[1]["activity"] == 'Sampled: "Start"'
+
+
+def test_keeps_the_last_samples_and_all_time_peaks(mocker):
+    mocker.patch.object(resource_sampler, "MAX_SAMPLES", 2)
+    sampler = ResourceSampler(lambda: [])
+    first = sampler.sample()
+    ballast = b"x" * (50 * 2**20)
+    biggest = sampler.sample()
+    del ballast
+    last = sampler.sample()
+    assert list(sampler.samples) == [biggest, last]
+    assert sampler.first_timestamp == first.timestamp
+    assert sampler.peaks()["rss_bytes"] == biggest
@@ -1,6 +1,7 @@
 """Test session logic of Finite State Machine"""
+import pytest
 
-from app.sessions import Session
+from app.sessions import Session, SessionConfigurationError, SessionGroup
 from app.fsm.model_based_actor import ModelBasedActor
 
 
@@ -21,3 +22,33 @@ def test_start_machine(mock_actor_module):
     session = Session(name="Dummy", actor_module=mock_actor_module)
     session.start()
     assert session.machine.current_state == session.machine.model.states.get("End")
+
+
+def test_session_group_creates_replicas(mock_actor_module):
+    group = SessionGroup(
+        name="Consumer",
+        replicas=3,
+        seed=100,
+        data_factory=lambda number: {"user": f"user{number}"},
+        actor_module=mock_actor_module,
+    )
+    assert [session.name for session in group] == ["Consumer #1", "Consumer #2", "Consumer #3"]
+    assert [session.seed for session in group] == [101, 102, 103]
+    assert [session.data["user"] for session in group] == ["user1", "user2", "user3"]
+    assert all(session.group is group for session in group)
+    # All replicas share the same model:
+    assert len({id(session.machine.model) for session in group}) == 1
+
+
+def test_session_group_needs_replicas(mock_actor_module):
+    with pytest.raises(SessionConfigurationError):
+        SessionGroup(name="Consumer", replicas=0, actor_module=mock_actor_module)
+
+
+def test_same_seed_gives_same_choices(mock_actor_module):
+    session_1 = Session(name="Dummy 1", actor_module=mock_actor_module, seed=42)
+    session_2 = Session(name="Dummy 2", actor_module=mock_actor_module, seed=42)
+    choices = range(1000)
+    assert [session_1.machine.random.choice(choices) for _ in range(10)] == [
+        session_2.machine.random.choice(choices) for _ in range(10)
+    ]
@@ -0,0 +1,117 @@
+"""Test shrinking failing paths"""
+import pytest
+
+from app import Strategy
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.fsm.model_based_actor import ModelBasedActor
+from app.parser import FileParser
+from app.sessions import Session
+from app.shrink import Shrinker, _clone, splice
+
+TEMPLATE = """
+A  go     ->  B
+B  back   ->  A
+A  other  ->  C
+C  back   ->  A
+C  boom   ->  D
+"""
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+@pytest.fixture
+def new_model(mocker):
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value=TEMPLATE)
+    return lambda: FileParser().parse("using/template/instead")
+
+
+def boom_actor(model: Model) -> MockActor:
+    """Return an actor whose `boom` fails if `go` has run before it"""
+    has_gone = []
+
+    def boom(_):
+        if has_gone:
+            raise ValueError("Boom!")
+
+    mock_actor = MockActor()
+    mock_actor.model = model
+    for action in model.actions.values():
+        action.fn = lambda _: None
+    model.actions["go"].fn = lambda _: has_gone.append(True)
+    model.actions["boom"].fn = boom
+    return mock_actor
+
+
+@pytest.fixture
+def runner(new_model, tmp_path):
+    """Replay paths in machines of boom actors"""
+
+    def run_candidates(paths):
+        failures = []
+        for path in paths:
+            mock_actor = boom_actor(new_model())
+            machine = Machine(mock_actor, stop_on_fail=True, strategy=Strategy.SmartRandom)
+            machine.flight_recorder.file_path = str(tmp_path / "flight_recorder.jsonl")
+            machine.follow(path)
+            machine.start()
+            failures.append("" if machine.replay_diverged else machine.first_failure)
+        return failures
+
+    return run_candidates
+
+
+GO, BACK_FROM_B, OTHER, BACK_FROM_C, BOOM = (
+    "A:None:go:B",
+    "B:None:back:A",
+    "A:None:other:C",
+    "C:None:back:A",
+    "C:None:boom:D",
+)
+
+
+def test_splice_bridges_gaps(new_model):
+    model = new_model()
+    assert splice(model, [BOOM]) == [OTHER, BOOM]
+    assert splice(model, [GO, BOOM]) == [GO, BACK_FROM_B, OTHER, BOOM]
+    assert splice(model, [GO, BACK_FROM_B]) == [GO, BACK_FROM_B]
+
+
+def test_shrinks_to_shortest_failing_path(new_model, runner):
+    path = [OTHER, BACK_FROM_C, OTHER, BACK_FROM_C] + [GO, BACK_FROM_B] * 5
+    path += [OTHER, BACK_FROM_C, GO, BACK_FROM_B, OTHER, BOOM]
+    shrinker = Shrinker(new_model(), runner)
+    assert shrinker.shrink(path) == [GO, BACK_FROM_B, OTHER, BOOM]
+    assert shrinker.failure == "Action boom() failed"
+    assert shrinker.runs > 1
+
+
+def test_nothing_to_shrink(new_model, runner):
+    shrinker = Shrinker(new_model(), runner)
+    assert shrinker.shrink([OTHER, BOOM]) is None
+
+
+def test_clone_keeps_session_definition(mock_actor_module):
+    session = Session(
+        name="Failing",
+        actor=ModelBasedActor(actor_module=mock_actor_module, config={"user": "admin"}),
+        strategy=Strategy.PureRandom,
+        stop_at_state="End",
+        tags=["nightly"],
+        retain_trace_file=True,
+        data={"order": 1},
+    )
+    clone = _clone(session, 1)
+    assert clone.name == "Failing (shrink 1)"
+    assert clone.actor is not session.actor
+    assert clone.actor.config == {"user": "admin"}
+    assert clone.run_options.strategy == Strategy.PureRandom
+    assert clone.run_options.stop_at_state == "End"
+    assert clone.run_options.stop_on_fail
+    assert clone.tags == ["nightly"]
+    assert clone.retain_trace_file
+    assert clone.data == {"order": 1}
@@ -0,0 +1,166 @@
+"""Test the synchronization primitives shared by sessions"""
+import threading
+import time
+
+import pytest
+
+from app import Strategy
+from app.actor import Actor
+from app.fsm.machine import Machine
+from app.fsm.model import Model
+from app.parser import FileParser
+from app.sync import SYNC, SyncRegistry, SyncTimeoutError, Barrier, Latch, Semaphore
+from app.sync import reset, shutdown
+
+
+def _run_in_threads(fn, count: int) -> list:
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(fn())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_barrier_releases_all_parties():
+    barrier = Barrier("submit", parties=3)
+    assert _run_in_threads(lambda: barrier.wait(timeout_s=5), 3) == [True, True, True]
+
+
+def test_barrier_timeout_withdraws_party():
+    barrier = Barrier("submit", parties=2)
+    assert barrier.wait(timeout_s=0.2) is False
+    assert barrier.waiting == 0
+
+
+def test_semaphore_caps_concurrent_use():
+    semaphore = Semaphore("admin account", value=2)
+    in_use = []
+    max_in_use = []
+
+    def use_account():
+        with semaphore:
+            in_use.append(1)
+            max_in_use.append(len(in_use))
+            time.sleep(0.05)
+            in_use.pop()
+        return True
+
+    _run_in_threads(use_account, 5)
+    assert max(max_in_use) == 2
+    assert semaphore.available == 2
+
+
+def test_semaphore_timeout():
+    semaphore = Semaphore("admin account", value=1)
+    assert semaphore.acquire(timeout_s=1) is True
+    assert semaphore.acquire(timeout_s=0.2) is False
+    semaphore.release()
+    with pytest.raises(ValueError):
+        semaphore.release()
+
+
+def test_latch():
+    latch = Latch("items created", count=2)
+    timer = threading.Timer(0.1, lambda: [latch.count_down(), latch.count_down()])
+    timer.start()
+    assert latch.wait(timeout_s=5) is True
+    assert latch.count == 0
+
+
+def test_paused_time_does_not_count(mocker):
+    mocker.patch("app.pause_manager.is_paused", return_value=True)
+    latch = Latch("items created", count=1)
+    threading.Timer(0.3, latch.count_down).start()
+    assert latch.wait(timeout_s=0.1) is True
+
+
+def test_registry_returns_same_primitive():
+    registry = SyncRegistry()
+    assert registry.barrier("submit", 2) is registry.barrier("submit", 2)
+    with pytest.raises(ValueError):
+        registry.barrier("submit", 3)
+    with pytest.raises(ValueError):
+        registry.semaphore("submit", 1)
+
+
+def test_actor_reaches_shared_primitives():
+    actor_1 = Actor(actor_module=None)
+    actor_2 = Actor(actor_module=None)
+    assert actor_1.latch("test actor latch", 1) is actor_2.latch("test actor latch", 1)
+
+
+def test_semaphore_context_manager_raises_on_timeout(mocker):
+    mocker.patch("app.sync.DEFAULT_TIMEOUT_S", 0.1)
+    semaphore = Semaphore("admin account", value=1)
+    semaphore.acquire()
+    with pytest.raises(SyncTimeoutError):
+        with semaphore:
+            pass
+
+
+class MockActor:
+    model: Model
+    name: str = "Mock Actor"
+
+
+def test_barrier_in_actions_of_machines(mocker):
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value="A  submit  ->  B")
+    passed = []
+
+    def submit(_):
+        # Actions run while holding THREAD_LOCK, the wait must release it:
+        passed.append(SYNC.barrier("machines submit", parties=2).wait(timeout_s=2))
+
+    machines = []
+    for number in (1, 2):
+        mock_actor = MockActor()
+        mock_actor.name = f"Submitter {number}"
+        mock_actor.model = FileParser().parse("using/template/instead")
+        mock_actor.model.actions["submit"].fn = submit
+        machines.append(Machine(mock_actor, strategy=Strategy.SmartRandom))
+    threads = [threading.Thread(target=machine.start) for machine in machines]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    SYNC.clear()
+    assert passed == [True, True]
+    assert time.monotonic() - start < 1
+
+
+def test_reset_after_shutdown():
+    SYNC.latch("before shutdown", 1)
+    shutdown()
+    start = time.monotonic()
+    assert Latch("shut down", 1).wait(timeout_s=5) is False
+    assert time.monotonic() - start < 1
+    reset()
+    assert not SYNC.primitives()
+    barrier = Barrier("after reset", parties=2)
+    assert _run_in_threads(lambda: barrier.wait(timeout_s=5), 2) == [True, True]
+
+
+def test_stopping_a_machine_ends_its_wait(mocker):
+    mocker.patch("os.path.exists", return_value=True)
+    mocker.patch("pathlib.Path.read_text", return_value="A  submit  ->  B")
+    passed = []
+    mock_actor = MockActor()
+    mock_actor.model = FileParser().parse("using/template/instead")
+    mock_actor.model.actions["submit"].fn = lambda _: passed.append(
+        SYNC.barrier("never complete", parties=2).wait(timeout_s=5)
+    )
+    machine = Machine(mock_actor, strategy=Strategy.SmartRandom)
+    thread = threading.Thread(target=machine.start)
+    thread.start()
+    time.sleep(0.1)
+    start = time.monotonic()
+    machine.stop()
+    thread.join()
+    assert time.monotonic() - start < 0.5
+    assert passed == [False]
+    assert SYNC.barrier("never complete", parties=2).waiting == 0
+    SYNC.clear()
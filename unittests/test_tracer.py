@@ -0,0 +1,77 @@
+"""Test span tracing"""
+import json
+import threading
+
+import pytest
+
+from app.sessions import Session
+from app.tracer import Tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    span = tracer.begin("Log in", "action")
+    assert span is None
+    tracer.end(span, result="PASSED")
+    assert not tracer.events
+
+
+def test_spans_from_all_threads(tmp_path):
+    tracer = Tracer()
+    tracer.enable()
+    # Keep both threads alive, a finished thread's id can be reused:
+    both_started = threading.Barrier(2)
+
+    def session():
+        outer = tracer.begin("Session", "session", seed=1)
+        both_started.wait(timeout=5)
+        inner = tracer.begin("Log in", "action")
+        tracer.end(inner, result="PASSED")
+        tracer.end(outer)
+
+    threads = [threading.Thread(target=session, name=f"Session #{idx}") for idx in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    trace_path = tmp_path / "trace.json"
+    tracer.save(str(trace_path))
+    trace = json.loads(trace_path.read_text())["traceEvents"]
+    spans = [event for event in trace if event["ph"] == "X"]
+    thread_names = {event["args"]["name"] for event in trace if event["ph"] == "M"}
+    assert len(spans) == 4
+    assert thread_names == {"Session #0", "Session #1"}
+    action = next(span for span in spans if span["cat"] == "action")
+    assert action["args"] == {"result": "PASSED"}
+    session = next(
+        span for span in spans if span["cat"] == "session" and span["tid"] == action["tid"]
+    )
+    assert session["args"] == {"seed": "1"}
+    assert session["ts"] <= action["ts"]
+    assert session["ts"] + session["dur"] >= action["ts"] + action["dur"]
+
+    tracer.clear()
+    assert not tracer.events
+
+
+def test_keeps_the_last_spans():
+    tracer = Tracer(max_events=3)
+    tracer.enable()
+    for idx in range(5):
+        tracer.end(tracer.begin(f"Step {idx}", "action"))
+    assert [event["name"] for event in tracer.events] == ["Step 2", "Step 3", "Step 4"]
+    assert tracer.dropped == 2
+
+
+def test_aborted_session_span_is_ended(mock_actor_module, mocker):
+    tracer = Tracer()
+    tracer.enable()
+    mocker.patch("app.fsm.machine.TRACER", tracer)
+    session = Session(name="Aborted", actor_module=mock_actor_module)
+    mocker.patch.object(session.machine, "_main_loop", side_effect=KeyboardInterrupt)
+    with pytest.raises(KeyboardInterrupt):
+        session.start()
+    (span,) = tracer.events
+    assert span["cat"] == "session"
+    assert span["args"]["aborted"] == "KeyboardInterrupt"